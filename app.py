@@ -1,24 +1,270 @@
+import os
 from typing import Optional
 
 import click
 
-from cashdash import create_app
+# Imports of cashdash modules happen inside the commands, so that the command line interface itself starts quickly.
 
-
-@click.command()
-@click.option(
+backend_option = click.option(
     "--backend",
     type=click.STRING,
     help='Backend for Sankey diagrams, "cvxpy" or "minizinc"',
 )
-@click.argument("data_path", type=click.Path(exists=True, dir_okay=False))
-def run(data_path, backend: Optional[str] = None):
-    app = create_app(data_path, backend=backend)
+server_timing_option = click.option(
+    "--server-timing/--no-server-timing",
+    default=False,
+    show_default=True,
+    help="Report how long the stages of a request took in Server-Timing response headers",
+)
+profile_option = click.option(
+    "--profile/--no-profile",
+    default=False,
+    show_default=True,
+    help="Profile each callback, the most recent profiles can be downloaded from /_profile",
+)
+max_jobs_option = click.option(
+    "--max-jobs",
+    type=click.INT,
+    default=2,
+    show_default=True,
+    help="Maximum number of Sankey diagrams computed at once, per process",
+)
+max_waiting_jobs_option = click.option(
+    "--max-waiting-jobs",
+    type=click.INT,
+    default=8,
+    show_default=True,
+    help="Maximum number of Sankey diagrams waiting to be computed, per process. Further requests get a busy message.",
+)
+data_path_argument = click.argument(
+    "data_path", type=click.Path(exists=True, dir_okay=False)
+)
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.command()
+@backend_option
+@server_timing_option
+@profile_option
+@max_jobs_option
+@max_waiting_jobs_option
+@click.option(
+    "--warm-up/--no-warm-up",
+    default=False,
+    show_default=True,
+    help="Set up all dashes in the background right after starting, instead of on first use",
+)
+@data_path_argument
+def run(
+    data_path,
+    warm_up: bool,
+    server_timing: bool,
+    profile: bool,
+    max_jobs: int,
+    max_waiting_jobs: int,
+    backend: Optional[str] = None,
+):
+    """
+    Run the development server.
+    """
+    from cashdash import create_app
+
+    app = create_app(
+        data_path,
+        backend=backend,
+        warm_up=warm_up,
+        server_timing=server_timing,
+        profile=profile,
+        max_jobs=max_jobs,
+        max_waiting_jobs=max_waiting_jobs,
+    )
     app.run(debug=True, port="8080", host="0.0.0.0")
 
 
+@cli.command()
+@backend_option
+@server_timing_option
+@profile_option
+@max_jobs_option
+@max_waiting_jobs_option
+@click.option("--host", type=click.STRING, default="0.0.0.0", show_default=True)
+@click.option("--port", type=click.INT, default=8080, show_default=True)
+@click.option(
+    "--workers",
+    type=click.INT,
+    default=os.cpu_count(),
+    show_default=True,
+    help="Number of worker processes",
+)
+@click.option(
+    "--precompute/--no-precompute",
+    default=True,
+    show_default=True,
+    help="Reconstruct all Sankey links before starting the workers, so that they share them",
+)
+@data_path_argument
+def serve(
+    data_path,
+    host: str,
+    port: int,
+    workers: int,
+    precompute: bool,
+    server_timing: bool,
+    profile: bool,
+    max_jobs: int,
+    max_waiting_jobs: int,
+    backend: Optional[str] = None,
+):
+    """
+    Run the production server: load the book once, then fork worker processes which share it.
+    """
+    from cashdash import create_app
+    from cashdash.server import serve
+
+    app = create_app(
+        data_path,
+        backend=backend,
+        precompute=precompute,
+        server_timing=server_timing,
+        profile=profile,
+        max_jobs=max_jobs,
+        max_waiting_jobs=max_waiting_jobs,
+    )
+    serve(app, host, port, workers)
+
+
+@cli.command("generate-book")
+@click.option("--years", type=click.INT, default=5, show_default=True)
+@click.option("--accounts", type=click.INT, default=50, show_default=True)
+@click.option(
+    "--depth",
+    type=click.INT,
+    default=3,
+    show_default=True,
+    help="Depth of the deepest accounts, top-level accounts have depth 1",
+)
+@click.option("--transactions", type=click.INT, default=5000, show_default=True)
+@click.option(
+    "--split-ratio",
+    type=click.FLOAT,
+    default=0.1,
+    show_default=True,
+    help="Share of transactions with more than two splits",
+)
+@click.option(
+    "--split-width",
+    type=click.INT,
+    default=6,
+    show_default=True,
+    help="Maximum number of splits of a transaction",
+)
+@click.option("--seed", type=click.INT, default=0, show_default=True)
+@click.option(
+    "--format",
+    "file_format",
+    type=click.Choice(["xml", "sqlite"]),
+    default="xml",
+    show_default=True,
+)
+@click.argument("output_path", type=click.Path(exists=False, dir_okay=False))
+def generate_book(
+    output_path,
+    years: int,
+    accounts: int,
+    depth: int,
+    transactions: int,
+    split_ratio: float,
+    split_width: int,
+    seed: int,
+    file_format: str,
+):
+    """
+    Generate a synthetic book of the given size, e.g. to measure performance.
+    """
+    from cashdash.data.synthetic import BookSpec, write_book
+
+    spec = BookSpec(
+        num_years=years,
+        num_accounts=accounts,
+        max_depth=depth,
+        num_transactions=transactions,
+        split_ratio=split_ratio,
+        max_split_width=split_width,
+        seed=seed,
+    )
+    write_book(spec, output_path, file_format)
+
+
+@cli.command()
+@backend_option
+@click.option(
+    "--aggregated/--per-transaction",
+    default=False,
+    show_default=True,
+    help="Export the sums of links between the same two accounts instead of the links of each transaction",
+)
+@click.option(
+    "--format",
+    "file_format",
+    type=click.Choice(["csv", "ndjson", "parquet"]),
+    default="csv",
+    show_default=True,
+    help="Output format, parquet requires pyarrow",
+)
+@click.option("--start-date", type=click.STRING, help="First day to include")
+@click.option("--end-date", type=click.STRING, help="Last day to include")
+@click.option(
+    "--merge-asset-accounts/--no-merge-asset-accounts",
+    default=False,
+    show_default=True,
+)
+@click.option(
+    "--treat-liabilities-as-assets/--no-treat-liabilities-as-assets",
+    default=False,
+    show_default=True,
+)
+@data_path_argument
+@click.argument("output", type=click.File("wb"))
+def export(
+    data_path,
+    output,
+    aggregated: bool,
+    file_format: str,
+    start_date: Optional[str],
+    end_date: Optional[str],
+    merge_asset_accounts: bool,
+    treat_liabilities_as_assets: bool,
+    backend: Optional[str] = None,
+):
+    """
+    Export the links reconstructed for the Sankey diagram, as source account, target account and value of the money
+    flowing in each transaction. Pass "-" as OUTPUT to write to the standard output.
+    """
+    from cashdash.algo import create_link_reconstructor
+    from cashdash.algo.tables import SplitTable
+    from cashdash.data.gnucash import GnucashXmlBookDataReader
+    from cashdash.export import export_links
+
+    data = GnucashXmlBookDataReader().read(data_path)
+    data.remove_book_closing_transactions()
+    split_table = SplitTable(
+        data,
+        create_link_reconstructor(backend),
+        merge_asset_accounts,
+        treat_liabilities_as_assets,
+    )
+    for part in export_links(
+        data, split_table, aggregated, file_format, start_date, end_date
+    ):
+        output.write(part)
+
+
 if __name__ == "__main__":
-    run()
+    cli()
 
 # TODO
 #   - wishlist:
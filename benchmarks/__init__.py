@@ -0,0 +1,4 @@
+"""
+Benchmarks of reading books, reconstructing links and the callbacks of all dashes, run on synthetic books of several
+sizes. Run them with `python -m benchmarks`, see `python -m benchmarks --help`.
+"""
@@ -0,0 +1,135 @@
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+import click
+
+from benchmarks.cases import (
+    BOOK_CASES,
+    BOOK_SIZES,
+    DEFAULT_BOOK_SIZES,
+    SHAPE_CASES,
+    Book,
+)
+from benchmarks.harness import (
+    NUM_REPEATS,
+    Result,
+    find_regression,
+    load_results,
+    measure,
+    save_results,
+)
+
+BENCHMARKS_ROOT = Path(__file__).parent
+DEFAULT_BASELINE = BENCHMARKS_ROOT / "baseline.json"
+# generated books are kept here, so that they are only written once
+DEFAULT_BOOK_DIR = BENCHMARKS_ROOT / "books"
+
+
+@click.command()
+@click.option(
+    "--size",
+    "sizes",
+    type=click.Choice(list(BOOK_SIZES)),
+    multiple=True,
+    default=DEFAULT_BOOK_SIZES,
+    show_default=True,
+    help="Size of the synthetic books to run on, can be given several times",
+)
+@click.option(
+    "--filter",
+    "name_filter",
+    type=click.STRING,
+    default="",
+    help="Only run measurements whose name contains this text",
+)
+@click.option("--repeat", type=click.INT, default=NUM_REPEATS, show_default=True)
+@click.option(
+    "--baseline",
+    type=click.Path(dir_okay=False),
+    default=str(DEFAULT_BASELINE),
+    show_default=True,
+)
+@click.option(
+    "--save-baseline/--compare",
+    default=False,
+    show_default=True,
+    help="Store the results as the new baseline instead of comparing them against it",
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False),
+    help="Also write the results to this JSON file",
+)
+@click.option(
+    "--book-dir",
+    type=click.Path(file_okay=False),
+    default=str(DEFAULT_BOOK_DIR),
+    show_default=True,
+)
+def main(
+    sizes: List[str],
+    name_filter: str,
+    repeat: int,
+    baseline: str,
+    save_baseline: bool,
+    output: str,
+    book_dir: str,
+):
+    """
+    Run the benchmarks and compare them against the baseline. Exits with an error if any measurement got considerably
+    slower or uses considerably more memory. Timings depend on the machine, so the baseline should be recorded on the
+    machine the comparison runs on.
+    """
+    runs = [("shapes", case, ()) for case in SHAPE_CASES]
+    for size in sizes:
+        book = Book(size, Path(book_dir))
+        runs += [(size, case, (book,)) for case in BOOK_CASES]
+
+    results = {}  # type: Dict[str, Result]
+    for prefix, case, args in runs:
+        for name, function in case(*args):
+            name = f"{prefix}/{name}"
+            if name_filter not in name:
+                continue
+            results[name] = result = measure(name, function, repeat)
+            click.echo(
+                f"{name:<90} {result.seconds * 1000:10.1f} ms "
+                f"{result.peak_memory_bytes / 2 ** 20:10.1f} MiB"
+            )
+
+    if output:
+        save_results(results, output)
+    if save_baseline:
+        if Path(baseline).exists():
+            # keep the baseline of measurements which did not run this time
+            results = {**load_results(baseline), **results}
+        save_results(results, baseline)
+        click.echo(f"Saved the baseline to {baseline}.")
+        return
+    if not Path(baseline).exists():
+        click.echo(f"There is no baseline at {baseline} to compare against.")
+        return
+
+    baseline_results = load_results(baseline)
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline_results:
+            click.echo(f"{name} is not part of the baseline yet.")
+            continue
+        regression = find_regression(result, baseline_results[name])
+        if regression is not None:
+            regressions.append(f"{name}: {regression}")
+
+    if regressions:
+        click.echo(
+            f"{len(regressions)} regression(s) compared to {baseline}:", err=True
+        )
+        for regression in regressions:
+            click.echo(f"  {regression}", err=True)
+        sys.exit(1)
+    click.echo(f"No regressions compared to {baseline}.")
+
+
+if __name__ == "__main__":
+    main()
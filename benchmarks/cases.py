@@ -0,0 +1,397 @@
+import itertools
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import click
+import pandas as pd
+
+from cashdash.data import (
+    ACCOUNT,
+    ASSET,
+    BANK,
+    CASH,
+    EXPENSE,
+    INCOME,
+    LIABILITY,
+    TYPE,
+    VALUE,
+    BookData,
+)
+from cashdash.data.synthetic import BookSpec, SyntheticBookGenerator, write_book
+
+# Books the benchmarks run on. Split transactions get rarer the larger the book, so that reconstructing their links
+# while setting up the cash flow dash does not dominate the running time.
+BOOK_SIZES = {
+    "small": BookSpec(
+        num_years=2, num_accounts=30, num_transactions=1000, split_ratio=0.05
+    ),
+    "medium": BookSpec(
+        num_years=10,
+        num_accounts=100,
+        max_depth=4,
+        num_transactions=20000,
+        split_ratio=0.01,
+    ),
+    "large": BookSpec(
+        num_years=30,
+        num_accounts=300,
+        max_depth=5,
+        num_transactions=200000,
+        split_ratio=0.002,
+    ),
+}
+DEFAULT_BOOK_SIZES = ["small", "medium"]
+
+# numbers of splits of the transactions handed to the link reconstructors
+SPLIT_WIDTHS = [3, 5, 8, 12, 16, 24]
+
+# the previous MiniZinc model is only run on narrower transactions, wide ones may keep it busy for a very long time
+MAX_DENSE_ZINC_WIDTH = 12
+
+# checklist settings of the cash flow dash, averaging happens in the browser
+CASHFLOW_SETTINGS = ["merge-asset-accounts", "treat-liabilities-as-assets"]
+
+# the cash flow figure is computed in the background, the benchmarks poll for it this often
+POLL_SECONDS = 0.001
+
+
+class Book:
+    """
+    A synthetic book written to disk, and the app serving it. The file is reused by later runs with the same spec.
+    """
+
+    def __init__(self, size: str, book_dir: Path):
+        self.size = size
+        self.spec = BOOK_SIZES[size]
+        self.generator = SyntheticBookGenerator(self.spec)
+        self.path = book_dir / f"{size}-{self.generator.book_guid}.gnucash"
+        if not self.path.exists():
+            book_dir.mkdir(parents=True, exist_ok=True)
+            write_book(self.spec, str(self.path))
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from cashdash import create_app
+
+            self._client = create_app(str(self.path)).test_client()
+        return self._client
+
+    def set_up_dash(self, dash_url: str) -> None:
+        """
+        Set up a dash by requesting its page, so that setting it up is not part of the first measurement.
+        :param dash_url: e.g. "/cashflow"
+        """
+        response = self.client.get(f"{dash_url}/")
+        assert response.status_code == 200, response.status_code
+
+    def call(
+        self,
+        dash_url: str,
+        outputs: List[Tuple[str, str]],
+        inputs: List[Tuple[str, str, Any]],
+        state: List[Tuple[str, str, Any]] = (),
+    ) -> Dict:
+        """
+        Invoke a Dash callback the way the browser does, as if all its inputs had changed.
+        :param dash_url: e.g. "/cashflow"
+        :param outputs: id and property of each output
+        :param inputs: id, property and value of each input
+        :param state: id, property and value of each state
+        :return: new values of the outputs by id and property
+        """
+        if len(outputs) == 1:
+            output = ".".join(outputs[0])
+        else:
+            output = ".." + "...".join(".".join(o) for o in outputs) + ".."
+        response = self.client.post(
+            f"{dash_url}/dash/_dash-update-component",
+            json={
+                "output": output,
+                "outputs": [{"id": i, "property": p} for i, p in outputs]
+                if len(outputs) > 1
+                else {"id": outputs[0][0], "property": outputs[0][1]},
+                "inputs": [{"id": i, "property": p, "value": v} for i, p, v in inputs],
+                "state": [{"id": i, "property": p, "value": v} for i, p, v in state],
+                "changedPropIds": [f"{i}.{p}" for i, p, _ in inputs],
+            },
+        )
+        if response.status_code == 204:
+            # the callback prevented the update
+            return {}
+        assert response.status_code == 200, response.data[:1000]
+        return json.loads(response.data)["response"]
+
+    def accounts_of_category(self, category: str, max_depth: int) -> List[str]:
+        return [
+            a.guid
+            for a in self.generator.accounts
+            if a.category == category and a.depth <= max_depth
+        ]
+
+
+def read_book(book: Book):
+    from cashdash.data.gnucash import GnucashXmlBookDataReader
+
+    reader = GnucashXmlBookDataReader()
+    yield "gnucash.read", lambda: reader.read(str(book.path))
+
+
+def create_split_shapes() -> Dict[str, pd.DataFrame]:
+    """
+    :return: splits of transactions of increasing width, in three shapes: a receipt paid from one bank account and split
+             up into several expenses, a receipt paid from two accounts, and a pay slip going to a bank account with
+             several deductions
+    """
+    shapes = {}
+    for width in SPLIT_WIDTHS:
+        amounts = [10.0 * (i + 1) for i in range(width - 1)]
+        receipt = [(BANK, -sum(amounts))] + [(EXPENSE, a) for a in amounts]
+        # paid partially in cash, which makes the solution ambiguous
+        shared_receipt = [(BANK, amounts[0] - sum(amounts[1:])), (CASH, -amounts[0])]
+        shared_receipt += [(EXPENSE, a) for a in amounts[1:]]
+        pay_slip = [(INCOME, -sum(amounts))] + [(BANK, amounts[0])]
+        pay_slip += [(EXPENSE, a) for a in amounts[1:]]
+        for shape, splits in [
+            ("receipt", receipt),
+            ("shared_receipt", shared_receipt),
+            ("pay_slip", pay_slip),
+        ]:
+            shapes[f"{shape}.{width}"] = pd.DataFrame(
+                [(f"account-{i}", t, v) for i, (t, v) in enumerate(splits)],
+                columns=[ACCOUNT, TYPE, VALUE],
+            )
+    return shapes
+
+
+class DenseZincLinkReconstructor:
+    """
+    The MiniZinc link model before the edges given to it were bounded, to compare solve times with the current model:
+    a flow variable for every pair of accounts whose types may exchange money, each bounded by the sum of all deltas,
+    with amounts in cents.
+    """
+
+    MODEL = """
+        int: n;
+        int: max_flow;
+        array[1..n] of int: deltas;
+        array[1..n,1..n] of bool: E;
+        array[1..n,1..n] of var 0..max_flow: F;
+        constraint forall(i,j in 1..n)(not E[i,j] -> F[i,j] == 0);
+        constraint forall([not (F[i,j] > 0 /\\ F[j,i] > 0) | i,j in 1..n where i>j]);
+        constraint forall([
+            sum([F[j,i] | j in 1..n]) - sum([F[i,j] | j in 1..n]) == deltas[i] | i in 1..n
+        ]);
+        solve minimize sum(F);
+    """
+
+    def __init__(self):
+        from minizinc import Model, Solver
+
+        self.model = Model()
+        self.model.add_string(self.MODEL)
+        self.solver = Solver.lookup("gecode")
+
+    def reconstruct(self, splits: pd.DataFrame):
+        from minizinc import Instance
+
+        deltas = [int(round(v * 100)) for v in splits[VALUE]]
+        types = [
+            ASSET if t in (CASH, BANK, ASSET, LIABILITY) else t for t in splits[TYPE]
+        ]
+        has_assets = ASSET in types
+        is_edge = [[False] * len(types) for _ in types]
+        for n1, n2 in itertools.permutations(range(len(types)), 2):
+            pair = sorted([types[n1], types[n2]])
+            is_edge[n1][n2] = pair in (
+                [ASSET, INCOME],
+                [ASSET, EXPENSE],
+                [ASSET, ASSET],
+            ) or (not has_assets and pair == [EXPENSE, INCOME])
+
+        instance = Instance(self.solver, self.model)
+        instance["n"] = len(deltas)
+        instance["max_flow"] = sum(abs(d) for d in deltas)
+        instance["deltas"] = deltas
+        instance["E"] = is_edge
+        return instance.solve().solution
+
+
+def reconstruct_links():
+    """
+    Link reconstruction only depends on the shape of a transaction, not on the book, so this case runs without one.
+    """
+    from cashdash.algo import BACKENDS, create_link_reconstructor
+
+    shapes = create_split_shapes()
+    reconstructors = {}
+    for backend in BACKENDS:
+        try:
+            reconstructors[backend] = create_link_reconstructor(backend)
+        except Exception as e:
+            click.echo(f'Skipping backend "{backend}", it is not available: {e}')
+    if "minizinc" in reconstructors:
+        reconstructors["minizinc-dense"] = DenseZincLinkReconstructor()
+
+    for backend, reconstructor in reconstructors.items():
+        for shape, splits in shapes.items():
+            if backend == "minizinc-dense" and len(splits) > MAX_DENSE_ZINC_WIDTH:
+                continue
+            yield f"reconstruct.{backend}.{shape}", lambda r=reconstructor, s=splits: r.reconstruct(
+                s
+            )
+
+
+def update_cashflow(book: Book):
+    book.set_up_dash("/cashflow")
+
+    def update(settings: List[str], provisional: bool = False) -> Dict:
+        job = book.call(
+            "/cashflow",
+            [("cashflow-job", "data")],
+            [("apply-btn", "n_clicks", 1)],
+            [
+                ("date-picker-range", "start_date", None),
+                ("date-picker-range", "end_date", None),
+                ("settings-checklist", "value", settings),
+                ("transaction-exclusions", "value", None),
+                ("account-exclusions", "value", None),
+                # the whole account hierarchy, without merging accounts with little flow
+                ("hierarchy-depth", "value", None),
+                ("min-flow-share", "value", 0.0),
+                ("cashflow-job", "data", None),
+            ],
+        )["cashflow-job"]["data"]
+        provisional_job = None
+        for i in itertools.count():
+            response = book.call(
+                "/cashflow",
+                [
+                    ("cashflow-data", "data"),
+                    ("job-progress", "children"),
+                    ("job-poll-interval", "disabled"),
+                    ("provisional-job", "data"),
+                ],
+                [
+                    ("job-poll-interval", "n_intervals", i),
+                    ("cashflow-job", "data", job),
+                ],
+                [("provisional-job", "data", provisional_job)],
+            )
+            # the first poll after the job published a provisional figure hands it out, the exact one follows
+            if "provisional-job" in response:
+                provisional_job = response["provisional-job"]["data"]
+                if provisional:
+                    return response
+            elif "cashflow-data" in response:
+                return response
+            time.sleep(POLL_SECONDS)
+
+    for num_settings in range(len(CASHFLOW_SETTINGS) + 1):
+        for settings in itertools.combinations(CASHFLOW_SETTINGS, num_settings):
+            name = "+".join(["update_figure", *settings])
+            yield f"cashflow.{name}", lambda s=list(settings): update(s)
+    # time until the first figure is shown, which is provisional unless the exact one is done before it is handed out
+    yield "cashflow.first_figure", lambda: update([], provisional=True)
+
+    def update_transaction_exclusions(search_value: Optional[str]) -> Dict:
+        return book.call(
+            "/cashflow",
+            [
+                ("transaction-exclusions", "options"),
+                ("more-transactions-btn", "disabled"),
+            ],
+            [
+                ("date-picker-range", "start_date", None),
+                ("date-picker-range", "end_date", None),
+                ("account-exclusions", "value", None),
+                ("transaction-pages", "data", 1),
+            ],
+            [
+                ("transaction-exclusions", "search_value", search_value),
+                ("transaction-exclusions", "value", None),
+            ],
+        )
+
+    yield "cashflow.update_transaction_exclusions", lambda: update_transaction_exclusions(
+        None
+    )
+    # every synthetic transaction is described as "Transaction <number>", so the first term matches all of them
+    yield "cashflow.search_transactions", lambda: update_transaction_exclusions(
+        "transaction 12"
+    )
+
+
+def build_asset_figure(book: Book):
+    from cashdash.dashes.assets import compute_asset_balances
+    from cashdash.data.gnucash import GnucashXmlBookDataReader
+
+    data = GnucashXmlBookDataReader().read(str(book.path))
+    book.set_up_dash("/assets")
+
+    def build_balance_index():
+        # BookData keeps its index once built, so every run starts from a book without one
+        fresh_data = BookData(
+            data.accounts, data.transactions, data.splits, data.account_hierarchy
+        )
+        return fresh_data.get_balance_index()
+
+    yield "assets.build_balance_index", build_balance_index
+    # balances are looked up in the index, which is built once when the dash is set up
+    data.get_balance_index()
+    yield "assets.compute_asset_balances", lambda: compute_asset_balances(data)
+
+    for level in [1, book.spec.max_depth]:
+        yield f"assets.update.level_{level}", lambda l=level: book.call(
+            "/assets",
+            [("assets-graph", "figure")],
+            [("hierarchy-level", "value", l), ("assets-graph", "relayoutData", None),],
+        )
+
+
+def update_expenses(book: Book):
+    # the top-level expense account and its children, the way users would typically compare expenses
+    selected_accounts = book.accounts_of_category(EXPENSE, 2)
+    book.set_up_dash("/expenses")
+    # aggregating dates happens in the browser
+    yield "expenses.update_data", lambda: book.call(
+        "/expenses",
+        [("expenses-data", "data")],
+        [("accounts-selection", "value", selected_accounts)],
+    )
+
+
+def export_links(book: Book):
+    # exports share the links reconstructed for the cash flow dash
+    book.set_up_dash("/cashflow")
+
+    def export(path: str) -> int:
+        response = book.client.get(path)
+        assert response.status_code == 200, response.status_code
+        # consume the export part by part, the way a client downloading it would
+        return sum(len(part) for part in response.iter_encoded())
+
+    for kind, file_format in [
+        ("links", "csv"),
+        ("links", "ndjson"),
+        ("aggregated-links", "csv"),
+    ]:
+        yield f"export.{kind}.{file_format}", lambda p=f"/export/{kind}.{file_format}": export(
+            p
+        )
+
+
+# cases run for each book
+BOOK_CASES = [
+    read_book,
+    update_cashflow,
+    build_asset_figure,
+    update_expenses,
+    export_links,
+]
+
+# cases run once, independently of the books
+SHAPE_CASES = [reconstruct_links]
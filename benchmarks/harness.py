@@ -0,0 +1,99 @@
+import json
+import statistics
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# A benchmark case is a function which does all setup, then yields the name and a callable for each measurement. Only
+# the callables are measured.
+Case = Callable[..., Iterable[Tuple[str, Callable[[], Any]]]]
+
+# default number of timed runs of each measurement
+NUM_REPEATS = 5
+
+# measurements taking longer are repeated fewer times, but each one runs at least once
+MAX_SECONDS_PER_MEASUREMENT = 10.0
+
+# Measurements may be this much slower or use this much more memory than their baseline before they count as a
+# regression. Timings of very fast measurements are too noisy to compare, so an absolute slack is added as well.
+MAX_SLOWDOWN = 1.5
+MAX_MEMORY_GROWTH = 1.2
+MIN_SLOWDOWN_SECONDS = 0.005
+
+
+@dataclass
+class Result:
+    name: str
+    # median and minimum of the timed runs
+    seconds: float
+    min_seconds: float
+    num_repeats: int
+    # most memory allocated at once by Python (including numpy and pandas) during a run
+    peak_memory_bytes: int
+
+
+def measure(
+    name: str,
+    function: Callable[[], Any],
+    num_repeats: int = NUM_REPEATS,
+    max_seconds: float = MAX_SECONDS_PER_MEASUREMENT,
+) -> Result:
+    """
+    Measure the peak memory of one run, then time further runs. Tracing allocations slows the code down considerably,
+    so it is not done during the timed runs. The first run also warms up caches, i.e. timings are those of repeated use.
+    :param name:
+    :param function:
+    :param num_repeats:
+    :param max_seconds: stop repeating once the timed runs took this long in total
+    :return:
+    """
+    tracemalloc.start()
+    try:
+        function()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    durations = []  # type: List[float]
+    while len(durations) < num_repeats and sum(durations) < max_seconds:
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return Result(
+        name, statistics.median(durations), min(durations), len(durations), peak_memory,
+    )
+
+
+def load_results(path: str) -> Dict[str, Result]:
+    with open(path) as f:
+        return {name: Result(**result) for name, result in json.load(f).items()}
+
+
+def save_results(results: Dict[str, Result], path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(
+            {name: asdict(result) for name, result in sorted(results.items())},
+            f,
+            indent=2,
+        )
+        f.write("\n")
+
+
+def find_regression(result: Result, baseline: Result) -> Optional[str]:
+    """
+    :param result:
+    :param baseline:
+    :return: description of how the result is worse than the baseline, or None if it is not
+    """
+    problems = []
+    if (
+        result.seconds > baseline.seconds * MAX_SLOWDOWN
+        and result.seconds - baseline.seconds > MIN_SLOWDOWN_SECONDS
+    ):
+        problems.append(f"{result.seconds / baseline.seconds:.2f}x slower")
+    if result.peak_memory_bytes > baseline.peak_memory_bytes * MAX_MEMORY_GROWTH:
+        problems.append(
+            f"{result.peak_memory_bytes / max(1, baseline.peak_memory_bytes):.2f}x more memory"
+        )
+    return ", ".join(problems) or None
@@ -0,0 +1,27 @@
+import importlib
+from typing import Optional
+
+from cashdash.algo.base import LinkReconstructor
+
+# Link reconstruction backends by name. They are only imported when needed, because importing their solver libraries
+# takes a while.
+BACKENDS = {
+    "cvxpy": ("cashdash.algo.cvxpy_links", "CvxpyLinkReconstructor"),
+    "minizinc": ("cashdash.algo.zinc_links", "ZincLinkReconstructor"),
+}
+DEFAULT_BACKEND = "cvxpy"
+
+
+def create_link_reconstructor(backend: Optional[str] = None) -> LinkReconstructor:
+    """
+    Import a link reconstruction backend and instantiate it.
+    :param backend: name of the backend, see `BACKENDS`
+    :return:
+    """
+    if backend is None:
+        backend = DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown backend "{backend}".')
+    module_name, class_name = BACKENDS[backend]
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)()
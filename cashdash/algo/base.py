@@ -1,6 +1,9 @@
-from typing import List
+from __future__ import annotations
 
-import pandas as pd
+from typing import List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 SOURCE = "source"
 TARGET = "target"
@@ -0,0 +1,74 @@
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# roughly the number of horizontal pixels of a chart
+DEFAULT_NUM_BUCKETS = 1000
+
+DateRange = Tuple[pd.Timestamp, pd.Timestamp]
+
+
+def get_bucket_ids(
+    dates: pd.DatetimeIndex, num_buckets: int, visible_range: Optional[DateRange] = None
+) -> np.ndarray:
+    """
+    Assign sorted dates to equally wide time buckets. The whole date range is split into `num_buckets` buckets. If a
+    visible range is given, the dates inside this range are split into `num_buckets` (finer) buckets of their own, so
+    that a chart has the same level of detail at any zoom level while still covering the whole date range.
+    :param dates: sorted dates
+    :param num_buckets:
+    :param visible_range: optional start and end of the visible date range
+    :return: ascending bucket id for each date
+    """
+    t = dates.values.astype("datetime64[ns]").astype(np.int64)
+    t_min, t_max = t[0], t[-1]
+    overview = np.floor((t - t_min) / max(t_max - t_min, 1) * num_buckets)
+    if visible_range is None:
+        return overview.astype(int)
+
+    start, end = [pd.Timestamp(d).value for d in visible_range]
+    detail = np.floor((t - start) / max(end - start, 1) * num_buckets)
+
+    # bucket ids stay ascending: overview buckets before the visible range, detail buckets, overview buckets after
+    bucket_ids = np.where(
+        t < start,
+        overview,
+        np.where(t > end, overview + 2 * (num_buckets + 1), detail + num_buckets + 1),
+    )
+    return bucket_ids.astype(int)
+
+
+def downsample_min_max(
+    df: pd.DataFrame,
+    num_buckets: int = DEFAULT_NUM_BUCKETS,
+    visible_range: Optional[DateRange] = None,
+) -> pd.DataFrame:
+    """
+    Reduce the number of rows of a time series dataframe for plotting lines. Per time bucket, the first and last row and
+    the rows holding the minimum and maximum of each column are kept, so the envelope of every line is preserved.
+    :param df: dataframe with a sorted datetime index
+    :param num_buckets:
+    :param visible_range: optional start and end of the visible date range, see `get_bucket_ids`
+    :return: subset of rows of `df`
+    """
+    if len(df) <= 2 * num_buckets:
+        return df
+
+    bucket_ids = get_bucket_ids(df.index, num_buckets, visible_range)
+    positions = pd.DataFrame(df.values, index=np.arange(len(df)), columns=df.columns)
+    grouped = positions.groupby(bucket_ids)
+
+    # first and last row of each bucket
+    is_bucket_boundary = np.diff(bucket_ids, prepend=-1, append=-1) != 0
+    first_or_last = np.flatnonzero(is_bucket_boundary[:-1] | is_bucket_boundary[1:])
+    keep = np.unique(
+        np.concatenate(
+            [
+                first_or_last,
+                grouped.idxmin().values.ravel(),
+                grouped.idxmax().values.ravel(),
+            ]
+        ).astype(int)
+    )
+    return df.iloc[keep]
@@ -0,0 +1,154 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from cashdash.algo.base import SOURCE, TARGET
+from cashdash.data import VALUE
+from cashdash.data.hierarchy import AccountTree
+
+# prefix of the node keys of "Other (parent)" nodes, followed by the GUID of the parent account
+OTHER_PREFIX = "other:"
+
+
+def get_node_of_account(
+    account_tree: AccountTree,
+    flows: np.ndarray,
+    max_depth: Optional[int] = None,
+    min_flow: float = 0.0,
+) -> pd.Series:
+    """
+    Decide which accounts get a node of their own in a diagram of the account hierarchy. Accounts deeper than
+    `max_depth` are merged into their ancestor at that depth. Accounts with less flow than `min_flow` are merged into an
+    "Other (parent)" node of their parent. The root and the top-level accounts always get a node. Since the flow of a
+    subtree is at least the flow of any account in it, all descendants of a merged account are merged as well.
+    :param account_tree:
+    :param flows: flow of the subtree of each account position
+    :param max_depth: number of levels of the hierarchy below the top-level accounts to show, None for all
+    :param min_flow:
+    :return: node key of each account (GUID): the GUID of the account itself or of the ancestor it was merged into, or
+             `OTHER_PREFIX` followed by the GUID of the parent of an "Other" node
+    """
+    guids, depths, parents = (
+        account_tree.guids,
+        account_tree.depths,
+        account_tree.parents,
+    )
+    is_deep = np.zeros(len(guids), dtype=bool)
+    if max_depth is not None:
+        is_deep = depths > max_depth + 1
+    has_node = (depths <= 1) | ~(is_deep | (flows < min_flow))
+
+    # Going from the top to the bottom of the hierarchy, an account is merged into the node of its parent if the parent
+    # is merged itself, or if it does not get a node of its own.
+    node_positions = np.arange(len(guids))
+    is_other = np.zeros(len(guids), dtype=bool)
+    for depth in range(2, depths.max() + 1):
+        positions = np.flatnonzero(depths == depth)
+        position_parents = parents[positions]
+        is_parent_merged = node_positions[position_parents] != position_parents
+        is_merged = is_parent_merged | ~has_node[positions]
+        node_positions[positions] = np.where(
+            is_merged, node_positions[position_parents], positions
+        )
+        # accounts which are only too deep are merged into their ancestor, which already shows the sum of their flows
+        is_other[positions] = np.where(
+            is_parent_merged,
+            is_other[position_parents],
+            is_merged & ~is_deep[positions],
+        )
+
+    node_of_account = pd.Series(guids[node_positions], index=guids)
+    node_of_account[is_other] = OTHER_PREFIX + node_of_account[is_other]
+    return node_of_account
+
+
+def roll_up_links(
+    links: pd.DataFrame,
+    account_tree: AccountTree,
+    names: pd.Series,
+    max_depth: Optional[int] = None,
+    min_share: float = 0.0,
+) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Route the links between accounts through the account hierarchy: money flowing into an account first flows through
+    each of its ancestors below the top-level accounts. The number of nodes and links can be limited, see
+    `get_node_of_account`. Money moving between accounts merged into the same node is left out.
+    :param links: links between accounts (GUIDs), with source, target and value columns. Any further numeric columns
+                  are summed up the same way as values.
+    :param account_tree:
+    :param names: name of each account (GUID), including accounts which are not part of the hierarchy
+    :param max_depth: number of levels of the hierarchy below the top-level accounts to show, None for all
+    :param min_share: minimum share of the total value of all links an account subtree needs to get a node of its own
+    :return: links between nodes with the columns of `links`, and the label of each node of the links
+    """
+    guids, parents = account_tree.guids, account_tree.parents
+    values = links[VALUE].values.astype(float)
+
+    def get_subtree_sums(accounts: pd.Series) -> np.ndarray:
+        # accounts are numbered in pre-order, so the sum of a subtree is a difference of cumulative sums
+        positions = guids.get_indexer(accounts)
+        is_known = positions >= 0
+        sums = np.bincount(positions[is_known], values[is_known], len(guids))
+        cumulative_sums = np.concatenate([[0], np.cumsum(sums)])
+        return cumulative_sums[account_tree.subtree_ends] - cumulative_sums[:-1]
+
+    # the flow of a subtree is the larger of its incoming and outgoing money, the way nodes are labelled
+    flows = np.maximum(get_subtree_sums(links[SOURCE]), get_subtree_sums(links[TARGET]))
+    node_of_account = get_node_of_account(
+        account_tree, flows, max_depth, min_share * values.sum()
+    )
+
+    # accounts which are not part of the hierarchy keep their own node
+    sources = links[SOURCE].map(node_of_account).fillna(links[SOURCE])
+    targets = links[TARGET].map(node_of_account).fillna(links[TARGET])
+    is_between_nodes = (sources != targets).values
+    merged_links = (
+        links.assign(**{SOURCE: sources, TARGET: targets})
+        .loc[is_between_nodes]
+        .groupby([SOURCE, TARGET], as_index=False, sort=False)
+        .sum()
+    )
+
+    def get_path(node: str) -> List[str]:
+        # ancestors of the node below the top-level accounts, followed by the node itself
+        is_other = node.startswith(OTHER_PREFIX)
+        account = node[len(OTHER_PREFIX) :] if is_other else node
+        if account not in guids:
+            return [node]
+        path = [node]
+        position = guids.get_loc(account)
+        if not is_other:
+            position = parents[position]
+        while position >= 0 and account_tree.depths[position] >= 2:
+            path.append(guids[position])
+            position = parents[position]
+        return path[::-1]
+
+    paths = {target: get_path(target) for target in merged_links[TARGET].unique()}
+    value_columns = [c for c in merged_links.columns if c not in (SOURCE, TARGET)]
+    rolled_up = []
+    for source, target, *link_values in merged_links[
+        [SOURCE, TARGET, *value_columns]
+    ].itertuples(index=False):
+        nodes = [source, *paths[target]]
+        rolled_up += [(s, t, *link_values) for s, t in zip(nodes, nodes[1:]) if s != t]
+    rolled_up = (
+        pd.DataFrame(rolled_up, columns=[SOURCE, TARGET, *value_columns])
+        .astype({c: float for c in value_columns})
+        .groupby([SOURCE, TARGET], as_index=False, sort=False)
+        .sum()
+    )
+
+    nodes = pd.unique(np.concatenate([rolled_up[SOURCE], rolled_up[TARGET]]))
+    labels = pd.Series(
+        [
+            f"Other ({names[node[len(OTHER_PREFIX):]]})"
+            if node.startswith(OTHER_PREFIX)
+            else names[node]
+            for node in nodes
+        ],
+        index=nodes,
+        dtype=object,
+    )
+    return rolled_up, labels
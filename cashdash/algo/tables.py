@@ -0,0 +1,268 @@
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import anytree
+import numpy as np
+import pandas as pd
+
+from cashdash.algo.base import LinkReconstructor, SOURCE, TARGET
+from cashdash.data import (
+    BookData,
+    ACCOUNT,
+    NAME,
+    TRANSACTION,
+    VALUE,
+    TYPE,
+    DESCRIPTION,
+    ASSET,
+    BANK,
+    CASH,
+    LIABILITY,
+)
+
+DUMMY_ASSET_ACCOUNT = "00000000000000000000000000000001"
+
+# column of approximate links holding the part of their value which is provisional
+PROVISIONAL = "provisional"
+
+
+class SplitTable:
+    """
+    Splits of a book joined with their accounts, in the shape expected by a `LinkReconstructor`. The settings
+    `fold_asset_accounts` and `treat_liabilities_as_assets` change the splits themselves, so each combination gets its
+    own table. Tables only depend on the book and are therefore meant to be created once at load. Links of simple
+    (two-split) transactions are determined for the whole table at once, links of split transactions are reconstructed
+    on first use and cached. Until then, split transactions can be given approximate links, which split the money of
+    each source among the targets in proportion to their values.
+    """
+
+    def __init__(
+        self,
+        data: BookData,
+        link_reconstructor: LinkReconstructor,
+        fold_asset_accounts: bool,
+        treat_liabilities_as_assets: bool,
+    ):
+        self.link_reconstructor = link_reconstructor
+        accounts = data.accounts
+
+        if treat_liabilities_as_assets:
+            # find the root liability node in the hierarchy, then change the type of all accounts below it
+            root_liability_node = anytree.find(
+                data.account_hierarchy,
+                maxlevel=2,
+                filter_=lambda n: accounts.at[n.name, TYPE] == LIABILITY,
+            )
+            if root_liability_node is not None:
+                accounts = accounts.copy()
+                liability_accounts = [n.name for n in root_liability_node.descendants]
+                accounts.loc[liability_accounts, TYPE] = ASSET
+
+        splits = data.splits.merge(accounts, left_on=ACCOUNT, right_index=True)
+
+        if fold_asset_accounts:
+            is_asset_split = splits[TYPE].isin([ASSET, CASH, BANK])
+            asset_splits = splits.loc[is_asset_split]
+            non_asset_splits = splits.loc[~is_asset_split]
+
+            # combine splits of asset accounts into one by summing up their value in each transaction
+            asset_splits_folded = asset_splits.groupby(TRANSACTION, as_index=False)[
+                [VALUE]
+            ].sum()
+            asset_splits_folded[ACCOUNT] = DUMMY_ASSET_ACCOUNT
+            dummy_account = pd.Series(
+                {TYPE: ASSET, NAME: "Assets", DESCRIPTION: "Dummy Asset Account"},
+                name=DUMMY_ASSET_ACCOUNT,
+            )
+            asset_splits_folded = asset_splits_folded.assign(**dummy_account.to_dict())
+
+            # splits of transactions involving only asset accounts will be 0, drop those
+            asset_splits_folded = asset_splits_folded.loc[
+                asset_splits_folded[VALUE] != 0
+            ]
+
+            # merge with the non-asset splits, and also keep the dummy account for labeling
+            splits = pd.concat([asset_splits_folded, non_asset_splits], sort=True)
+            accounts = accounts.append(dummy_account, sort=True)
+
+        splits[VALUE] = splits[VALUE].astype(float)
+        self.accounts = accounts
+        self.splits = splits
+
+        # Most transactions are simple transactions with exactly one negative and one positive split. Their links are
+        # determined directly, all remaining transactions are left to the link reconstructor.
+        is_negative = splits[VALUE] < 0
+        num_splits = is_negative.groupby(splits[TRANSACTION]).transform("size")
+        num_negative_splits = is_negative.groupby(splits[TRANSACTION]).transform("sum")
+        is_simple = (num_splits == 2) & (num_negative_splits == 1)
+
+        simple_splits = splits.loc[is_simple]
+        is_source = simple_splits[VALUE] < 0
+        sources = simple_splits.loc[is_source].set_index(TRANSACTION)
+        targets = simple_splits.loc[~is_source].set_index(TRANSACTION)
+        self._simple_links = pd.DataFrame(
+            {SOURCE: sources[ACCOUNT], TARGET: targets[ACCOUNT], VALUE: targets[VALUE],}
+        )
+
+        # sorted by transaction, so that the splits of a transaction can be looked up without going through all splits
+        self._complex_splits = splits.loc[~is_simple].sort_values(
+            TRANSACTION, kind="mergesort"
+        )
+        self._complex_links = {}  # type: Dict[str, List]
+        complex_transactions = self._complex_splits[TRANSACTION].values
+        is_first_split = np.ones(len(complex_transactions), dtype=bool)
+        is_first_split[1:] = complex_transactions[1:] != complex_transactions[:-1]
+        # the splits of the i-th split transaction are at positions `starts[i]` (inclusive) to `starts[i + 1]`
+        self._complex_transactions = pd.Index(complex_transactions[is_first_split])
+        self._complex_split_starts = np.append(
+            np.flatnonzero(is_first_split), len(complex_transactions)
+        )
+
+        # pair every source with every target of each split transaction
+        complex_splits = self._complex_splits[[TRANSACTION, ACCOUNT, VALUE]]
+        is_source = complex_splits[VALUE].values < 0
+        sources = complex_splits.loc[is_source]
+        targets = complex_splits.loc[~is_source & (complex_splits[VALUE].values > 0)]
+        pairs = sources.merge(targets, on=TRANSACTION, suffixes=("_source", ""))
+        target_totals = targets.groupby(TRANSACTION)[VALUE].sum()
+        shares = pairs[VALUE].values / target_totals.reindex(pairs[TRANSACTION]).values
+        self._approximate_links = pd.DataFrame(
+            {
+                SOURCE: pairs[ACCOUNT + "_source"].values,
+                TARGET: pairs[ACCOUNT].values,
+                VALUE: -pairs[VALUE + "_source"].values * shares,
+            },
+            index=pd.Index(pairs[TRANSACTION].values, name=TRANSACTION),
+        )
+
+    def get_links(
+        self,
+        transaction_guids: pd.Index,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        approximate: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Return the links of the given transactions.
+        :param transaction_guids:
+        :param on_progress: optional function called with the number of split transactions handled so far and their
+                            total number, whenever the links of one of them are known
+        :param approximate: whether to give split transactions whose links have not been reconstructed yet approximate
+                            links instead of reconstructing them
+        :return: dataframe with one row per link, with source, target and value columns. Approximate links come with an
+                 additional provisional column, holding the part of the value which is approximated.
+        """
+        simple_links = self._simple_links.loc[
+            self._simple_links.index.isin(transaction_guids)
+        ]
+
+        complex_splits = self._complex_splits.loc[
+            self._complex_splits[TRANSACTION].isin(transaction_guids)
+        ]
+        links = []
+        if approximate:
+            # split transactions which have not been reconstructed yet are approximated, without solving anything
+            guids = complex_splits[TRANSACTION].unique()
+            is_known = np.array([g in self._complex_links for g in guids], dtype=bool)
+            for guid in guids[is_known]:
+                links += self._complex_links[guid]
+            approximate_links = self._approximate_links.loc[
+                self._approximate_links.index.isin(guids[~is_known])
+            ]
+        else:
+            for _, transaction_links in self._iter_complex_links(
+                complex_splits, on_progress
+            ):
+                links += transaction_links
+
+        complex_links = pd.DataFrame(links, columns=[SOURCE, TARGET, VALUE]).astype(
+            {VALUE: float}
+        )
+        if not approximate:
+            return pd.concat(
+                [simple_links, complex_links], ignore_index=True, sort=False,
+            )
+        return pd.concat(
+            [
+                simple_links.assign(**{PROVISIONAL: 0.0}),
+                complex_links.assign(**{PROVISIONAL: 0.0}),
+                approximate_links.assign(**{PROVISIONAL: approximate_links[VALUE]}),
+            ],
+            ignore_index=True,
+            sort=False,
+        )
+
+    def get_transaction_links(self, transaction_guids: pd.Index) -> pd.DataFrame:
+        """
+        Return the links of the given transactions along with the transaction of each link. Unlike `get_links`, the
+        given transactions are looked up directly instead of filtering all transactions of the table, which suits
+        going through a book in small chunks.
+        :param transaction_guids: unique transaction GUIDs
+        :return: dataframe with one row per link, with transaction, source, target and value columns, ordered like
+                 `transaction_guids`
+        """
+        positions = self._simple_links.index.get_indexer(transaction_guids)
+        simple_links = self._simple_links.iloc[positions[positions >= 0]]
+
+        complex_splits = self._get_complex_splits(transaction_guids)
+        links, transactions = [], []
+        for guid, transaction_links in self._iter_complex_links(complex_splits):
+            links += transaction_links
+            transactions += [guid] * len(transaction_links)
+        complex_links = pd.DataFrame(links, columns=[SOURCE, TARGET, VALUE]).astype(
+            {VALUE: float}
+        )
+        complex_links.index = pd.Index(transactions, name=TRANSACTION)
+
+        links = pd.concat([simple_links, complex_links], sort=False).reset_index()
+        order = np.argsort(
+            pd.Index(transaction_guids).get_indexer(links[TRANSACTION]), kind="stable"
+        )
+        return links.iloc[order][[TRANSACTION, SOURCE, TARGET, VALUE]].reset_index(
+            drop=True
+        )
+
+    def _get_complex_splits(self, transaction_guids: pd.Index) -> pd.DataFrame:
+        """
+        :param transaction_guids: unique transaction GUIDs
+        :return: splits of those of the transactions which are split transactions
+        """
+        positions = self._complex_transactions.get_indexer(transaction_guids)
+        positions = positions[positions >= 0]
+        starts = self._complex_split_starts[positions]
+        lengths = self._complex_split_starts[positions + 1] - starts
+        # consecutive split positions for each transaction
+        offsets = np.arange(lengths.sum()) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths
+        )
+        return self._complex_splits.iloc[np.repeat(starts, lengths) + offsets]
+
+    def get_unsolved_transactions(self, transaction_guids: pd.Index) -> pd.Index:
+        """
+        :param transaction_guids: unique transaction GUIDs
+        :return: those of the transactions which are split transactions whose links have not been reconstructed yet
+        """
+        guids = self._complex_transactions.intersection(pd.Index(transaction_guids))
+        is_unsolved = np.array(
+            [g not in self._complex_links for g in guids], dtype=bool
+        )
+        return guids[is_unsolved]
+
+    def _iter_complex_links(
+        self,
+        complex_splits: pd.DataFrame,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Iterator[Tuple[str, List]]:
+        """
+        Reconstruct the links of split transactions unless they are cached already.
+        :param complex_splits: splits of split transactions
+        :param on_progress: see `get_links`
+        :return: GUID and links of each transaction
+        """
+        grouped = complex_splits.groupby(TRANSACTION)
+        for i, (guid, splits_of_transaction) in enumerate(grouped):
+            if guid not in self._complex_links:
+                self._complex_links[guid] = self.link_reconstructor.reconstruct(
+                    splits_of_transaction
+                )
+            yield guid, self._complex_links[guid]
+            if on_progress is not None:
+                on_progress(i + 1, grouped.ngroups)
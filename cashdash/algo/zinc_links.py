@@ -1,7 +1,7 @@
 import itertools
 import os
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
 
 import numpy as np
 import pandas as pd
@@ -20,6 +20,76 @@ from cashdash.data import (
     EXPENSE,
 )
 
+# largest supported denomination, i.e. amounts are precise to six decimals at most
+MAX_DENOMINATION = 10 ** 6
+
+
+def get_denomination(values: np.ndarray) -> int:
+    """
+    Find the smallest unit in which all values are whole numbers. This is the denomination of the currency, or larger if
+    the transaction does not use the smallest unit, e.g. 100 for EUR or 1 for JPY. Smaller denominations keep the
+    domains of the solver small.
+    :param values: amounts of money as floats
+    :return: 1, 10, 100, ... up to `MAX_DENOMINATION`
+    """
+    denomination = 1
+    while denomination < MAX_DENOMINATION:
+        scaled = values * denomination
+        if np.allclose(scaled, np.round(scaled), rtol=0, atol=1e-6):
+            break
+        denomination *= 10
+    return denomination
+
+
+def get_edges(types: np.ndarray, deltas: np.ndarray) -> Tuple[List, List, List]:
+    """
+    Determine the edges of the flow graph which can carry flow in a solution of minimal total flow, and the largest flow
+    each of them can carry.
+
+    If there are asset accounts, all other accounts are connected to asset accounts only. Passing flow through such an
+    account would take a detour compared to the direct edge between the two asset accounts, so it never happens in an
+    optimal solution. Such an account therefore only sends (if its delta is negative) or only receives (if it is
+    positive), and at most the absolute value of its delta. Flow passing through asset accounts, or through any account
+    in transactions without asset accounts, is only bounded by the total flow.
+    :param types: account type of each node
+    :param deltas: delta of each node as int
+    :return: source node, target node and bound of each edge
+    """
+    asset_types = [CASH, BANK, ASSET, LIABILITY]
+    is_asset = np.isin(types, asset_types)
+    has_assets = is_asset.any()
+    can_pass_on_flow = is_asset if has_assets else np.ones(len(types), dtype=bool)
+    total_flow = int(deltas[deltas > 0].sum())
+
+    sources, targets, bounds = [], [], []
+    for n1, n2 in itertools.combinations(range(len(types)), 2):
+        n1_type = ASSET if is_asset[n1] else types[n1]
+        n2_type = ASSET if is_asset[n2] else types[n2]
+        types_of_pair = sorted([n1_type, n2_type])
+
+        # permit flow between these account pairs
+        is_active_edge_pair = (
+            types_of_pair == [ASSET, INCOME]
+            or types_of_pair == [ASSET, EXPENSE]
+            or types_of_pair == [ASSET, ASSET]
+            or not has_assets
+            and types_of_pair == [EXPENSE, INCOME]
+        )
+        if not is_active_edge_pair:
+            continue
+
+        for source, target in [(n1, n2), (n2, n1)]:
+            bound = total_flow
+            if not can_pass_on_flow[source]:
+                bound = min(bound, -deltas[source])
+            if not can_pass_on_flow[target]:
+                bound = min(bound, deltas[target])
+            if bound > 0:
+                sources.append(source)
+                targets.append(target)
+                bounds.append(int(bound))
+    return sources, targets, bounds
+
 
 class ZincLinkReconstructor(LinkReconstructor):
     def __init__(self):
@@ -35,15 +105,12 @@ class ZincLinkReconstructor(LinkReconstructor):
         #  - edge labels are the absolute amount of money flowing, i.e. always 0 or more
         #  - constraints:
         #    - unidirectionality: between two nodes in the flow graph, there are two edges (forward/backward edges), but
-        #      only one of those edges should be non-zero at a time ()
+        #      only one of those edges should be non-zero at a time (implied by minimizing the total flow)
         #    - flow conservation: ingoing money plus outgoing money equals node delta
         # TODO many more improvements are imaginable:
         #  - prefer assigning income to certain account types: CASH, then BANK, then ASSET
         #  - learn which asset accounts usually receive income based on past transactions
 
-        # TODO use denomination matching the actual currency
-        denomination = 100
-
         # most transactions likely are non-split transactions, so they deserve to be dealt with quickly
         if len(splits) == 2:
             return [
@@ -54,58 +121,30 @@ class ZincLinkReconstructor(LinkReconstructor):
                 }
             ]
 
-        # represent amounts of money as int
-        split_values_as_int = (splits[VALUE] * denomination).map(round)
-
-        num_nodes = len(splits)
-        # we need to convert np.int64 to plain int here because they JSON-serialize all input parameters in minizinc
-        max_flow = split_values_as_int.abs().sum().item()
-        node_deltas = [i.item() for i in split_values_as_int.values]
-
-        asset_types = [CASH, BANK, ASSET, LIABILITY]
-        has_assets = not splits.loc[
-            splits[TYPE].isin([CASH, BANK, ASSET, LIABILITY])
-        ].empty
-
-        adjacency_matrix = np.zeros((num_nodes, num_nodes)).astype(bool)
-        for n1, n2 in itertools.combinations(range(num_nodes), 2):
-            n1_type, n2_type = splits.iloc[n1][TYPE], splits.iloc[n2][TYPE]
-
-            if n1_type in asset_types:
-                n1_type = ASSET
-            if n2_type in asset_types:
-                n2_type = ASSET
-
-            types = sorted([n1_type, n2_type])
-
-            # permit flow between these account pairs
-            is_active_edge_pair = (
-                types == [ASSET, INCOME]
-                or types == [ASSET, EXPENSE]
-                or types == [ASSET, ASSET]
-                or not has_assets
-                and types == [EXPENSE, INCOME]
-            )
-
-            if is_active_edge_pair:
-                adjacency_matrix[n1, n2] = True
-                adjacency_matrix[n2, n1] = True
-        adjacency_matrix = adjacency_matrix.tolist()
+        # represent amounts of money as int, in the smallest unit of the currency
+        values = splits[VALUE].astype(float).values
+        denomination = get_denomination(values)
+        node_deltas = np.round(values * denomination).astype(int)
+        sources, targets, bounds = get_edges(splits[TYPE].values, node_deltas)
 
         # get it solved
-        # TODO speed this up; still many assignment failures because our target objective is weak
+        # we need to convert np.int64 to plain int here because they JSON-serialize all input parameters in minizinc
         instance = Instance(self.solver, self.model)
-        instance["n"] = num_nodes
-        instance["max_flow"] = max_flow
-        instance["deltas"] = node_deltas
-        instance["E"] = adjacency_matrix
+        instance["n"] = len(splits)
+        instance["deltas"] = node_deltas.tolist()
+        instance["m"] = len(sources)
+        # minizinc arrays start at 1
+        instance["sources"] = [s + 1 for s in sources]
+        instance["targets"] = [t + 1 for t in targets]
+        instance["bounds"] = bounds
         result = instance.solve()
         assert result.solution is not None
-        F = np.array(result.solution.F)
+        F = result.solution.F
 
         links = []
-        for idx_source, idx_target in zip(*F.nonzero()):
-            value = F[idx_source, idx_target]
+        for idx_source, idx_target, value in zip(sources, targets, F):
+            if value == 0:
+                continue
             links.append(
                 {
                     SOURCE: splits.iloc[idx_source][ACCOUNT],
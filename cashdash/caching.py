@@ -0,0 +1,63 @@
+import hashlib
+import time
+
+from flask import Flask, Response, request
+
+# Responses to GET requests for these paths only depend on the book and the code: HTML pages as well as Dash layouts and
+# callback dependencies.
+CACHEABLE_PATH_SUFFIXES = ("/", "/_dash-layout", "/_dash-dependencies")
+
+
+def get_book_version(data_path: str) -> str:
+    """
+    :param data_path: path to the GnuCash file
+    :return: identifier which changes whenever the content of the file changes
+    """
+    digest = hashlib.sha1()
+    with open(data_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def enable_http_caching(app: Flask, book_version: str) -> None:
+    """
+    Add cache validators (ETag and Last-Modified) to all responses which only depend on the book. Clients and reverse
+    proxies revalidating such a response get a 304 response, without the response being computed again. Must be called
+    before any blueprints are registered, so that revalidation happens before anything else.
+    :param app:
+    :param book_version: see `get_book_version`
+    """
+    # the code may have changed between two runs of the server, so the time of startup is part of the ETag as well
+    startup_time = int(time.time())
+    etag = f"{book_version}-{startup_time}"
+
+    def is_cacheable() -> bool:
+        return request.method in ("GET", "HEAD") and request.path.endswith(
+            CACHEABLE_PATH_SUFFIXES
+        )
+
+    def add_validators(response: Response) -> Response:
+        response.set_etag(etag)
+        response.last_modified = startup_time
+        # clients may keep responses, but have to revalidate them before each use
+        response.cache_control.no_cache = True
+        return response
+
+    @app.before_request
+    def respond_not_modified():
+        if not is_cacheable():
+            return None
+        # compression appends the encoding to the ETag of compressed responses, e.g. "<etag>:gzip"
+        for tag in request.if_none_match.as_set():
+            if tag == etag or tag.startswith(etag + ":"):
+                response = add_validators(Response(status=304))
+                response.set_etag(tag)
+                return response
+        return None
+
+    @app.after_request
+    def add_validators_to_response(response: Response) -> Response:
+        if is_cacheable() and response.status_code == 200:
+            add_validators(response)
+        return response
@@ -1,23 +1,71 @@
+from typing import Optional, Dict
+
 import dash_core_components as dcc
 import dash_html_components as html
 import pandas as pd
-from dash import Dash
+from dash import Dash, callback_context
+from dash.dependencies import Output, Input
+from dash.exceptions import PreventUpdate
 from plotly import graph_objects as go
 
-from cashdash.dashes.base import DashBlueprintFactory
+from cashdash.algo.downsampling import downsample_min_max
+from cashdash.dashes.base import DashBlueprintFactory, get_visible_x_range
+from cashdash.timing import timed
 from cashdash.data import (
     BookData,
     ACCOUNT,
     NAME,
-    TRANSACTION,
     DATE,
-    VALUE,
     TYPE,
     CASH,
     ASSET,
     BANK,
 )
 
+ASSETS_GRAPH = "assets-graph"
+HIERARCHY_LEVEL = "hierarchy-level"
+
+
+def compute_asset_balances(data: BookData) -> pd.DataFrame:
+    """
+    Compute the balance of each asset account with at least one transaction over time.
+    :param data:
+    :return: dataframe with one row per transaction date and one column per account (GUID), in hierarchy order
+    """
+    accounts = data.accounts
+
+    # find cash, asset, bank accounts with at least one split, in the order of the account hierarchy
+    asset_accounts = accounts.index[accounts[TYPE].isin([CASH, ASSET, BANK])]
+    asset_accounts = asset_accounts[
+        asset_accounts.isin(data.get_accounts_with_splits())
+    ]
+
+    # We want a stacked area chart. For this to work, all lines need common x values (== dates), so balances are looked
+    # up at every date at which any asset account changes.
+    balance_index = data.get_balance_index()
+    dates = balance_index.get_dates(asset_accounts)
+    balances = balance_index.balance_series(asset_accounts, dates)
+    balances.index.name = DATE
+    balances.columns.name = ACCOUNT
+    return balances
+
+
+def aggregate_by_hierarchy_level(
+    data: BookData, balances: pd.DataFrame, level: int
+) -> pd.DataFrame:
+    """
+    Sum up account balances to the level of their ancestors at the given depth of the account hierarchy.
+    :param data:
+    :param balances: account balances as returned by `compute_asset_balances`
+    :param level: depth in the account hierarchy
+    :return: dataframe with one column per ancestor account (GUID)
+    """
+    ancestors = data.account_tree.ancestors_at_depth(level)
+    balances_ancestors = ancestors.loc[balances.columns]
+    aggregated = balances.groupby(balances_ancestors.values, axis=1, sort=False).sum()
+    return aggregated
+
+
 # TODO y start on plots looks like data is wrong
 class AssetDashFactory(DashBlueprintFactory):
     """
@@ -28,43 +76,108 @@ class AssetDashFactory(DashBlueprintFactory):
         return "Assets"
 
     def _setup_dash(self, dash: Dash, data: BookData) -> None:
-        accounts, transactions, splits = data.accounts, data.transactions, data.splits
-
-        # find cash, asset, bank accounts
-        asset_accounts = accounts.loc[accounts[TYPE].isin([CASH, ASSET, BANK])]
-
-        # We want a stacked area chart. For this to work, all lines need common x values (== dates). We therefore look
-        # up all transactions of ASSET and CASH accounts, concat them into a common DF and then create one line per
-        # account.
-        asset_account_transactions = []
-        asset_account_names = []
-        for account_guid, row in asset_accounts.iterrows():
-            # look up splits and join with transactions to obtain date information
-            splits_of_account = splits.loc[splits[ACCOUNT] == account_guid]
-            if splits_of_account.empty:
-                continue
-            transactions_of_account = splits_of_account.merge(
-                transactions, left_on=TRANSACTION, right_index=True
+        with timed("assets.setup.balances"):
+            balances = compute_asset_balances(data)
+
+        # offer every level of the hierarchy at which there are asset accounts, the deepest level shows all accounts
+        account_tree = data.account_tree
+        account_depths = pd.Series(account_tree.depths, index=account_tree.guids)
+        max_level = int(account_depths.loc[balances.columns].max())
+        hierarchy_level_options = [
+            {"label": f"Level {level}", "value": level} for level in range(1, max_level)
+        ]
+        hierarchy_level_options.append(
+            {"label": "Individual accounts", "value": max_level}
+        )
+        hierarchy_level_dropdown = dcc.Dropdown(
+            id=HIERARCHY_LEVEL,
+            options=hierarchy_level_options,
+            value=max_level,
+            clearable=False,
+        )
+
+        def update(level: int, relayout_data: Optional[Dict]) -> go.Figure:
+            balances_of_level = aggregate_by_hierarchy_level(data, balances, level)
+            account_names = data.accounts.loc[balances_of_level.columns, NAME]
+
+            # Send only as many points as can be shown. Zooming in via the range slider triggers this callback again
+            # with a narrower visible range, for which we then send more detail.
+            visible_range = get_visible_x_range(relayout_data)
+            balances_of_level = downsample_min_max(
+                balances_of_level, visible_range=visible_range
             )
-            transactions_of_account = transactions_of_account.groupby(
-                DATE
-            ).sum()  # aggregate for one day, use date as index
+            return AssetDashFactory._create_figure(balances_of_level, account_names)
 
-            asset_account_transactions.append(transactions_of_account[VALUE])
-            asset_account_names.append(accounts.at[account_guid, NAME])
-        common_index = pd.concat(asset_account_transactions, axis=1).fillna(0)
-        common_index.columns = asset_account_names
+        with timed("assets.setup.initial_figure"):
+            initial_figure = update(max_level, None)
+
+        dash.layout = html.Div(
+            className="container-fluid mt-2",
+            children=html.Div(
+                className="row",
+                children=[
+                    html.Div(
+                        className="col-md-3",
+                        children=[
+                            html.Div(
+                                className="form-group",
+                                children=[
+                                    html.Label(
+                                        "Account level", htmlFor=HIERARCHY_LEVEL
+                                    ),
+                                    hierarchy_level_dropdown,
+                                ],
+                            )
+                        ],
+                    ),
+                    html.Div(
+                        className="col-md-9",
+                        children=[
+                            dcc.Loading(
+                                children=dcc.Graph(
+                                    id=ASSETS_GRAPH, figure=initial_figure
+                                )
+                            )
+                        ],
+                    ),
+                ],
+            ),
+        )
 
+        def update_on_input(level: int, relayout_data: Optional[Dict]) -> go.Figure:
+            # The initial figure only depends on the book and is part of the layout, which clients can cache. There
+            # is no need to compute it again on page load.
+            triggered = callback_context.triggered
+            if not triggered or triggered[0]["prop_id"] == ".":
+                raise PreventUpdate
+            # Relayout events which leave the x-axis alone, e.g. the initial autosize, do not change what the figure
+            # shows. Resetting the zoom does, the figure needs to cover the whole range again.
+            if (
+                triggered[0]["prop_id"] == f"{ASSETS_GRAPH}.relayoutData"
+                and get_visible_x_range(relayout_data) is None
+                and "xaxis.autorange" not in (relayout_data or {})
+            ):
+                raise PreventUpdate
+            return update(level, relayout_data)
+
+        dash.callback(
+            Output(ASSETS_GRAPH, "figure"),
+            [Input(HIERARCHY_LEVEL, "value"), Input(ASSETS_GRAPH, "relayoutData")],
+        )(update_on_input)
+
+    @staticmethod
+    def _create_figure(balances: pd.DataFrame, account_names: pd.Series) -> go.Figure:
         # create lines
         lines = []
-        for column in common_index:
+        x = balances.index.to_pydatetime()
+        for column, name in zip(balances, account_names):
             trace = go.Scatter(
-                x=common_index.index.to_pydatetime(),
-                y=common_index[column].cumsum(),
+                x=x,
+                y=balances[column],
                 mode="lines",
                 line_shape="hv",
                 stackgroup="default",
-                name=column,
+                name=name,
             )
             lines.append(trace)
 
@@ -89,9 +202,8 @@ class AssetDashFactory(DashBlueprintFactory):
                 rangeslider=dict(visible=True),
                 type="date",
                 tickson="boundaries",
-            )
-        )
-
-        dash.layout = html.Div(
-            children=[dcc.Loading(children=dcc.Graph(id="assets-graph", figure=fig))]
+            ),
+            # keep the user's zoom level when the figure is updated
+            uirevision=ASSETS_GRAPH,
         )
+        return fig
@@ -1,16 +1,43 @@
+import threading
 from pathlib import Path
-from typing import OrderedDict
+from typing import OrderedDict, Dict, Optional
 
+import dash_html_components as html
+import pandas as pd
 from dash import Dash
-from flask import Blueprint, render_template, url_for
+from flask import Blueprint, render_template, url_for, request
 from flask.blueprints import BlueprintSetupState
 
+from cashdash.algo.downsampling import DateRange
 from cashdash.data import BookData
 
 
+def get_visible_x_range(relayout_data: Optional[Dict]) -> Optional[DateRange]:
+    """
+    Extract the visible range of a graph's date x-axis from its `relayoutData` property.
+    :param relayout_data:
+    :return: start and end of the visible range, or None if the whole range is visible
+    """
+    if not relayout_data:
+        return None
+    if "xaxis.range" in relayout_data:
+        start, end = relayout_data["xaxis.range"]
+    elif "xaxis.range[0]" in relayout_data and "xaxis.range[1]" in relayout_data:
+        start, end = relayout_data["xaxis.range[0]"], relayout_data["xaxis.range[1]"]
+    else:
+        return None
+    return pd.Timestamp(start), pd.Timestamp(end)
+
+
 class DashBlueprintFactory:
     dash_url: str = None
 
+    def __init__(self):
+        self._dash = None  # type: Optional[Dash]
+        self._data = None  # type: Optional[BookData]
+        self._is_set_up = False
+        self._setup_lock = threading.Lock()
+
     def create_blueprint(
         self, data: BookData, navigation: OrderedDict, css_folder: str
     ) -> Blueprint:
@@ -27,19 +54,32 @@ class DashBlueprintFactory:
         # cleaner this way, but <dash-name> is only known once this blueprint is registered. Therefore, the wiring
         # happens in `Blueprint.record_once` and the iframe Dash URL is written to the class attribute `dash_url`.
 
+        # Setting up a Dash can take a while, so it is deferred until the Dash is requested for the first time. Its
+        # routes need to be registered right away though, so the Dash is created with an empty placeholder layout.
+
         @bp.record_once
         def on_first_register(state: BlueprintSetupState):
             self.dash_url = state.url_prefix + "/dash/"
-            dash = Dash(
+            self._dash = Dash(
                 server=state.app,
                 assets_folder=css_folder,  # kludgy, but it works
                 url_base_pathname=self.dash_url,
+                compress=False,  # the app takes care of compression
+                # functions of clientside callbacks
+                external_scripts=[state.app.static_url_path + "/js/clientside.js"],
             )
-            self._setup_dash(dash, data)
+            self._dash.layout = html.Div()
+            self._data = data
+
+            @state.app.before_request
+            def set_up_on_first_request():
+                if request.path.startswith(self.dash_url):
+                    self.ensure_setup()
 
         @bp.route("/")
         def root():
             assert self.dash_url is not None
+            self.ensure_setup()
             return render_template(
                 "dash_page.html",
                 dash_url=self.dash_url,
@@ -49,6 +89,23 @@ class DashBlueprintFactory:
 
         return bp
 
+    def ensure_setup(self) -> None:
+        """
+        Set up the Dash unless this has happened already. Safe to call from several threads.
+        """
+        with self._setup_lock:
+            if not self._is_set_up:
+                assert self._dash is not None, "blueprint was not registered yet"
+                self._setup_dash(self._dash, self._data)
+                self._is_set_up = True
+
+    def precompute(self) -> None:
+        """
+        Compute everything ahead of time which would otherwise be computed and cached on first use, so that it can be
+        shared between several worker processes. Only called after the dash was set up.
+        """
+        pass
+
     def _setup_dash(self, dash: Dash, data: BookData) -> None:
         """
         Set up the Dash layout, transform the data, etc.
@@ -1,34 +1,40 @@
-from datetime import datetime
-from typing import List, Optional, Tuple
+import json
+import logging
+from functools import lru_cache
+from typing import List, Optional, Tuple, Dict
+from uuid import uuid4
 
-import anytree
 import dash_core_components as dcc
 import dash_html_components as html
 import numpy as np
 import pandas as pd
-from dash import Dash
-from dash.dependencies import Output, Input, State
-from plotly import graph_objects as go
+from dash import Dash, callback_context, no_update
+from dash.dependencies import ClientsideFunction, Output, Input, State
+from dash.exceptions import PreventUpdate
+from plotly import io as pio
 
-from cashdash.algo.base import SOURCE, TARGET
+from cashdash.algo import BACKENDS, DEFAULT_BACKEND, create_link_reconstructor
+from cashdash.algo.base import SOURCE, TARGET, LinkReconstructor
+from cashdash.algo.rollup import roll_up_links
+from cashdash.algo.tables import PROVISIONAL, SplitTable
 
 from cashdash.dashes.base import DashBlueprintFactory
+from cashdash.jobs import Job, JobCancelled, JobManager, JobQueueFull, SingleFlight
+from cashdash.profiling import PROFILES
+from cashdash.timing import timed
 from cashdash.data import (
     BookData,
-    ACCOUNT,
     NAME,
     TRANSACTION,
     VALUE,
     TYPE,
-    BANK,
-    CASH,
-    ASSET,
     EQUITY,
     DESCRIPTION,
-    LIABILITY,
     DATE,
 )
 
+logger = logging.getLogger(__name__)
+
 # HTML component ids
 SETTINGS_CHECKLIST = "settings-checklist"
 AVERAGING_PICKER = "averaging-picker"
@@ -37,6 +43,21 @@ CASHFLOW_GRAPH = "cashflow-graph"
 ACCOUNT_EXCLUSIONS = "account-exclusions"
 DATE_PICKER_RANGE = "date-picker-range"
 TRANSACTION_EXCLUSIONS = "transaction-exclusions"
+MORE_TRANSACTIONS_BTN = "more-transactions-btn"
+TRANSACTION_PAGES = "transaction-pages"
+CASHFLOW_JOB = "cashflow-job"
+CASHFLOW_DATA = "cashflow-data"
+PROVISIONAL_JOB = "provisional-job"
+JOB_POLL_INTERVAL = "job-poll-interval"
+JOB_PROGRESS = "job-progress"
+HIERARCHY_DEPTH = "hierarchy-depth"
+MIN_FLOW_SHARE = "min-flow-share"
+
+# number of transactions added to the exclusion dropdown at a time
+TRANSACTION_PAGE_SIZE = 100
+
+# how often the page asks for the progress of a running computation, in milliseconds
+POLL_INTERVAL_MS = 500
 
 # additional settings
 MERGE_ASSET_ACCOUNTS = "merge-asset-accounts"
@@ -49,68 +70,124 @@ QUARTERLY = "quarter"
 MONTHLY = "month"
 WEEKLY = "week"
 
+# Minimum share of all money flowing an account needs to get a node of its own, smaller ones are merged into "Other"
+# nodes. This keeps the number of nodes and links of the diagram bounded, however big the book.
+MIN_FLOW_SHARES = [0.0, 0.001, 0.005, 0.01, 0.02, 0.05]
+DEFAULT_MIN_FLOW_SHARE = 0.005
 
-class CashflowDashFactory(DashBlueprintFactory):
+
+@lru_cache()
+def get_template(name: str) -> dict:
     """
-    Sankey diagram of income and expenses.
+    :param name: name of a plotly template
+    :return: the template as plain dictionary, the way `go.Figure` adds it to the layout
     """
+    return pio.templates[name].to_plotly_json()
 
-    def __init__(self, backend: Optional[str]):
-        if backend is None or backend == "cvxpy":
-            from cashdash.algo.cvxpy_links import CvxpyLinkReconstructor
 
-            self.link_reconstructor = CvxpyLinkReconstructor()
-        elif backend == "minizinc":
-            from cashdash.algo.zinc_links import ZincLinkReconstructor
+class CashflowDashFactory(DashBlueprintFactory):
+    """
+    Sankey diagram of income and expenses.
+    """
 
-            self.link_reconstructor = ZincLinkReconstructor()
-        else:
+    def __init__(
+        self, backend: Optional[str], max_jobs: int = 2, max_waiting_jobs: int = 8
+    ):
+        """
+        :param backend: link reconstruction backend, see `cashdash.algo.BACKENDS`
+        :param max_jobs: maximum number of figure updates computed at once
+        :param max_waiting_jobs: maximum number of figure updates waiting to be computed, further ones are rejected
+        """
+        super().__init__()
+        if backend is None:
+            backend = DEFAULT_BACKEND
+        if backend not in BACKENDS:
             raise ValueError(f'Unknown backend "{backend}".')
+        self.backend = backend
+        self.link_reconstructor = None  # type: Optional[LinkReconstructor]
+        self.split_tables = {}  # type: Dict[Tuple[bool, bool], SplitTable]
+        self.jobs = JobManager(max_jobs, max_waiting_jobs)
 
     def get_dash_name(self) -> str:
         return "Cash Flow"
 
-    @staticmethod
-    def _filter_by_date(
-        transactions: pd.DataFrame,
-        splits: pd.DataFrame,
-        start_date: Optional[str],
-        end_date: Optional[str],
-    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
-        # apply date range filtering
-        if start_date is not None:
-            start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
-            transactions = transactions.loc[transactions[DATE] >= start_datetime]
-        if end_date is not None:
-            end_datetime = datetime.strptime(end_date, "%Y-%m-%d")
-            transactions = transactions.loc[transactions[DATE] <= end_datetime]
-        if start_date is not None or end_date is not None:
-            # adjust splits if necessary
-            splits = splits.loc[splits[TRANSACTION].isin(transactions.index)]
-        return transactions, splits
+    def get_split_table(
+        self, fold_asset_accounts: bool, treat_liabilities_as_assets: bool
+    ) -> SplitTable:
+        """
+        :param fold_asset_accounts: the "merge asset accounts" setting
+        :param treat_liabilities_as_assets: the "treat liabilities as assets" setting
+        :return: the splits prepared for these settings, with the links reconstructed so far
+        """
+        self.ensure_setup()
+        return self.split_tables[(fold_asset_accounts, treat_liabilities_as_assets)]
+
+    def precompute(self) -> None:
+        # reconstruct the links of every transaction, for every combination of settings
+        for split_table in self.split_tables.values():
+            split_table.get_links(split_table.splits[TRANSACTION].unique())
 
     @staticmethod
-    def _filter_by_account_blacklist(
-        accounts: pd.DataFrame,
-        transactions: pd.DataFrame,
-        splits: pd.DataFrame,
-        account_blacklist: Optional[List[str]],
-    ):
-        if account_blacklist is not None:
-            accounts = accounts.loc[~accounts.index.isin(account_blacklist)]
+    def _create_busy_alert() -> html.Div:
+        return html.Div(
+            className="alert alert-warning",
+            children="The server is busy, please try again in a moment.",
+        )
 
-        # identify transactions involving those accounts, then remove splits and transactions with those accounts
-        ids_of_transactions_to_drop = splits.loc[
-            ~splits[ACCOUNT].isin(accounts.index), TRANSACTION
-        ]
-        transactions = transactions.loc[
-            ~transactions.index.isin(ids_of_transactions_to_drop)
-        ]
-        splits = splits.loc[splits[TRANSACTION].isin(transactions.index)]
+    @staticmethod
+    def _create_progress_bar(progress: float) -> html.Div:
+        percentage = f"{progress:.0%}"
+        return html.Div(
+            className="progress mb-2",
+            children=html.Div(
+                className="progress-bar progress-bar-striped progress-bar-animated",
+                style={"width": percentage},
+                children=f"Computing cash flow: {percentage}",
+            ),
+        )
 
-        return accounts, transactions, splits
+    @staticmethod
+    def _create_sankey_figure(
+        node_labels: List[str],
+        sources: List[int],
+        targets: List[int],
+        values: List[float],
+        title: str,
+    ) -> dict:
+        """
+        Build the Sankey figure as a plain dictionary. All of its data is generated by this dash, so the validation
+        plotly performs on every element when building a `go.Figure` is skipped, which matters for big diagrams.
+        :param node_labels:
+        :param sources: index of the source node of each link
+        :param targets: index of the target node of each link
+        :param values: value of each link
+        :param title:
+        :return:
+        """
+        return {
+            "data": [
+                {
+                    "type": "sankey",
+                    "node": {
+                        "pad": 15,
+                        "thickness": 20,
+                        "label": node_labels,
+                        "color": "blue",
+                    },
+                    "link": {"source": sources, "target": targets, "value": values},
+                }
+            ],
+            "layout": {
+                "title": {"text": title},
+                "font": {"size": 14},
+                "height": 800,
+                "template": get_template(pio.templates.default),
+            },
+        }
 
     def _setup_dash(self, dash: Dash, data: BookData) -> None:
+        self.link_reconstructor = create_link_reconstructor(self.backend)
+
         # create date range picker
         min_date_allowed = data.transactions[DATE].min().strftime("%Y-%m-%d")
         max_date_allowed = data.transactions[DATE].max().strftime("%Y-%m-%d")
@@ -160,9 +237,27 @@ class CashflowDashFactory(DashBlueprintFactory):
             inputClassName="form-check-input",
         )
 
-        accounts, splits = data.accounts, data.splits
-        accounts_w_transactions = accounts.loc[
-            splits[ACCOUNT].unique(), NAME
+        hierarchy_depth_dropdown = dcc.Dropdown(
+            id=HIERARCHY_DEPTH,
+            options=[
+                {"label": str(depth), "value": depth}
+                for depth in range(1, data.account_tree.depths.max())
+            ],
+            placeholder="All levels",
+        )
+
+        min_flow_share_dropdown = dcc.Dropdown(
+            id=MIN_FLOW_SHARE,
+            options=[
+                {"label": f"{share:.1%}" if share > 0 else "Show all", "value": share}
+                for share in MIN_FLOW_SHARES
+            ],
+            value=DEFAULT_MIN_FLOW_SHARE,
+            clearable=False,
+        )
+
+        accounts_w_transactions = data.accounts.loc[
+            data.get_accounts_with_splits(), NAME
         ].sort_values()
         account_exclusions = dcc.Dropdown(
             id=ACCOUNT_EXCLUSIONS,
@@ -173,7 +268,35 @@ class CashflowDashFactory(DashBlueprintFactory):
             multi=True,
         )
 
-        transaction_exclusions = dcc.Dropdown(id=TRANSACTION_EXCLUSIONS, multi=True)
+        transaction_exclusions = dcc.Dropdown(
+            id=TRANSACTION_EXCLUSIONS,
+            multi=True,
+            placeholder="Largest transactions first, type to search...",
+        )
+        # the largest value of each transaction, to show the largest ones first
+        largest_values = (
+            data.splits[VALUE]
+            .astype(float)
+            .groupby(data.splits[TRANSACTION])
+            .max()
+            .reindex(data.transactions.index)
+            .values
+        )
+        # build the search index right away, so that worker processes share it
+        description_index = data.get_description_index()
+
+        # The "merge asset accounts" and "treat liabilities as assets" settings only depend on the book, so we prepare
+        # the splits for each combination of them once.
+        self.split_tables = {
+            (fold_asset_accounts, treat_liabilities_as_assets): SplitTable(
+                data,
+                self.link_reconstructor,
+                fold_asset_accounts,
+                treat_liabilities_as_assets,
+            )
+            for fold_asset_accounts in (False, True)
+            for treat_liabilities_as_assets in (False, True)
+        }
 
         dash.layout = html.Div(
             className="container-fluid mt-2",
@@ -199,6 +322,26 @@ class CashflowDashFactory(DashBlueprintFactory):
                                     averaging_picker,
                                 ],
                             ),
+                            html.Div(
+                                className="form-group",
+                                children=[
+                                    html.Label(
+                                        "Levels of the account hierarchy",
+                                        htmlFor=HIERARCHY_DEPTH,
+                                    ),
+                                    hierarchy_depth_dropdown,
+                                ],
+                            ),
+                            html.Div(
+                                className="form-group",
+                                children=[
+                                    html.Label(
+                                        "Merge accounts with a smaller share of the cash flow",
+                                        htmlFor=MIN_FLOW_SHARE,
+                                    ),
+                                    min_flow_share_dropdown,
+                                ],
+                            ),
                             html.Div(
                                 className="form-group",
                                 children=[
@@ -217,6 +360,12 @@ class CashflowDashFactory(DashBlueprintFactory):
                                         htmlFor=TRANSACTION_EXCLUSIONS,
                                     ),
                                     transaction_exclusions,
+                                    dcc.Store(id=TRANSACTION_PAGES, data=1),
+                                    html.Button(
+                                        id=MORE_TRANSACTIONS_BTN,
+                                        children="Show more transactions",
+                                        className="btn btn-link btn-sm p-0",
+                                    ),
                                 ],
                             ),
                             html.Div(
@@ -237,7 +386,18 @@ class CashflowDashFactory(DashBlueprintFactory):
                     ),
                     html.Div(
                         className="col-md-9",
-                        children=[dcc.Loading(children=dcc.Graph(id=CASHFLOW_GRAPH))],
+                        children=[
+                            dcc.Store(id=CASHFLOW_JOB),
+                            dcc.Store(id=CASHFLOW_DATA),
+                            dcc.Store(id=PROVISIONAL_JOB),
+                            dcc.Interval(
+                                id=JOB_POLL_INTERVAL,
+                                interval=POLL_INTERVAL_MS,
+                                disabled=True,
+                            ),
+                            html.Div(id=JOB_PROGRESS),
+                            dcc.Graph(id=CASHFLOW_GRAPH),
+                        ],
                     ),
                 ],
             ),
@@ -247,21 +407,30 @@ class CashflowDashFactory(DashBlueprintFactory):
             _: int,
             start_date: Optional[str],
             end_date: Optional[str],
-            average: str,
             checklist_settings: List[str],
             t_exclusions: Optional[List[str]],
             a_exclusions: Optional[List[str]],
-        ) -> go.Figure:
+            max_depth: Optional[int],
+            min_share: Optional[float],
+            job: Optional[Job] = None,
+            approximate: bool = False,
+        ) -> Optional[dict]:
             """
-            Redraw Sankey figure based on all user settings.
+            Compute the Sankey figure based on all user settings but averaging, which is applied in the browser.
             :param _: unused n_clicks value of the "apply" button - only used for triggering this update
             :param start_date:
             :param end_date:
-            :param average:
             :param checklist_settings:
             :param t_exclusions:
             :param a_exclusions:
-            :return:
+            :param max_depth: number of levels of the account hierarchy to show, None for all
+            :param min_share: minimum share of the cash flow an account needs to get a node of its own
+            :param job: optional handle of the background job running this update, to report progress to
+            :param approximate: whether to approximate the links of split transactions which have not been
+                                reconstructed yet, instead of waiting for them
+            :return: the figure with account names as node labels and absolute values, the number of periods covered
+                     by the date range for each averaging option, the date range, and for approximate figures which of
+                     the links are provisional. None for approximate figures if there is nothing to approximate.
             """
             fold_asset_accounts = (
                 checklist_settings is not None
@@ -272,275 +441,316 @@ class CashflowDashFactory(DashBlueprintFactory):
                 and TREAT_LIABILITIES_AS_ASSETS in checklist_settings
             )
 
-            accounts, transactions, splits, hierarchy = (
-                data.accounts,
-                data.transactions,
-                data.splits,
-                data.account_hierarchy,
-            )
-
-            transactions, splits = CashflowDashFactory._filter_by_date(
-                transactions, splits, start_date, end_date
-            )
-
-            # apply transaction exclusion
-            if t_exclusions is not None:
-                transactions = transactions.loc[~transactions.index.isin(t_exclusions)]
-                splits = splits.loc[~splits[TRANSACTION].isin(t_exclusions)]
-
-            if treat_liabilities_as_assets:
-                # find root liability and root asset nodes in hierarchy
-                root_liability_node = anytree.find(
-                    hierarchy,
-                    maxlevel=2,
-                    filter_=lambda n: accounts.at[n.name, TYPE] == LIABILITY,
-                )
-                root_asset_node = anytree.find(
-                    hierarchy,
-                    maxlevel=2,
-                    filter_=lambda n: accounts.at[n.name, TYPE] == ASSET,
-                )
-
-                for node in root_liability_node.descendants:
-                    # change the account type in the accounts dataframe
-                    accounts.at[node.name, TYPE] = ASSET
-
-                for node in root_liability_node.children:
-                    # reparent all its children to the root asset account
-                    node.parent = root_asset_node
-
-            # filter accounts
-            accounts = accounts.loc[~(accounts[TYPE] == EQUITY)]
-            accounts, transactions, splits = self._filter_by_account_blacklist(
-                accounts, transactions, splits, a_exclusions
-            )
-
-            df = splits.merge(accounts, left_on=ACCOUNT, right_index=True)
-
-            if fold_asset_accounts:
-                is_asset_split = df[TYPE].isin([ASSET, CASH, BANK])
-                asset_splits = df.loc[is_asset_split]
-                non_asset_splits = df.loc[~is_asset_split]
-
-                # combine splits of asset accounts into one by summing up their value in each transaction
-                asset_splits_folded = asset_splits.groupby(TRANSACTION, as_index=False)[
-                    [VALUE]
-                ].sum()
-                asset_splits_folded[ACCOUNT] = "00000000000000000000000000000001"
-                dummy_account = pd.Series(
-                    {TYPE: ASSET, NAME: "Assets", DESCRIPTION: "Dummy Asset Account"},
-                    name="00000000000000000000000000000001",
-                )
-                asset_splits_folded = asset_splits_folded.assign(
-                    **dummy_account.to_dict()
+            with timed("cashflow.update_figure.filter"):
+                # transactions in the date range, without excluded transactions and without any transaction involving
+                # equity or excluded accounts
+                query = (
+                    data.query()
+                    .between(start_date, end_date)
+                    .excluding_transactions(t_exclusions or [])
+                    .excluding_transactions_of(
+                        data.accounts.index[data.accounts[TYPE] == EQUITY]
+                    )
+                    .excluding_transactions_of(a_exclusions or [])
                 )
+                transactions = query.transactions()
 
-                # splits of transactions involving only asset accounts will be 0, drop those
-                asset_splits_folded = asset_splits_folded.loc[
-                    asset_splits_folded[VALUE] != 0
+            with timed("cashflow.update_figure.links"):
+                # determine links
+                split_table = self.split_tables[
+                    (fold_asset_accounts, treat_liabilities_as_assets)
                 ]
-
-                # merge with the non-asset splits, and also keep dummy account for later
-                df = pd.concat([asset_splits_folded, non_asset_splits], sort=True)
-                accounts = accounts.append(dummy_account, sort=True)
-
-            # determine links
-            links = []
-            df[VALUE] = df[VALUE].astype(float)
-
-            for guid, splits_of_transaction in df.groupby(TRANSACTION):
-                transaction_links = self.link_reconstructor.reconstruct(
-                    splits_of_transaction
-                )
-                links += transaction_links
-            links = pd.DataFrame(links)
-            # combine all transactions between the same two accounts
-            links = links.groupby([SOURCE, TARGET], as_index=False).sum()
-
-            # apply averaging
-            _, averaging_rule = averaging_options[average]
-            if averaging_rule is not None:
-                # count number of years/quarters/months/... covered by date range
-                num_reference_timespans = len(
-                    transactions.resample(averaging_rule, on=DATE)[DATE].count()
+                accounts = split_table.accounts
+                if (
+                    approximate
+                    and split_table.get_unsolved_transactions(transactions.index).empty
+                ):
+                    return None
+                links = split_table.get_links(
+                    transactions.index,
+                    on_progress=None if job is None else job.report_progress,
+                    approximate=approximate,
                 )
-                links[VALUE] = links[VALUE] / num_reference_timespans
-
-            show_account_hierarchy = True
-            if show_account_hierarchy:
-                new_links = pd.DataFrame(columns=links.columns)
-                for idx, row in links.iterrows():
-                    # find node of target account in account hierarchy
-                    target_node = anytree.find(
-                        hierarchy, lambda n: n.name == row[TARGET]
-                    )
-
-                    if target_node is None:
-                        # leave links with the dummy asset account as target the way they are
-                        assert fold_asset_accounts
-                        new_links = new_links.append(row, ignore_index=True)
-                        continue
 
-                    # trim the earliest two ancestors to get rid of the root account and the root expense/income/liability account
-                    ancestors = [n.name for n in target_node.ancestors[2:]]
-                    nodes = [row[SOURCE], *ancestors, row[TARGET]]
+            with timed("cashflow.update_figure.aggregate"):
+                # combine all transactions between the same two accounts
+                links = links.groupby([SOURCE, TARGET], as_index=False).sum()
 
-                    for source, target in zip(nodes, nodes[1:]):
-                        # add or update the new link in the links dataframe
-                        filter = (new_links[SOURCE] == source) & (
-                            new_links[TARGET] == target
+                # count number of years/quarters/months/... covered by date range, for averaging in the browser
+                averaging = {}
+                for average, (description, rule) in averaging_options.items():
+                    if rule is not None:
+                        num_periods = len(
+                            transactions.resample(rule, on=DATE)[DATE].count()
                         )
-                        if new_links.loc[filter].empty:
-                            new_links = new_links.append(
-                                pd.Series(
-                                    {SOURCE: source, TARGET: target, VALUE: row[VALUE]}
-                                ),
-                                ignore_index=True,
-                            )
-                        else:
-                            new_links.loc[filter, VALUE] += row[VALUE]
-                links = new_links
-
-            # Create label for each node: account name and sum of money involved. Particularly for asset accounts, the
-            # incoming amount of money must not equal the outgoing amount of money (people may save money or may make
-            # bigger purchases with saved money). To make sense in the plot, the sum of money shown for an account
-            # therefore needs to be the maximum of either incoming or outgoing money for each account.
-            sum_of_targets = links.groupby(TARGET).sum()
-            sum_of_sources = links.groupby(SOURCE).sum()
-            sum_per_account = pd.concat(
-                [sum_of_targets, sum_of_sources], axis=1, sort=True
-            ).max(axis=1)
-            # if there are small values keep two decimals, otherwise round to int
-            if sum_per_account.loc[sum_per_account < 1].empty:
-                sum_per_account = sum_per_account.round(0).astype(int).astype(str)
-            else:
-                sum_per_account = sum_per_account.round(2).map(
-                    lambda v: "{0:.2f}".format(v)
+                        averaging[average] = {
+                            "description": description,
+                            "num_periods": num_periods,
+                        }
+
+            with timed("cashflow.update_figure.hierarchy"):
+                # route links through the account hierarchy, merging deep accounts and accounts with little flow
+                links, node_labels = roll_up_links(
+                    links,
+                    data.account_tree,
+                    accounts[NAME],
+                    max_depth,
+                    min_share or 0.0,
                 )
-            # create final label
-            sum_per_account = sum_per_account.to_frame(VALUE).merge(
-                accounts[NAME], left_index=True, right_index=True
-            )
-            node_labels = sum_per_account.apply(
-                lambda row: row[NAME] + ": " + row[VALUE], axis=1
-            )  # TODO locale-specific formatting?
-
-            # convert account GUIDs to int-based indices
-            accounts_numbered = pd.Series(
-                np.arange(len(sum_per_account)), index=sum_per_account.index
-            )
-            links[SOURCE] = links[SOURCE].map(accounts_numbered)
-            links[TARGET] = links[TARGET].map(accounts_numbered)
-
-            # generate a speaking title for the figure
-            figure_title_parts = []
-            if not average == ABSOLUTE:
-                averaging_description, _ = averaging_options[average]
-                figure_title_parts.append(averaging_description + "ly")
-            figure_title_parts.append("cash flow")
-            if start_date is not None:
-                figure_title_parts.append(f"from {start_date}")
-            if end_date is not None:
-                figure_title_parts.append("to" if start_date is not None else "until")
-                figure_title_parts.append(end_date)
-            figure_title = " ".join(figure_title_parts).capitalize()
-
-            fig = go.Figure(
-                data=[
-                    go.Sankey(
-                        node=dict(
-                            pad=15,
-                            thickness=20,
-                            # line=dict(color="black", width=0.5),
-                            label=node_labels,
-                            color="blue",
-                        ),
-                        link=dict(
-                            source=links[SOURCE],
-                            target=links[TARGET],
-                            value=links[VALUE],
-                        ),
-                    )
-                ],
-                layout_title_text=figure_title,
-            )
 
-            fig.update_layout(font_size=14, height=800)
+            with timed("cashflow.update_figure.nodes"):
+                # Nodes are labelled with their account name and the sum of money involved, which depends on averaging
+                # and is therefore added in the browser.
+                nodes_numbered = pd.Series(
+                    np.arange(len(node_labels)), index=node_labels.index
+                )
+                sources = links[SOURCE].map(nodes_numbered).values.astype(int)
+                targets = links[TARGET].map(nodes_numbered).values.astype(int)
+                values = links[VALUE].values.astype(float).round(2)
+                provisional = None
+                if approximate:
+                    provisional = (links[PROVISIONAL].values > 0).tolist()
+
+            with timed("cashflow.update_figure.figure"):
+                figure = self._create_sankey_figure(
+                    node_labels.tolist(),
+                    sources.tolist(),
+                    targets.tolist(),
+                    values.tolist(),
+                    title="",
+                )
+                return {
+                    "figure": figure,
+                    "averaging": averaging,
+                    "start_date": start_date,
+                    "end_date": end_date,
+                    "provisional": provisional,
+                }
+
+        def update_transaction_pages(
+            search_value: Optional[str], n_clicks: Optional[int], num_pages: int
+        ) -> int:
+            """
+            Show one more page of transactions to exclude when asked to, start over with one page for each new search.
+            Every update triggers `update_transaction_exclusions`, even if the number of pages stays the same, so this
+            is also how a new search reaches it.
+            :param search_value: search text typed into the transaction dropdown
+            :param n_clicks: n_clicks value of the "show more" button
+            :param num_pages: number of pages shown so far
+            :return: number of pages to show
+            """
+            triggered = [t["prop_id"] for t in callback_context.triggered]
+            if f"{MORE_TRANSACTIONS_BTN}.n_clicks" in triggered:
+                return num_pages + 1
+            return 1
 
-            return fig
+        dash.callback(
+            Output(TRANSACTION_PAGES, "data"),
+            [
+                Input(TRANSACTION_EXCLUSIONS, "search_value"),
+                Input(MORE_TRANSACTIONS_BTN, "n_clicks"),
+            ],
+            [State(TRANSACTION_PAGES, "data")],
+        )(update_transaction_pages)
 
         def update_transaction_exclusions(
-            start_date: str, end_date: str, a_exclusions: Optional[List[str]]
+            start_date: str,
+            end_date: str,
+            a_exclusions: Optional[List[str]],
+            num_pages: int,
+            search_value: Optional[str],
+            t_exclusions: Optional[List[str]],
         ):
             """
-            Update the list of transactions users can exclude based on the current date range and already excluded
-            accounts.
+            Update the list of transactions users can exclude based on the current date range, already excluded
+            accounts and the search text, largest transactions first.
             :param start_date:
             :param end_date:
             :param a_exclusions:
-            :return:
+            :param num_pages: number of pages of transactions to offer, updated with every change of the search text
+            :param search_value: search text typed into the transaction dropdown, matched against descriptions
+            :param t_exclusions: already excluded transactions, which stay in the list
+            :return: dropdown options, and whether there are no more transactions to show
             """
-            accounts, transactions, splits = (
-                data.accounts,
-                data.transactions,
-                data.splits,
-            )
-            transactions, splits = CashflowDashFactory._filter_by_date(
-                transactions, splits, start_date, end_date
-            )
-
-            _, transactions, splits = self._filter_by_account_blacklist(
-                accounts, transactions, splits, a_exclusions
-            )
-
-            # determine the largest transaction candidates a user may want to exclude
-            NUM_TRANSACTIONS = 100
-            candidates = (
-                splits.groupby(TRANSACTION)[VALUE]
-                .max()
-                .sort_values(ascending=False)
-                .iloc[:NUM_TRANSACTIONS]
-            )
-            candidates = candidates.to_frame(VALUE).merge(
-                transactions, left_index=True, right_index=True
-            )
-
-            candidates[VALUE] = (
-                candidates[VALUE]
-                .astype(float)
-                .round(2)
-                .map(lambda v: "{0:.2f}".format(v))
-            )
-            candidates["label"] = (
-                candidates[DESCRIPTION] + " (" + candidates[VALUE] + ")"
-            )
-
-            options = (
-                candidates.reset_index()[["index", "label"]]
-                .rename({"index": "value"}, axis="columns")
-                .to_dict("records")
-            )
+            with timed("cashflow.update_transaction_exclusions.filter"):
+                positions = (
+                    data.query()
+                    .between(start_date, end_date)
+                    .excluding_transactions_of(a_exclusions or [])
+                    .transaction_positions()
+                )
+                if search_value:
+                    positions = positions[
+                        description_index.search(search_value)[positions]
+                    ]
+
+            with timed("cashflow.update_transaction_exclusions.candidates"):
+                # offer the largest transactions first
+                num_candidates = TRANSACTION_PAGE_SIZE * num_pages
+                order = np.argsort(-largest_values[positions], kind="stable")
+                candidate_positions = positions[order[:num_candidates]]
+                if t_exclusions:
+                    # keep excluded transactions in the list, otherwise the dropdown would lose their labels
+                    excluded = data.transactions.index.get_indexer(t_exclusions)
+                    excluded = excluded[~np.isin(excluded, candidate_positions)]
+                    candidate_positions = np.concatenate(
+                        [excluded[excluded >= 0], candidate_positions]
+                    )
 
-            return options
+                candidates = data.transactions.iloc[candidate_positions]
+                values = np.char.mod("%.2f", largest_values[candidate_positions])
+                labels = candidates[DESCRIPTION] + " (" + values + ")"
+                options = [
+                    {"value": v, "label": l} for v, l in zip(candidates.index, labels)
+                ]
+                return options, len(positions) <= num_candidates
 
         dash.callback(
-            Output(TRANSACTION_EXCLUSIONS, "options"),
+            [
+                Output(TRANSACTION_EXCLUSIONS, "options"),
+                Output(MORE_TRANSACTIONS_BTN, "disabled"),
+            ],
             [
                 Input(DATE_PICKER_RANGE, "start_date"),
                 Input(DATE_PICKER_RANGE, "end_date"),
                 Input(ACCOUNT_EXCLUSIONS, "value"),
+                Input(TRANSACTION_PAGES, "data"),
+            ],
+            [
+                State(TRANSACTION_EXCLUSIONS, "search_value"),
+                State(TRANSACTION_EXCLUSIONS, "value"),
             ],
         )(update_transaction_exclusions)
 
+        # Identical updates running at the same time, e.g. started from several tabs, share one computation. If the job
+        # computing it is cancelled, one of the waiting jobs takes over.
+        figure_flights = SingleFlight(retry_on=(JobCancelled,))
+
+        def run_figure_update(job: Job, update_args: list) -> dict:
+            # runs in a thread of the job manager, so it is profiled separately from the callback starting it
+            _, *settings = update_args
+            with PROFILES.profile("cashflow update_figure"):
+                # approximating links takes a few array operations, so there is something to show right away
+                figure_data = update_figure(*update_args, approximate=True)
+                if figure_data is not None:
+                    job.publish(figure_data)
+                return figure_flights.do(
+                    json.dumps(settings, sort_keys=True),
+                    lambda: update_figure(*update_args, job=job),
+                    job.raise_if_cancelled,
+                )
+
+        def start_figure_update(n_clicks: int, *args) -> dict:
+            """
+            Start redrawing the Sankey figure in the background. A computation still running for previous settings of
+            the same page is cancelled.
+            :param n_clicks: n_clicks value of the "apply" button
+            :param args: user settings as passed to `update_figure`, followed by the job of the previous update
+            :return: ID of the new job (None if the server is busy), the arguments of `update_figure` and the session of
+                     the page
+            """
+            *settings, previous_job = args
+            # the page keeps its session from one update to the next
+            session = (
+                previous_job["session"] if previous_job is not None else uuid4().hex
+            )
+
+            update_args = [n_clicks, *settings]
+            try:
+                job = self.jobs.submit(
+                    lambda job: run_figure_update(job, update_args), session=session
+                )
+            except JobQueueFull:
+                return {"id": None, "args": update_args, "session": session}
+            return {"id": job.job_id, "args": update_args, "session": session}
+
+        def poll_figure_update(
+            _: int, job_info: Optional[dict], provisional_job: Optional[str]
+        ):
+            """
+            Report the progress of the running figure update, or hand out the figure data once it is done. While the
+            update is running, the provisional figure the job publishes, with approximate links for split transactions,
+            is handed out once.
+            :param _: unused n_intervals value of the poll interval - only used for triggering this update
+            :param job_info: ID and arguments of the running job, and the session of the page
+            :param provisional_job: ID of the job a provisional figure has been handed out for
+            :return: figure data, progress bar, whether to stop polling and the job a provisional figure was handed out
+                     for
+            """
+            if job_info is None:
+                raise PreventUpdate
+            if job_info["id"] is None:
+                return no_update, self._create_busy_alert(), True, no_update
+
+            job = self.jobs.get(job_info["id"])
+            if job is None:
+                # With several server processes, the job may have been started by a different one. Computations are
+                # deterministic, so the job is simply started again in this process.
+                try:
+                    job = self.jobs.submit(
+                        lambda job: run_figure_update(job, job_info["args"]),
+                        job_id=job_info["id"],
+                        session=job_info["session"],
+                    )
+                except JobCancelled:
+                    # superseded by a newer job, or its figure has been handed out already
+                    raise PreventUpdate
+                except JobQueueFull:
+                    return no_update, self._create_busy_alert(), True, no_update
+
+            if not job.future.done():
+                progress_bar = self._create_progress_bar(job.progress)
+                figure_data = job.preliminary_result
+                if figure_data is None or provisional_job == job.job_id:
+                    return no_update, progress_bar, False, no_update
+                return figure_data, progress_bar, False, job.job_id
+            if job.future.cancelled() or isinstance(
+                job.future.exception(), JobCancelled
+            ):
+                # superseded by a newer job, which takes care of the figure
+                raise PreventUpdate
+            # the result is only handed out once, a later poll for the job does not update anything
+            self.jobs.forget(job.job_id)
+            if job.future.exception() is not None:
+                logger.error(
+                    "Computing the cash flow failed.", exc_info=job.future.exception()
+                )
+                error = html.Div(
+                    className="alert alert-danger",
+                    children="Computing the cash flow failed.",
+                )
+                return no_update, error, True, no_update
+            return job.future.result(), [], True, no_update
+
         dash.callback(
-            Output(CASHFLOW_GRAPH, "figure"),
+            Output(CASHFLOW_JOB, "data"),
             [Input(APPLY_BTN, "n_clicks")],
             [
                 State(DATE_PICKER_RANGE, "start_date"),
                 State(DATE_PICKER_RANGE, "end_date"),
-                State(AVERAGING_PICKER, "value"),
                 State(SETTINGS_CHECKLIST, "value"),
                 State(TRANSACTION_EXCLUSIONS, "value"),
                 State(ACCOUNT_EXCLUSIONS, "value"),
+                State(HIERARCHY_DEPTH, "value"),
+                State(MIN_FLOW_SHARE, "value"),
+                State(CASHFLOW_JOB, "data"),
+            ],
+        )(start_figure_update)
+
+        dash.callback(
+            [
+                Output(CASHFLOW_DATA, "data"),
+                Output(JOB_PROGRESS, "children"),
+                Output(JOB_POLL_INTERVAL, "disabled"),
+                Output(PROVISIONAL_JOB, "data"),
             ],
-        )(update_figure)
+            [Input(JOB_POLL_INTERVAL, "n_intervals"), Input(CASHFLOW_JOB, "data")],
+            [State(PROVISIONAL_JOB, "data")],
+        )(poll_figure_update)
+
+        # averaging only scales the figure, which is done in the browser right away
+        dash.clientside_callback(
+            ClientsideFunction(namespace="cashflow", function_name="render_figure"),
+            Output(CASHFLOW_GRAPH, "figure"),
+            [Input(CASHFLOW_DATA, "data"), Input(AVERAGING_PICKER, "value")],
+        )
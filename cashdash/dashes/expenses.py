@@ -1,27 +1,78 @@
+import json
+from typing import Optional, Dict, List
+
 import dash_core_components as dcc
 import dash_html_components as html
+import numpy as np
 import pandas as pd
-from anytree import PostOrderIter
-from anytree.search import find
 from dash import Dash
-from dash.dependencies import Output, Input
+from dash.dependencies import ClientsideFunction, Output, Input
 from plotly import graph_objects as go
 
 from cashdash.dashes.base import DashBlueprintFactory
+from cashdash.jobs import SingleFlight
+from cashdash.timing import timed
 from cashdash.data import (
     BookData,
     TYPE,
-    ACCOUNT,
     NAME,
-    TRANSACTION,
-    DATE,
-    VALUE,
     EXPENSE,
 )
 
 EXPENSES_GRAPH = "expenses-graph"
 DATE_AGGREGATION = "date-aggregation"
 ACCOUNTS_SELECTION = "accounts-selection"
+EXPENSES_DATA = "expenses-data"
+
+# maximum number of bars per account drawn by the browser, which sums up the days of each bar if there are more
+NUM_BARS = 250
+
+
+def compute_expense_subtree_totals(data: BookData) -> pd.DataFrame:
+    """
+    Compute the daily expenses of each expense account, including the expenses of all expense accounts in its subtree.
+    :param data:
+    :return: dataframe with one row per day and one column per expense account (GUID)
+    """
+    accounts, account_tree = data.accounts, data.account_tree
+
+    # expense accounts in pre-order
+    is_expense = (accounts.loc[account_tree.guids, TYPE] == EXPENSE).values
+    expense_positions = np.flatnonzero(is_expense)
+    expense_accounts = account_tree.guids[expense_positions]
+
+    # Aggregate by day, doesn't make much sense to go any more fine-grained because the finest that GnuCash goes are
+    # days. This gives us one column per expense account.
+    daily_expenses = (
+        data.query()
+        .of_accounts(expense_accounts)
+        .sum_by_period("D")
+        .reindex(columns=expense_accounts, fill_value=0)
+    )
+
+    # Roll up the expenses of each account into its closest ancestor which is an expense account. Going from the
+    # deepest accounts to the top, every account has received the totals of all its descendants by the time it is
+    # rolled up itself.
+    closest_expense_ancestor = np.full(len(account_tree.guids), -1)
+    for position in range(1, len(account_tree.guids)):
+        parent = account_tree.parents[position]
+        closest_expense_ancestor[position] = (
+            parent if is_expense[parent] else closest_expense_ancestor[parent]
+        )
+    column_of_position = np.full(len(account_tree.guids), -1)
+    column_of_position[expense_positions] = np.arange(len(expense_positions))
+    parent_columns = column_of_position[closest_expense_ancestor[expense_positions]]
+    parent_columns[closest_expense_ancestor[expense_positions] == -1] = -1
+
+    totals = daily_expenses.values.copy()
+    depths = account_tree.depths[expense_positions]
+    for depth in range(depths.max(), 0, -1):
+        columns = np.flatnonzero((depths == depth) & (parent_columns != -1))
+        np.add.at(totals.T, parent_columns[columns], totals.T[columns])
+
+    return pd.DataFrame(
+        totals, index=daily_expenses.index, columns=daily_expenses.columns
+    )
 
 
 class ExpensesDashFactory(DashBlueprintFactory):
@@ -33,31 +84,31 @@ class ExpensesDashFactory(DashBlueprintFactory):
         return "Expenses"
 
     def _setup_dash(self, dash: Dash, data: BookData):
-        accounts, transactions, splits = data.accounts, data.transactions, data.splits
+        accounts = data.accounts
+        subtree_totals = compute_expense_subtree_totals(data)
+
+        # All expense accounts with at least one transaction are included in the account dropdown. All inner accounts
+        # in the hierarchy where at least one child account is included are included as well.
+        account_tree = data.account_tree
+        is_expense = (accounts.loc[account_tree.guids, TYPE] == EXPENSE).values
+        has_transactions = account_tree.guids.isin(data.get_accounts_with_splits())
+        is_included = account_tree.propagate_to_ancestors(
+            has_transactions & is_expense, mask=is_expense
+        )
 
-        # Iterate over the account tree to create the account dropdown options.
+        # list accounts in reverse post-order, so that parents come before their children
         account_dropdown_options = []
-        visited = set()
-        is_expense_acc = lambda node: data.accounts.at[node.name, TYPE] == EXPENSE
-        for node in PostOrderIter(data.account_hierarchy, filter_=is_expense_acc):
-            guid = node.name
-            account_has_transactions = len(splits.loc[splits[ACCOUNT] == guid]) > 0
-
-            # All leaf accounts with at least one transaction are included. All inner accounts in the hierarchy where
-            # at least one child account has a transaction are included as well.
-            if account_has_transactions or any(
-                child in visited for child in node.children
-            ):
-                # kludge for indenting accounts which are deeper in the hierarchy via non-breaking spaces
-                option = {
-                    "label": u"\u00a0\u00a0" * (node.depth - 1)
-                    + accounts.at[guid, NAME],
-                    "value": guid,
-                }
-                account_dropdown_options.append(option)
-                visited.add(node)
-        # reverse options to negate post-order traversal
-        account_dropdown_options = account_dropdown_options[::-1]
+        for position in account_tree.get_post_order()[::-1]:
+            if not is_included[position]:
+                continue
+            guid = account_tree.guids[position]
+            # kludge for indenting accounts which are deeper in the hierarchy via non-breaking spaces
+            option = {
+                "label": u"\u00a0\u00a0" * (account_tree.depths[position] - 1)
+                + accounts.at[guid, NAME],
+                "value": guid,
+            }
+            account_dropdown_options.append(option)
 
         account_dropdown = dcc.Dropdown(
             id=ACCOUNTS_SELECTION, options=account_dropdown_options, multi=True
@@ -100,71 +151,19 @@ class ExpensesDashFactory(DashBlueprintFactory):
                     ),
                     html.Div(
                         className="col-md-9",
-                        children=[dcc.Loading(children=dcc.Graph(id=EXPENSES_GRAPH))],
+                        children=[
+                            dcc.Store(id=EXPENSES_DATA),
+                            dcc.Loading(children=dcc.Graph(id=EXPENSES_GRAPH)),
+                        ],
                     ),
                 ],
             ),
         )
 
-        def update(date_aggregation, selected_accounts) -> go.Figure:
-            date_settings = {
-                "Day": ("D", "%d.%m.%y"),
-                "Week": ("W", "W%W %Y"),
-                "Month": ("MS", "%B %y"),
-                "Quarter": ("Q", "Q%q %Y"),
-                "Year": ("Y", "%Y"),
-                "Decade": ("10Y", "%Y"),
-            }
-            # TODO ticks for anything but month are still off
-            rule, tick_format = date_settings[date_aggregation]
-
-            # set up one set of bars for each selected account
-            bars = []
-            if selected_accounts:
-                for account in selected_accounts:
-                    # For any selected account, we want to sum up the transactions of the account's subtree in the
-                    # account hierarchy.
-                    subtree_transactions = []
-                    # Identify the node corresponding to the account:
-                    account_node = find(
-                        data.account_hierarchy,
-                        filter_=lambda node: node.name == account,
-                    )
-                    for subaccount_node in PostOrderIter(
-                        account_node, filter_=is_expense_acc
-                    ):
-                        # Obtain splits of this subaccount, merge with transactions to obtain date information
-                        splits_of_subaccount = splits.loc[
-                            splits[ACCOUNT] == subaccount_node.name
-                        ]
-                        transactions_of_subaccount = splits_of_subaccount.merge(
-                            transactions, left_on=TRANSACTION, right_index=True
-                        )
-                        subtree_transactions.append(transactions_of_subaccount)
-                    subtree_transactions = pd.concat(subtree_transactions)
-
-                    # Aggregate by day per default, doesn't make much sense to go any more fine-grained because the
-                    # finest that sample_books goes are days
-                    transactions_per_day = subtree_transactions.groupby(DATE).sum()
-                    # Apply aggregation to weeks, months, etc.
-                    transactions_resampled = (
-                        transactions_per_day[VALUE].resample(rule).sum()
-                    )
-
-                    account_name = accounts.at[account, NAME]
-                    bars.append(
-                        go.Bar(
-                            x=transactions_resampled.index.to_pydatetime(),
-                            y=transactions_resampled.values,
-                            name=account_name,
-                        )
-                    )
-
-            fig = go.Figure(layout_title_text="Expenses over time")
-            for bar in bars:
-                fig.add_trace(bar)
-
-            fig.update_layout(
+        # the layout of the figure only depends on the date aggregation through its tick format, set in the browser
+        layout = go.Figure(
+            layout=dict(
+                title_text="Expenses over time",
                 barmode="stack",
                 yaxis=go.layout.YAxis(ticksuffix="€"),
                 # Add range slider
@@ -185,7 +184,10 @@ class ExpensesDashFactory(DashBlueprintFactory):
                                     stepmode="backward",
                                 ),
                                 dict(
-                                    count=1, label="YTD", step="year", stepmode="todate"
+                                    count=1,
+                                    label="YTD",
+                                    step="year",
+                                    stepmode="todate",
                                 ),
                                 dict(
                                     count=1,
@@ -199,13 +201,67 @@ class ExpensesDashFactory(DashBlueprintFactory):
                     ),
                     rangeslider=dict(visible=True),
                     type="date",
-                    tickformat=tick_format,
                     tickson="boundaries",
                 ),
+                # keep the user's zoom level when the figure is updated
+                uirevision=EXPENSES_GRAPH,
             )
-            return fig
+        ).to_plotly_json()["layout"]
+        # TODO ticks for anything but month are still off
+        tick_formats = {
+            "Day": "%d.%m.%y",
+            "Week": "W%W %Y",
+            "Month": "%B %y",
+            "Quarter": "Q%q %Y",
+            "Year": "%Y",
+            "Decade": "%Y",
+        }
+
+        def update_data(selected_accounts: Optional[List[str]]) -> Dict:
+            """
+            Send the daily expenses of the selected accounts to the browser, which sums them up per week, month, etc.
+            and draws the figure. Every day with expenses is sent, i.e. the data grows with the length of the book
+            rather than with the number of bars drawn. In return, changing the aggregation or zooming in does not
+            involve the server.
+            :param selected_accounts:
+            :return: layout and tick formats of the figure, the days, names of the selected accounts and their daily
+                     expenses, and the maximum number of bars per account
+            """
+            with timed("expenses.update_data.select"):
+                # For any selected account, we want the sum of the transactions of the account's subtree in the account
+                # hierarchy.
+                selected_accounts = selected_accounts or []
+                expenses = subtree_totals[selected_accounts]
+                days = expenses.index.values.astype("datetime64[D]").astype(np.int64)
+
+            with timed("expenses.update_data.serialize"):
+                return {
+                    "layout": layout,
+                    "tick_formats": tick_formats,
+                    "num_bars": NUM_BARS,
+                    "days": days.tolist(),
+                    "names": accounts.loc[selected_accounts, NAME].tolist(),
+                    "values": expenses.values.T.tolist(),
+                }
+
+        # identical updates running at the same time, e.g. started from several tabs, share one computation
+        flights = SingleFlight()
+
+        def update_data_once(selected_accounts: Optional[List[str]]) -> Dict:
+            key = json.dumps(selected_accounts)
+            return flights.do(key, lambda: update_data(selected_accounts))
 
         dash.callback(
+            Output(EXPENSES_DATA, "data"), [Input(ACCOUNTS_SELECTION, "value")]
+        )(update_data_once)
+
+        # aggregating dates, downsampling for the visible range and drawing happen in the browser
+        dash.clientside_callback(
+            ClientsideFunction(namespace="expenses", function_name="render_figure"),
             Output(EXPENSES_GRAPH, "figure"),
-            [Input(DATE_AGGREGATION, "value"), Input(ACCOUNTS_SELECTION, "value")],
-        )(update)
+            [
+                Input(EXPENSES_DATA, "data"),
+                Input(DATE_AGGREGATION, "value"),
+                Input(EXPENSES_GRAPH, "relayoutData"),
+            ],
+        )
@@ -1,8 +1,17 @@
-from dataclasses import dataclass
-from typing import Optional
+from __future__ import annotations
 
-import anytree
-import pandas as pd
+from dataclasses import dataclass, field
+from typing import Optional, TYPE_CHECKING
+
+# only needed for type hints here, importing them right away would make importing this package slow
+if TYPE_CHECKING:
+    import anytree
+    import pandas as pd
+
+    from cashdash.data.balances import BalanceIndex
+    from cashdash.data.hierarchy import AccountTree
+    from cashdash.data.query import IndexedSplits, SplitQuery
+    from cashdash.data.search import DescriptionIndex
 
 # dataframe columns
 TYPE = "type"
@@ -30,6 +39,74 @@ class BookData:
     transactions: pd.DataFrame
     splits: pd.DataFrame
     account_hierarchy: anytree.Node
+    account_tree: AccountTree = field(init=False, repr=False, compare=False)
+    _accounts_with_splits: Optional[pd.Index] = field(
+        init=False, default=None, repr=False, compare=False
+    )
+    _balance_index: Optional[BalanceIndex] = field(
+        init=False, default=None, repr=False, compare=False
+    )
+    _indexed_splits: Optional[IndexedSplits] = field(
+        init=False, default=None, repr=False, compare=False
+    )
+    _description_index: Optional[DescriptionIndex] = field(
+        init=False, default=None, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        from cashdash.data.hierarchy import AccountTree
+
+        self.account_tree = AccountTree.from_hierarchy(self.account_hierarchy)
+
+    def get_accounts_with_splits(self) -> pd.Index:
+        """
+        Return the GUIDs of all accounts with at least one split, in order of their first split. Computed once and
+        shared between all dashes.
+        :return:
+        """
+        if self._accounts_with_splits is None:
+            import pandas as pd
+
+            self._accounts_with_splits = pd.Index(self.splits[ACCOUNT].unique())
+        return self._accounts_with_splits
+
+    def get_balance_index(self) -> BalanceIndex:
+        """
+        Return the index of account balances over time. Built once and shared between all dashes.
+        :return:
+        """
+        if self._balance_index is None:
+            from cashdash.data.balances import BalanceIndex
+
+            self._balance_index = BalanceIndex.from_splits(
+                self.account_tree, self.transactions, self.splits
+            )
+        return self._balance_index
+
+    def query(self) -> SplitQuery:
+        """
+        Return a lazy query over all splits of the book, see `SplitQuery`. The splits are indexed once and shared between
+        all dashes, along with the results of previous queries.
+        :return:
+        """
+        from cashdash.data.query import IndexedSplits, SplitQuery
+
+        if self._indexed_splits is None:
+            self._indexed_splits = IndexedSplits.from_book(
+                self.account_tree, self.accounts, self.transactions, self.splits
+            )
+        return SplitQuery(self._indexed_splits)
+
+    def get_description_index(self) -> DescriptionIndex:
+        """
+        Return the index for searching transactions by description. Built once and shared between all dashes.
+        :return:
+        """
+        if self._description_index is None:
+            from cashdash.data.search import DescriptionIndex
+
+            self._description_index = DescriptionIndex(self.transactions[DESCRIPTION])
+        return self._description_index
 
     def remove_book_closing_transactions(self):
         equity_accounts = self.accounts.loc[self.accounts[TYPE] == EQUITY]
@@ -44,6 +121,10 @@ class BookData:
         self.splits = self.splits.loc[
             ~(self.splits[TRANSACTION].isin(transactions_with_equity))
         ]
+        self._accounts_with_splits = None
+        self._balance_index = None
+        self._indexed_splits = None
+        self._description_index = None
 
 
 class FileBasedBookDataReader:
@@ -0,0 +1,152 @@
+from dataclasses import dataclass
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from cashdash.data import ACCOUNT, DATE, TRANSACTION, VALUE
+from cashdash.data.hierarchy import AccountTree
+
+
+@dataclass(eq=False)
+class PrefixSums:
+    """
+    Dated values grouped by account position and sorted by date within each account, with the running sum of each
+    account. The values of the account at position `i` are at positions `starts[i]` (inclusive) to `starts[i + 1]`
+    (exclusive).
+    """
+
+    starts: np.ndarray
+    dates: np.ndarray
+    sums: np.ndarray
+
+    @staticmethod
+    def build(
+        positions: np.ndarray, dates: np.ndarray, values: np.ndarray, num_accounts: int
+    ) -> "PrefixSums":
+        order = np.lexsort((dates, positions))
+        positions, dates, values = positions[order], dates[order], values[order]
+        starts = np.searchsorted(positions, np.arange(num_accounts + 1))
+
+        # running sum over all accounts, restarted at the first value of each account
+        sums = np.cumsum(values)
+        sums_before_account = np.concatenate([[0.0], sums])[starts[:-1]]
+        sums -= np.repeat(sums_before_account, np.diff(starts))
+        return PrefixSums(starts, dates, sums)
+
+    def at(self, position: int, dates: np.ndarray) -> np.ndarray:
+        """
+        :param position: account position
+        :param dates: sorted or unsorted datetime64 values
+        :return: sum of all values of the account up to and including each date
+        """
+        start, end = self.starts[position], self.starts[position + 1]
+        if start == end:
+            return np.zeros(len(dates))
+        counts = np.searchsorted(self.dates[start:end], dates, side="right")
+        return np.where(counts > 0, self.sums[start + counts - 1], 0.0)
+
+
+@dataclass(eq=False)
+class BalanceIndex:
+    """
+    Balance of every account at any point in time, each looked up with a binary search. Balances of accounts include
+    either their own splits only, or the splits of all accounts in their subtree of the account hierarchy.
+    """
+
+    account_tree: AccountTree
+    own: PrefixSums
+    subtree: PrefixSums
+
+    @staticmethod
+    def from_splits(
+        account_tree: AccountTree, transactions: pd.DataFrame, splits: pd.DataFrame
+    ) -> "BalanceIndex":
+        num_accounts = len(account_tree.guids)
+        positions = account_tree.guids.get_indexer(splits[ACCOUNT])
+        dates = (
+            transactions[DATE]
+            .values[transactions.index.get_indexer(splits[TRANSACTION])]
+            .astype("datetime64[ns]")
+        )
+        values = splits[VALUE].astype(float).values
+        own = PrefixSums.build(positions, dates, values, num_accounts)
+
+        # every split also counts towards the balance of each ancestor of its account
+        all_positions, all_dates, all_values = [positions], [dates], [values]
+        while len(positions) > 0:
+            positions = account_tree.parents[positions]
+            is_account = positions >= 0
+            positions, dates, values = (
+                positions[is_account],
+                dates[is_account],
+                values[is_account],
+            )
+            all_positions.append(positions)
+            all_dates.append(dates)
+            all_values.append(values)
+        subtree = PrefixSums.build(
+            np.concatenate(all_positions),
+            np.concatenate(all_dates),
+            np.concatenate(all_values),
+            num_accounts,
+        )
+        return BalanceIndex(account_tree, own, subtree)
+
+    def _prefix_sums(self, include_subtree: bool) -> PrefixSums:
+        return self.subtree if include_subtree else self.own
+
+    def _get_positions(self, accounts: pd.Index) -> np.ndarray:
+        """
+        :param accounts: account GUIDs
+        :return: position of each account in the account tree
+        :raises KeyError: if an account is not part of the account tree
+        """
+        positions = self.account_tree.guids.get_indexer(accounts)
+        if (positions < 0).any():
+            raise KeyError(list(accounts[positions < 0]))
+        return positions
+
+    def balance(self, account: str, date, include_subtree: bool = False) -> float:
+        """
+        :param account: account GUID
+        :param date: point in time, anything `pd.Timestamp` understands
+        :param include_subtree: include the splits of all descendants of the account
+        :return: balance of the account after all transactions up to and including the given point in time
+        :raises KeyError: if the account is not part of the account tree
+        """
+        position = self.account_tree.guids.get_loc(account)
+        dates = np.array([pd.Timestamp(date).to_datetime64()], dtype="datetime64[ns]")
+        return float(self._prefix_sums(include_subtree).at(position, dates)[0])
+
+    def balance_series(
+        self, accounts: Iterable[str], dates, include_subtree: bool = False
+    ) -> pd.DataFrame:
+        """
+        :param accounts: account GUIDs
+        :param dates: points in time, anything `pd.DatetimeIndex` understands
+        :param include_subtree: include the splits of all descendants of each account
+        :return: dataframe of balances with one row per date and one column per account (GUID), see `balance`
+        :raises KeyError: if an account is not part of the account tree
+        """
+        accounts = pd.Index(accounts)
+        dates = pd.DatetimeIndex(dates)
+        prefix_sums = self._prefix_sums(include_subtree)
+        date_values = dates.values.astype("datetime64[ns]")
+        balances = np.empty((len(dates), len(accounts)))
+        for i, position in enumerate(self._get_positions(accounts)):
+            balances[:, i] = prefix_sums.at(position, date_values)
+        return pd.DataFrame(balances, index=dates, columns=accounts)
+
+    def get_dates(self, accounts: Iterable[str]) -> pd.DatetimeIndex:
+        """
+        :param accounts: account GUIDs
+        :return: sorted, distinct points in time at which at least one of the accounts has a split
+        :raises KeyError: if an account is not part of the account tree
+        """
+        starts, ends = self.own.starts[:-1], self.own.starts[1:]
+        positions = self._get_positions(pd.Index(accounts))
+        dates = [self.own.dates[starts[p] : ends[p]] for p in positions]
+        if not dates:
+            return pd.DatetimeIndex([])
+        return pd.DatetimeIndex(np.unique(np.concatenate(dates)))
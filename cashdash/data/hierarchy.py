@@ -0,0 +1,90 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import anytree
+import numpy as np
+import pandas as pd
+from anytree import PreOrderIter
+
+
+@dataclass(eq=False)
+class AccountTree:
+    """
+    Array-based representation of the account hierarchy. Accounts are numbered in pre-order, therefore the subtree of
+    the account at position `i` spans positions `i` (inclusive) to `subtree_ends[i]` (exclusive).
+    """
+
+    guids: pd.Index
+    parents: np.ndarray
+    depths: np.ndarray
+    subtree_ends: np.ndarray
+
+    @staticmethod
+    def from_hierarchy(root: anytree.Node) -> "AccountTree":
+        nodes = list(PreOrderIter(root))
+        positions = {node.name: i for i, node in enumerate(nodes)}
+
+        parents = np.array(
+            [
+                -1 if node.parent is None else positions[node.parent.name]
+                for node in nodes
+            ],
+            dtype=int,
+        )
+        depths = np.array([node.depth for node in nodes], dtype=int)
+
+        # in pre-order, a subtree ends where the next node which is not deeper than the subtree root is found
+        subtree_ends = np.full(len(nodes), len(nodes), dtype=int)
+        stack = []
+        for i, depth in enumerate(depths):
+            while stack and depths[stack[-1]] >= depth:
+                subtree_ends[stack.pop()] = i
+            stack.append(i)
+
+        return AccountTree(
+            guids=pd.Index([node.name for node in nodes]),
+            parents=parents,
+            depths=depths,
+            subtree_ends=subtree_ends,
+        )
+
+    def ancestors_at_depth(self, depth: int) -> pd.Series:
+        """
+        Map each account to its ancestor at the given depth in the hierarchy. Accounts at or above this depth are mapped
+        to themselves.
+        :param depth:
+        :return: series of ancestor GUIDs, indexed by account GUID
+        """
+        ancestors = np.arange(len(self.guids))
+        for _ in range(self.depths.max() - depth):
+            ancestors = np.where(
+                self.depths[ancestors] > depth, self.parents[ancestors], ancestors
+            )
+        return pd.Series(self.guids[ancestors], index=self.guids)
+
+    def get_post_order(self) -> np.ndarray:
+        """
+        :return: positions of all accounts in post-order
+        """
+        # In post-order, an account comes after all of its descendants and after all accounts preceding it in pre-order,
+        # except for its ancestors.
+        post_order_ranks = self.subtree_ends - 1 - self.depths
+        return np.argsort(post_order_ranks)
+
+    def propagate_to_ancestors(
+        self, flags: np.ndarray, mask: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Set the flag of every account which has a flagged descendant.
+        :param flags: boolean flag per account position
+        :param mask: optional boolean mask per account position, flags are only propagated between accounts in the mask
+        :return: propagated flags
+        """
+        flags = flags.copy()
+        if mask is None:
+            mask = np.ones(len(flags), dtype=bool)
+        for depth in range(self.depths.max(), 0, -1):
+            flagged = np.flatnonzero(flags & mask & (self.depths == depth))
+            parents = self.parents[flagged]
+            flags[parents[mask[parents]]] = True
+        return flags
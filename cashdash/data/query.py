@@ -0,0 +1,292 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Callable, FrozenSet, Hashable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from cashdash.data import ACCOUNT, DATE, TRANSACTION, TYPE, VALUE
+from cashdash.data.hierarchy import AccountTree
+
+# bytes of masks and query results kept by each book, the least recently used ones are dropped - both grow with the
+# number of splits, so the cache is bounded by their size rather than their number
+MAX_CACHED_BYTES = 256 * 2 ** 20
+
+
+@dataclass(eq=False)
+class IndexedSplits:
+    """
+    Splits of a book sorted by date, with their dates, accounts and transactions as arrays, so that queries can select
+    splits without joining tables. Accounts are referred to by their position in the account tree, transactions by their
+    position in the transactions table.
+    """
+
+    account_tree: AccountTree
+    account_types: np.ndarray
+    transactions: pd.DataFrame
+    # splits with their date, sorted by date
+    splits: pd.DataFrame
+    dates: np.ndarray
+    account_positions: np.ndarray
+    transaction_positions: np.ndarray
+
+    def __post_init__(self):
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+        self._cache_lock = threading.Lock()
+
+    @staticmethod
+    def from_book(
+        account_tree: AccountTree,
+        accounts: pd.DataFrame,
+        transactions: pd.DataFrame,
+        splits: pd.DataFrame,
+    ) -> "IndexedSplits":
+        transaction_positions = transactions.index.get_indexer(splits[TRANSACTION])
+        dates = transactions[DATE].values[transaction_positions]
+        order = np.argsort(dates, kind="stable")
+        splits = splits.iloc[order].assign(**{DATE: dates[order]})
+        return IndexedSplits(
+            account_tree=account_tree,
+            account_types=accounts[TYPE].reindex(account_tree.guids).values,
+            transactions=transactions,
+            splits=splits,
+            dates=splits[DATE].values,
+            account_positions=account_tree.guids.get_indexer(splits[ACCOUNT]),
+            transaction_positions=transaction_positions[order],
+        )
+
+    def cached(self, key: Hashable, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Return the cached result for the given key, or compute and cache it.
+        :param key:
+        :param compute:
+        :return:
+        """
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        # computed outside of the lock, computing the same result twice at worst
+        result = compute()
+        with self._cache_lock:
+            previous = self._cache.pop(key, None)
+            if previous is not None:
+                self._cached_bytes -= previous.nbytes
+            self._cache[key] = result
+            self._cached_bytes += result.nbytes
+            while self._cached_bytes > MAX_CACHED_BYTES:
+                _, dropped = self._cache.popitem(last=False)
+                self._cached_bytes -= dropped.nbytes
+        return result
+
+    def account_mask(self, accounts: FrozenSet[int]) -> np.ndarray:
+        """
+        :param accounts: account positions
+        :return: which splits belong to one of the accounts
+        """
+
+        def compute():
+            is_selected = np.zeros(len(self.account_tree.guids), dtype=bool)
+            is_selected[list(accounts)] = True
+            return is_selected[self.account_positions]
+
+        return self.cached(("accounts", accounts), compute)
+
+    def transaction_mask(self, transactions: FrozenSet[str]) -> np.ndarray:
+        """
+        :param transactions: transaction GUIDs
+        :return: which splits belong to one of the transactions
+        """
+
+        def compute():
+            is_selected = self.transactions.index.isin(transactions)
+            return is_selected[self.transaction_positions]
+
+        return self.cached(("transactions", transactions), compute)
+
+    def touching_transaction_mask(self, accounts: FrozenSet[int]) -> np.ndarray:
+        """
+        :param accounts: account positions
+        :return: which splits belong to a transaction with at least one split of one of the accounts
+        """
+
+        def compute():
+            is_selected = np.zeros(len(self.transactions), dtype=bool)
+            is_selected[self.transaction_positions[self.account_mask(accounts)]] = True
+            return is_selected[self.transaction_positions]
+
+        return self.cached(("touching", accounts), compute)
+
+
+@dataclass(frozen=True)
+class SplitQuery:
+    """
+    Lazy query over the splits of a book, created with `BookData.query()`. Each method returns a new query with one
+    more predicate, nothing is computed until the splits, transactions or sums of the query are requested. All
+    predicates are then evaluated at once: the date range narrows down the date-sorted splits by binary search, the
+    others are boolean masks over all splits which are cached, so that queries sharing a predicate only compute it once.
+    Query results are cached as well.
+    """
+
+    indexed_splits: IndexedSplits
+    start: Optional[np.datetime64] = None
+    end: Optional[np.datetime64] = None
+    # positions of the accounts whose splits are selected, None for all accounts
+    accounts: Optional[FrozenSet[int]] = None
+    excluded_transactions: FrozenSet[str] = frozenset()
+    # positions of the accounts whose transactions are excluded entirely
+    excluding_accounts: FrozenSet[int] = frozenset()
+
+    def between(self, start=None, end=None) -> "SplitQuery":
+        """
+        :param start: first point in time to include, anything `pd.Timestamp` understands, or None
+        :param end: last point in time to include, or None
+        :return: query for splits of transactions within the given range
+        """
+        query = self
+        if start is not None:
+            start = pd.Timestamp(start).to_datetime64()
+            if query.start is not None:
+                start = max(start, query.start)
+            query = replace(query, start=start)
+        if end is not None:
+            end = pd.Timestamp(end).to_datetime64()
+            if query.end is not None:
+                end = min(end, query.end)
+            query = replace(query, end=end)
+        return query
+
+    def _get_account_positions(self, accounts: Iterable[str]) -> FrozenSet[int]:
+        # accounts unknown to the book have no splits to select or exclude
+        positions = self.indexed_splits.account_tree.guids.get_indexer(
+            pd.Index(accounts)
+        )
+        return frozenset(positions[positions >= 0])
+
+    def _with_accounts(self, positions: Iterable[int]) -> "SplitQuery":
+        accounts = frozenset(positions)
+        if self.accounts is not None:
+            accounts &= self.accounts
+        return replace(self, accounts=accounts)
+
+    def of_accounts(self, accounts: Iterable[str]) -> "SplitQuery":
+        """
+        :param accounts: account GUIDs
+        :return: query for splits of the given accounts
+        """
+        return self._with_accounts(self._get_account_positions(accounts))
+
+    def of_subtree(self, account: str) -> "SplitQuery":
+        """
+        :param account: account GUID
+        :return: query for splits of the account and all of its descendants
+        """
+        account_tree = self.indexed_splits.account_tree
+        position = account_tree.guids.get_loc(account)
+        return self._with_accounts(range(position, account_tree.subtree_ends[position]))
+
+    def of_types(self, types: Iterable[str]) -> "SplitQuery":
+        """
+        :param types: account types, e.g. `EXPENSE`
+        :return: query for splits of accounts of the given types
+        """
+        is_selected = np.isin(self.indexed_splits.account_types, list(types))
+        return self._with_accounts(np.flatnonzero(is_selected))
+
+    def excluding_transactions(self, transactions: Iterable[str]) -> "SplitQuery":
+        """
+        :param transactions: transaction GUIDs
+        :return: query without the splits of the given transactions
+        """
+        return replace(
+            self, excluded_transactions=self.excluded_transactions | set(transactions)
+        )
+
+    def excluding_transactions_of(self, accounts: Iterable[str]) -> "SplitQuery":
+        """
+        :param accounts: account GUIDs
+        :return: query without any transaction involving one of the given accounts
+        """
+        positions = self._get_account_positions(accounts)
+        return replace(self, excluding_accounts=self.excluding_accounts | positions)
+
+    def _get_positions(self) -> np.ndarray:
+        """
+        :return: positions of the selected splits among all splits sorted by date
+        """
+
+        def compute():
+            indexed_splits = self.indexed_splits
+            dates = indexed_splits.dates
+            lo = 0 if self.start is None else np.searchsorted(dates, self.start, "left")
+            hi = (
+                len(dates)
+                if self.end is None
+                else np.searchsorted(dates, self.end, "right")
+            )
+            is_selected = np.ones(max(0, hi - lo), dtype=bool)
+            if self.accounts is not None:
+                is_selected &= indexed_splits.account_mask(self.accounts)[lo:hi]
+            if self.excluded_transactions:
+                mask = indexed_splits.transaction_mask(self.excluded_transactions)
+                is_selected &= ~mask[lo:hi]
+            if self.excluding_accounts:
+                mask = indexed_splits.touching_transaction_mask(self.excluding_accounts)
+                is_selected &= ~mask[lo:hi]
+            return lo + np.flatnonzero(is_selected)
+
+        return self.indexed_splits.cached(self, compute)
+
+    def splits(self) -> pd.DataFrame:
+        """
+        :return: selected splits with their date, sorted by date
+        """
+        return self.indexed_splits.splits.iloc[self._get_positions()]
+
+    def transaction_positions(self) -> np.ndarray:
+        """
+        :return: ascending positions of the transactions with at least one selected split in the transactions table
+        """
+
+        def compute():
+            transaction_positions = self.indexed_splits.transaction_positions
+            return np.unique(transaction_positions[self._get_positions()])
+
+        return self.indexed_splits.cached(("transaction positions", self), compute)
+
+    def transactions(self) -> pd.DataFrame:
+        """
+        :return: transactions with at least one selected split, in their original order
+        """
+        return self.indexed_splits.transactions.iloc[self.transaction_positions()]
+
+    def sum_by_period(self, rule: str = "D") -> pd.DataFrame:
+        """
+        Sum up the values of the selected splits per account and period.
+        :param rule: pandas offset alias of the period, e.g. "D" or "MS"
+        :return: dataframe with one row per period from the first to the last split, and one column per account (GUID)
+                 in the order of the account hierarchy. With daily periods, only days with at least one split have a row.
+        """
+        indexed_splits = self.indexed_splits
+        positions = self._get_positions()
+        days, day_of_split = np.unique(
+            indexed_splits.dates[positions].astype("datetime64[D]"),
+            return_inverse=True,
+        )
+        accounts, account_of_split = np.unique(
+            indexed_splits.account_positions[positions], return_inverse=True
+        )
+        values = indexed_splits.splits[VALUE].values[positions].astype(float)
+        sums = np.zeros((len(days), len(accounts)))
+        np.add.at(sums, (day_of_split, account_of_split), values)
+
+        sums = pd.DataFrame(
+            sums,
+            index=pd.DatetimeIndex(days.astype("datetime64[ns]"), name=DATE),
+            columns=pd.Index(indexed_splits.account_tree.guids[accounts], name=ACCOUNT),
+        )
+        if rule != "D":
+            sums = sums.resample(rule).sum()
+        return sums
@@ -0,0 +1,84 @@
+from collections import defaultdict
+from functools import lru_cache
+from typing import Set
+
+import numpy as np
+import pandas as pd
+
+
+# number of search terms whose matches are kept
+MAX_NUM_CACHED_TERMS = 256
+
+# Shorter search terms do not narrow down the search. They are typed on the way to longer ones, and finding them would
+# mean going through all descriptions, as they have no trigrams to look up.
+MIN_TERM_LENGTH = 3
+
+
+def get_trigrams(text: str) -> Set[str]:
+    """
+    :param text:
+    :return: all substrings of length three
+    """
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class DescriptionIndex:
+    """
+    Trigram index over the descriptions of transactions, for case-insensitive substring search. Each distinct
+    description is indexed once, under each of its trigrams. A search term is looked up by intersecting the descriptions
+    of all of its trigrams, which only leaves a few candidates to check for the whole term. Terms shorter than
+    `MIN_TERM_LENGTH` are ignored.
+    """
+
+    def __init__(self, descriptions: pd.Series):
+        """
+        :param descriptions: description of each transaction
+        """
+        codes, distinct = pd.factorize(descriptions.fillna("").str.lower())
+        # position of the distinct description of each transaction
+        self.codes = codes
+        self.descriptions = np.asarray(distinct, dtype=object)
+
+        postings = defaultdict(list)
+        for code, description in enumerate(self.descriptions):
+            for trigram in get_trigrams(description):
+                postings[trigram].append(code)
+        # positions of the distinct descriptions containing each trigram, ascending
+        self.postings = {
+            trigram: np.array(codes, dtype=np.int64)
+            for trigram, codes in postings.items()
+        }
+        # while typing a query, its earlier terms are looked up again and again
+        self._find = lru_cache(maxsize=MAX_NUM_CACHED_TERMS)(self._find)
+
+    def _find(self, term: str) -> np.ndarray:
+        """
+        :param term: lower case search term of at least `MIN_TERM_LENGTH` characters
+        :return: ascending positions of the distinct descriptions containing the term
+        """
+        postings = [self.postings.get(t) for t in get_trigrams(term)]
+        if any(p is None for p in postings):
+            return np.array([], dtype=np.int64)
+        # start with the rarest trigram, so that the intersections stay small
+        postings.sort(key=len)
+        candidates = postings[0]
+        for p in postings[1:]:
+            candidates = np.intersect1d(candidates, p, assume_unique=True)
+        # the trigrams of a description may all occur in the term without the term occurring as a whole
+        return np.array(
+            [c for c in candidates if term in self.descriptions[c]], dtype=np.int64
+        )
+
+    def search(self, query: str) -> np.ndarray:
+        """
+        :param query: search terms separated by whitespace
+        :return: which transactions have a description containing all terms, regardless of case
+        """
+        matches = np.arange(len(self.descriptions))
+        for term in query.lower().split():
+            if len(term) < MIN_TERM_LENGTH:
+                continue
+            matches = np.intersect1d(matches, self._find(term), assume_unique=True)
+        is_match = np.zeros(len(self.descriptions), dtype=bool)
+        is_match[matches] = True
+        return is_match[self.codes]
@@ -0,0 +1,429 @@
+"""
+Generator of synthetic GnuCash books of configurable size, to measure how the app scales with the size of a book.
+"""
+import gzip
+import random
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from itertools import islice
+from typing import Iterator, List, Optional, TextIO, Tuple
+from xml.sax.saxutils import escape
+
+from cashdash.data import ASSET, BANK, CASH, EQUITY, EXPENSE, INCOME, LIABILITY
+
+ROOT = "ROOT"
+CURRENCY = "EUR"
+# smallest fraction of the currency, amounts are generated in cents
+CURRENCY_FRACTION = 100
+
+# number of transactions inserted into an SQLite database at once
+SQLITE_CHUNK_SIZE = 10000
+
+# share of the accounts in each top-level category, the rest are expense accounts
+ACCOUNT_SHARES = {ASSET: 0.15, LIABILITY: 0.05, INCOME: 0.1}
+
+# kinds of simple transactions by source and target category, with their relative frequency
+SIMPLE_TRANSACTION_KINDS = [
+    ((ASSET, EXPENSE), 0.6),
+    ((INCOME, ASSET), 0.15),
+    ((LIABILITY, EXPENSE), 0.15),
+    ((ASSET, LIABILITY), 0.05),
+    ((ASSET, ASSET), 0.05),
+]
+
+
+@dataclass
+class BookSpec:
+    """
+    Size and shape of a synthetic book. A book has about `num_transactions * (2 + split_ratio * (mean split width - 2))`
+    splits.
+    """
+
+    num_years: int = 5
+    num_accounts: int = 50
+    # depth of the deepest accounts, top-level accounts like "Expenses" have depth 1
+    max_depth: int = 3
+    num_transactions: int = 5000
+    # share of transactions with more than two splits
+    split_ratio: float = 0.1
+    # maximum number of splits of a split transaction, the number is drawn uniformly from 3 to this number
+    max_split_width: int = 6
+    seed: int = 0
+    start_date: date = field(default_factory=lambda: date(2000, 1, 1))
+
+
+@dataclass
+class SyntheticAccount:
+    guid: str
+    name: str
+    type: str
+    parent: Optional["SyntheticAccount"]
+    depth: int
+    # top-level category the account belongs to, e.g. EXPENSE for all accounts below "Expenses"
+    category: str
+    children: List["SyntheticAccount"] = field(default_factory=list, repr=False)
+
+
+@dataclass
+class SyntheticTransaction:
+    guid: str
+    date: date
+    description: str
+    # GUID, account GUID and value in cents of each split
+    splits: List[Tuple[str, str, int]]
+
+
+class SyntheticBookGenerator:
+    """
+    Generates the accounts and transactions of a book. Generation is deterministic for a given spec, including the seed.
+    Transactions are generated lazily in the order of their date, so that books with millions of splits can be written
+    without holding them in memory.
+    """
+
+    def __init__(self, spec: BookSpec):
+        self.spec = spec
+        self._random = random.Random(spec.seed)
+        self.accounts = self._generate_accounts()
+        self.book_guid = self._new_guid()
+        self.commodity_guid = self._new_guid()
+
+    def _new_guid(self) -> str:
+        return "%032x" % self._random.getrandbits(128)
+
+    def _generate_accounts(self) -> List[SyntheticAccount]:
+        spec = self.spec
+        root = SyntheticAccount(self._new_guid(), "Root Account", ROOT, None, 0, ROOT)
+        accounts = [root]
+
+        num_accounts = {
+            category: max(1, round(share * spec.num_accounts))
+            for category, share in ACCOUNT_SHARES.items()
+        }
+        num_accounts[EXPENSE] = max(1, spec.num_accounts - sum(num_accounts.values()))
+        names = {
+            ASSET: "Assets",
+            LIABILITY: "Liabilities",
+            INCOME: "Income",
+            EXPENSE: "Expenses",
+        }
+
+        for category, num in num_accounts.items():
+            top = SyntheticAccount(
+                self._new_guid(), names[category], category, root, 1, category
+            )
+            root.children.append(top)
+            subtree = [top]
+            for i in range(num):
+                # attach each account to a random account of the subtree which may still have children
+                candidates = [a for a in subtree if a.depth < spec.max_depth]
+                parent = self._random.choice(candidates) if candidates else top
+                account = SyntheticAccount(
+                    self._new_guid(),
+                    f"{names[category]} {i + 1}",
+                    category,
+                    parent,
+                    parent.depth + 1,
+                    category,
+                )
+                parent.children.append(account)
+                subtree.append(account)
+            accounts += subtree
+
+        # opening balances come from equity
+        equity = SyntheticAccount(self._new_guid(), "Equity", EQUITY, root, 1, EQUITY)
+        opening_balances = SyntheticAccount(
+            self._new_guid(), "Opening Balances", EQUITY, equity, 2, EQUITY
+        )
+        root.children.append(equity)
+        equity.children.append(opening_balances)
+        accounts += [equity, opening_balances]
+
+        # asset accounts holding money are bank or cash accounts
+        for account in accounts:
+            if account.category == ASSET and not account.children:
+                account.type = self._random.choice([BANK, BANK, CASH, ASSET])
+        return accounts
+
+    def _leaves(self, category: str) -> List[SyntheticAccount]:
+        return [a for a in self.accounts if a.category == category and not a.children]
+
+    def _amount(self) -> int:
+        # most amounts are small, few are large
+        return max(1, int(self._random.lognormvariate(7, 1.2)))
+
+    def generate_transactions(self) -> Iterator[SyntheticTransaction]:
+        """
+        :return: iterator over all transactions, the same ones on each call
+        """
+        spec = self.spec
+        self._random = random.Random(f"{spec.seed}-transactions")
+        leaves = {
+            category: self._leaves(category)
+            for category in [ASSET, LIABILITY, INCOME, EXPENSE, EQUITY]
+        }
+        kinds, weights = zip(*SIMPLE_TRANSACTION_KINDS)
+        split_sources = leaves[ASSET] + leaves[INCOME] + leaves[LIABILITY]
+        split_targets = leaves[ASSET] + leaves[EXPENSE]
+        num_days = (
+            spec.start_date.replace(year=spec.start_date.year + spec.num_years)
+            - spec.start_date
+        ).days
+
+        # opening balance of every asset account, one transaction each like GnuCash creates them
+        opening_balance = leaves[EQUITY][0]
+        for account in leaves[ASSET]:
+            amount = self._amount() * 10
+            splits = [
+                (self._new_guid(), opening_balance.guid, -amount),
+                (self._new_guid(), account.guid, amount),
+            ]
+            yield SyntheticTransaction(
+                self._new_guid(), spec.start_date, "Opening balance", splits
+            )
+
+        for i in range(spec.num_transactions):
+            day = spec.start_date + timedelta(
+                days=i * num_days // spec.num_transactions
+            )
+            if self._random.random() < spec.split_ratio:
+                width = self._random.randint(3, max(3, spec.max_split_width))
+                num_sources = self._random.randint(1, width - 1)
+                sources = self._random.sample(
+                    split_sources, min(num_sources, len(split_sources))
+                )
+                targets = self._random.sample(
+                    [a for a in split_targets if a not in sources],
+                    min(width - len(sources), len(split_targets)),
+                )
+                target_amounts = [self._amount() for _ in targets]
+                # every source needs to give at least one cent
+                target_amounts[0] += max(0, len(sources) - sum(target_amounts))
+                source_amounts = self._partition(sum(target_amounts), len(sources))
+                splits = [
+                    (self._new_guid(), a.guid, -v)
+                    for a, v in zip(sources, source_amounts)
+                ]
+                splits += [
+                    (self._new_guid(), a.guid, v)
+                    for a, v in zip(targets, target_amounts)
+                ]
+                description = f"Split transaction {i + 1}"
+            else:
+                source_category, target_category = self._random.choices(kinds, weights)[
+                    0
+                ]
+                source = self._random.choice(leaves[source_category])
+                target = self._random.choice(
+                    [a for a in leaves[target_category] if a is not source]
+                    or leaves[target_category]
+                )
+                amount = self._amount()
+                splits = [
+                    (self._new_guid(), source.guid, -amount),
+                    (self._new_guid(), target.guid, amount),
+                ]
+                description = f"Transaction {i + 1}"
+            yield SyntheticTransaction(self._new_guid(), day, description, splits)
+
+    def _partition(self, total: int, num_parts: int) -> List[int]:
+        """
+        Split an amount into random positive parts.
+        :param total: at least `num_parts`
+        :param num_parts:
+        :return:
+        """
+        cuts = sorted(self._random.sample(range(1, total), num_parts - 1))
+        return [b - a for a, b in zip([0] + cuts, cuts + [total])]
+
+
+def _format_value(cents: int) -> str:
+    return f"{cents}/{CURRENCY_FRACTION}"
+
+
+def write_xml(generator: SyntheticBookGenerator, f: TextIO) -> None:
+    """
+    Write a book in the GnuCash XML format, uncompressed.
+    :param generator:
+    :param f: text file to write to
+    """
+    namespaces = ["gnc", "act", "book", "cd", "cmdty", "slot", "split", "trn", "ts"]
+    f.write('<?xml version="1.0" encoding="utf-8" ?>\n<gnc-v2\n')
+    f.write(
+        "\n".join(
+            f'     xmlns:{ns}="http://www.gnucash.org/XML/{ns}"' for ns in namespaces
+        )
+    )
+    f.write(">\n")
+    f.write('<gnc:count-data cd:type="book">1</gnc:count-data>\n')
+    f.write('<gnc:book version="2.0.0">\n')
+    f.write(f'<book:id type="guid">{generator.book_guid}</book:id>\n')
+    f.write('<gnc:commodity version="2.0.0">\n')
+    f.write(
+        f"  <cmdty:space>CURRENCY</cmdty:space>\n  <cmdty:id>{CURRENCY}</cmdty:id>\n"
+    )
+    f.write("</gnc:commodity>\n")
+
+    for account in generator.accounts:
+        f.write('<gnc:account version="2.0.0">\n')
+        f.write(f"  <act:name>{escape(account.name)}</act:name>\n")
+        f.write(f'  <act:id type="guid">{account.guid}</act:id>\n')
+        f.write(f"  <act:type>{account.type}</act:type>\n")
+        if account.parent is not None:
+            f.write(
+                "  <act:commodity>\n    <cmdty:space>CURRENCY</cmdty:space>\n"
+                f"    <cmdty:id>{CURRENCY}</cmdty:id>\n  </act:commodity>\n"
+            )
+            f.write(f"  <act:commodity-scu>{CURRENCY_FRACTION}</act:commodity-scu>\n")
+            f.write(f"  <act:description>{escape(account.name)}</act:description>\n")
+            f.write(f'  <act:parent type="guid">{account.parent.guid}</act:parent>\n')
+        f.write("</gnc:account>\n")
+
+    for transaction in generator.generate_transactions():
+        timestamp = f"{transaction.date.isoformat()} 10:59:00 +0000"
+        f.write('<gnc:transaction version="2.0.0">\n')
+        f.write(f'  <trn:id type="guid">{transaction.guid}</trn:id>\n')
+        f.write(
+            "  <trn:currency>\n    <cmdty:space>CURRENCY</cmdty:space>\n"
+            f"    <cmdty:id>{CURRENCY}</cmdty:id>\n  </trn:currency>\n"
+        )
+        f.write(
+            f"  <trn:date-posted>\n    <ts:date>{timestamp}</ts:date>\n  </trn:date-posted>\n"
+        )
+        f.write(
+            f"  <trn:date-entered>\n    <ts:date>{timestamp}</ts:date>\n  </trn:date-entered>\n"
+        )
+        f.write(
+            f"  <trn:description>{escape(transaction.description)}</trn:description>\n"
+        )
+        f.write("  <trn:splits>\n")
+        for guid, account_guid, cents in transaction.splits:
+            value = _format_value(cents)
+            f.write(
+                f'    <trn:split>\n      <split:id type="guid">{guid}</split:id>\n'
+                "      <split:reconciled-state>n</split:reconciled-state>\n"
+                f"      <split:value>{value}</split:value>\n"
+                f"      <split:quantity>{value}</split:quantity>\n"
+                f'      <split:account type="guid">{account_guid}</split:account>\n'
+                "    </trn:split>\n"
+            )
+        f.write("  </trn:splits>\n</gnc:transaction>\n")
+
+    f.write("</gnc:book>\n</gnc-v2>\n")
+
+
+def write_sqlite(generator: SyntheticBookGenerator, path: str) -> None:
+    """
+    Write a book in the GnuCash SQLite format. Only the tables describing accounts and transactions are created.
+    :param generator:
+    :param path: path of the database file, which must not exist yet
+    """
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        """
+        CREATE TABLE books (guid text(32) PRIMARY KEY NOT NULL, root_account_guid text(32) NOT NULL,
+            root_template_guid text(32) NOT NULL);
+        CREATE TABLE commodities (guid text(32) PRIMARY KEY NOT NULL, namespace text(2048) NOT NULL,
+            mnemonic text(2048) NOT NULL, fullname text(2048), cusip text(2048), fraction integer NOT NULL,
+            quote_flag integer NOT NULL, quote_source text(2048), quote_tz text(2048));
+        CREATE TABLE accounts (guid text(32) PRIMARY KEY NOT NULL, name text(2048) NOT NULL,
+            account_type text(2048) NOT NULL, commodity_guid text(32), commodity_scu integer NOT NULL,
+            non_std_scu integer NOT NULL, parent_guid text(32), code text(2048), description text(2048),
+            hidden integer, placeholder integer);
+        CREATE TABLE transactions (guid text(32) PRIMARY KEY NOT NULL, currency_guid text(32) NOT NULL,
+            num text(2048) NOT NULL, post_date text(19), enter_date text(19), description text(2048));
+        CREATE TABLE splits (guid text(32) PRIMARY KEY NOT NULL, tx_guid text(32) NOT NULL,
+            account_guid text(32) NOT NULL, memo text(2048) NOT NULL, action text(2048) NOT NULL,
+            reconcile_state text(1) NOT NULL, reconcile_date text(19), value_num bigint NOT NULL,
+            value_denom bigint NOT NULL, quantity_num bigint NOT NULL, quantity_denom bigint NOT NULL,
+            lot_guid text(32));
+        CREATE INDEX tx_post_date_index ON transactions(post_date);
+        CREATE INDEX splits_tx_guid_index ON splits(tx_guid);
+        CREATE INDEX splits_account_guid_index ON splits(account_guid);
+        """
+    )
+
+    commodity_guid = generator.commodity_guid
+    root = generator.accounts[0]
+    connection.execute(
+        "INSERT INTO books VALUES (?, ?, ?)",
+        (generator.book_guid, root.guid, generator.book_guid),
+    )
+    connection.execute(
+        "INSERT INTO commodities VALUES (?, 'CURRENCY', ?, ?, '', ?, 1, 'currency', '')",
+        (commodity_guid, CURRENCY, CURRENCY, CURRENCY_FRACTION),
+    )
+    connection.executemany(
+        "INSERT INTO accounts VALUES (?, ?, ?, ?, ?, 0, ?, '', ?, 0, ?)",
+        [
+            (
+                a.guid,
+                a.name,
+                a.type,
+                commodity_guid,
+                CURRENCY_FRACTION,
+                None if a.parent is None else a.parent.guid,
+                a.name,
+                int(bool(a.children)),
+            )
+            for a in generator.accounts
+        ],
+    )
+
+    def transaction_rows(transactions: List[SyntheticTransaction]):
+        for transaction in transactions:
+            timestamp = f"{transaction.date.isoformat()} 10:59:00"
+            yield (
+                transaction.guid,
+                commodity_guid,
+                timestamp,
+                timestamp,
+                transaction.description,
+            )
+
+    def split_rows(transactions: List[SyntheticTransaction]):
+        for transaction in transactions:
+            for guid, account_guid, cents in transaction.splits:
+                yield (
+                    guid,
+                    transaction.guid,
+                    account_guid,
+                    cents,
+                    CURRENCY_FRACTION,
+                    cents,
+                    CURRENCY_FRACTION,
+                )
+
+    # write transactions in chunks, so that they never need to be in memory all at once
+    transaction_iterator = generator.generate_transactions()
+    while True:
+        transactions = list(islice(transaction_iterator, SQLITE_CHUNK_SIZE))
+        if not transactions:
+            break
+        connection.executemany(
+            "INSERT INTO transactions VALUES (?, ?, '', ?, ?, ?)",
+            transaction_rows(transactions),
+        )
+        connection.executemany(
+            "INSERT INTO splits VALUES (?, ?, ?, '', '', 'n', NULL, ?, ?, ?, ?, NULL)",
+            split_rows(transactions),
+        )
+    connection.commit()
+    connection.close()
+
+
+def write_book(spec: BookSpec, path: str, file_format: str = "xml") -> None:
+    """
+    Generate a book and write it to a file.
+    :param spec:
+    :param path:
+    :param file_format: "xml" for a gzip-compressed GnuCash XML file, like GnuCash writes by default, or "sqlite"
+    """
+    generator = SyntheticBookGenerator(spec)
+    if file_format == "xml":
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            write_xml(generator, f)
+    elif file_format == "sqlite":
+        write_sqlite(generator, path)
+    else:
+        raise ValueError(f'Unknown file format "{file_format}".')
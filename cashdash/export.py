@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import io
+from typing import Callable, Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+import pandas as pd
+
+from cashdash.algo.base import SOURCE, TARGET
+from cashdash.algo.tables import SplitTable
+from cashdash.data import BookData, DATE, EQUITY, TRANSACTION, TYPE, VALUE
+from cashdash.jobs import JobManager, JobQueueFull
+
+# exporting from the command line does not need Flask
+if TYPE_CHECKING:
+    from flask import Flask
+
+# number of transactions whose links are reconstructed and written at a time
+CHUNK_SIZE = 10000
+
+# clients asked to try again because the server is busy are told to wait this long
+RETRY_AFTER_SECONDS = 10
+
+# columns of each kind of export and their types
+Columns = List[Tuple[str, str]]
+TRANSACTION_LINK_COLUMNS = [
+    (TRANSACTION, "string"),
+    (DATE, "timestamp"),
+    (SOURCE, "string"),
+    (TARGET, "string"),
+    (VALUE, "double"),
+]
+AGGREGATED_LINK_COLUMNS = [(SOURCE, "string"), (TARGET, "string"), (VALUE, "double")]
+
+# media type of each export format
+MIMETYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def get_transaction_dates(
+    data: BookData, start_date: Optional[str] = None, end_date: Optional[str] = None
+) -> pd.Series:
+    """
+    :param data:
+    :param start_date: first day to include, or None
+    :param end_date: last day to include, or None
+    :return: date of each transaction to export (GUID), sorted by date. Like in the cash flow dash, transactions
+             involving equity accounts are left out.
+    """
+    transactions = (
+        data.query()
+        .between(start_date, end_date)
+        .excluding_transactions_of(data.accounts.index[data.accounts[TYPE] == EQUITY])
+        .transactions()
+    )
+    return transactions[DATE].sort_values(kind="mergesort")
+
+
+def iter_transaction_links(
+    data: BookData,
+    split_table: SplitTable,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[pd.DataFrame]:
+    """
+    Reconstruct the links of the transactions in the given date range, a chunk of transactions at a time, see
+    `get_transaction_dates`.
+    :param data:
+    :param split_table: splits prepared for the desired settings of the cash flow dash
+    :param start_date: first day to include, or None
+    :param end_date: last day to include, or None
+    :param chunk_size: number of transactions per chunk
+    :return: links of each chunk, see `TRANSACTION_LINK_COLUMNS`, ordered by date
+    """
+    dates = get_transaction_dates(data, start_date, end_date)
+    for start in range(0, len(dates), chunk_size):
+        chunk_dates = dates.iloc[start : start + chunk_size]
+        links = split_table.get_transaction_links(chunk_dates.index)
+        links.insert(1, DATE, chunk_dates.reindex(links[TRANSACTION]).values)
+        yield links
+
+
+def aggregate_links(chunks: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """
+    Sum up links between the same two accounts.
+    :param chunks: links, see `iter_transaction_links`
+    :return: one chunk of aggregated links, see `AGGREGATED_LINK_COLUMNS`
+    """
+    totals = pd.DataFrame(columns=[SOURCE, TARGET, VALUE]).astype({VALUE: float})
+    for links in chunks:
+        totals = (
+            pd.concat([totals, links[[SOURCE, TARGET, VALUE]]], sort=False)
+            .groupby([SOURCE, TARGET], as_index=False)
+            .sum()
+        )
+    yield totals
+
+
+def write_csv(chunks: Iterator[pd.DataFrame], columns: Columns) -> Iterator[bytes]:
+    """
+    :param chunks:
+    :param columns: columns of the chunks and their types
+    :return: the chunks as CSV, starting with a header
+    """
+    yield (",".join(name for name, _ in columns) + "\n").encode()
+    for chunk in chunks:
+        yield chunk.to_csv(header=False, index=False).encode()
+
+
+def write_ndjson(chunks: Iterator[pd.DataFrame], columns: Columns) -> Iterator[bytes]:
+    """
+    :param chunks:
+    :param columns: columns of the chunks and their types
+    :return: the chunks as newline-delimited JSON, one object per row
+    """
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        text = chunk.to_json(orient="records", lines=True, date_format="iso")
+        yield (text.rstrip("\n") + "\n").encode()
+
+
+class _StreamBuffer(io.RawIOBase):
+    """
+    Write-only file which hands out what was written to it so far. Its position keeps counting from the start of the
+    file, since Parquet writers record offsets into the file.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []  # type: List[bytes]
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._parts.append(bytes(b))
+        self._position += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._position
+
+    def pop(self) -> bytes:
+        """
+        :return: everything written since the last call
+        """
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def write_parquet(chunks: Iterator[pd.DataFrame], columns: Columns) -> Iterator[bytes]:
+    """
+    Requires pyarrow, which is an optional dependency. It is imported right away, not once the file is consumed.
+    :param chunks:
+    :param columns: columns of the chunks and their types
+    :return: a Parquet file with one row group per chunk
+    :raises ImportError: if pyarrow is not installed
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {
+        "string": pa.string(),
+        "timestamp": pa.timestamp("ns"),
+        "double": pa.float64(),
+    }
+    schema = pa.schema([(name, types[t]) for name, t in columns])
+
+    def write() -> Iterator[bytes]:
+        buffer = _StreamBuffer()
+        writer = pq.ParquetWriter(buffer, schema)
+        for chunk in chunks:
+            writer.write_table(
+                pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            )
+            yield buffer.pop()
+        # the footer describing all row groups comes last
+        writer.close()
+        yield buffer.pop()
+
+    return write()
+
+
+WRITERS = {"csv": write_csv, "ndjson": write_ndjson, "parquet": write_parquet}
+
+
+def export_links(
+    data: BookData,
+    split_table: SplitTable,
+    aggregated: bool,
+    file_format: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> Iterator[bytes]:
+    """
+    Export reconstructed links. The export is generated lazily as it is consumed, so that only one chunk of transactions
+    is held in memory at a time.
+    :param data:
+    :param split_table: splits prepared for the desired settings of the cash flow dash
+    :param aggregated: whether to export the sums of links between the same two accounts instead of the links of each
+                       transaction
+    :param file_format: key of `WRITERS`
+    :param start_date: first day to include, or None
+    :param end_date: last day to include, or None
+    :return: parts of the exported file
+    """
+    if file_format not in WRITERS:
+        raise ValueError(f'Unknown export format "{file_format}".')
+    chunks = iter_transaction_links(data, split_table, start_date, end_date)
+    columns = TRANSACTION_LINK_COLUMNS
+    if aggregated:
+        chunks, columns = aggregate_links(chunks), AGGREGATED_LINK_COLUMNS
+    return WRITERS[file_format](chunks, columns)
+
+
+def enable_export(
+    app: Flask,
+    data: BookData,
+    get_split_table: Callable[[bool, bool], SplitTable],
+    jobs: JobManager,
+) -> None:
+    """
+    Serve exports of reconstructed links at `/export/links.<format>` (the links of each transaction) and
+    `/export/aggregated-links.<format>` (their sums per source and target account). The date range can be given with
+    the `start_date` and `end_date` query parameters, the settings of the cash flow dash with `merge_asset_accounts` and
+    `treat_liabilities_as_assets` (true or false, the default). Split transactions whose links have not been
+    reconstructed yet are solved by a job, so that exports are subject to the same limits as the cash flow dash. If
+    too many jobs are waiting already, the export is rejected with status 503.
+    :param app:
+    :param data:
+    :param get_split_table: function returning the split table for the "merge asset accounts" and "treat liabilities
+                            as assets" settings
+    :param jobs: job manager of the cash flow dash
+    """
+    from flask import Response, abort, request, stream_with_context
+
+    def get_flag(name: str) -> bool:
+        return request.args.get(name, "false").lower() in ("1", "true", "yes")
+
+    @app.route("/export/<kind>.<file_format>")
+    def export(kind: str, file_format: str):
+        if kind not in ("links", "aggregated-links") or file_format not in WRITERS:
+            abort(404)
+        split_table = get_split_table(
+            get_flag("merge_asset_accounts"), get_flag("treat_liabilities_as_assets")
+        )
+        start_date, end_date = (
+            request.args.get("start_date"),
+            request.args.get("end_date"),
+        )
+        try:
+            parts = export_links(
+                data,
+                split_table,
+                kind == "aggregated-links",
+                file_format,
+                start_date,
+                end_date,
+            )
+        except ImportError as e:
+            abort(501, description=f"Exporting {file_format} is not available: {e}")
+
+        unsolved = split_table.get_unsolved_transactions(
+            get_transaction_dates(data, start_date, end_date).index
+        )
+        job = None
+        if len(unsolved) > 0:
+            try:
+                job = jobs.submit(
+                    lambda job: split_table.get_links(
+                        unsolved, on_progress=job.report_progress
+                    )
+                )
+            except JobQueueFull:
+                return Response(
+                    "The server is busy, please try again in a moment.",
+                    status=503,
+                    headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+                )
+
+        def generate() -> Iterator[bytes]:
+            try:
+                if job is not None:
+                    # all links are reconstructed by then, failing before anything has been sent if solving fails
+                    job.future.result()
+                yield from parts
+            finally:
+                if job is not None:
+                    # the client may have gone away while the job was still running
+                    jobs.cancel(job.job_id)
+
+        # The media types of exports are not among the compressed ones, compressing would collect the whole export
+        # before sending anything.
+        return Response(
+            stream_with_context(generate()),
+            mimetype=MIMETYPES[file_format],
+            headers={
+                "Content-Disposition": f"attachment; filename={kind}.{file_format}"
+            },
+        )
@@ -0,0 +1,263 @@
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple, Type
+
+# finished jobs are kept until their result is picked up, but at most this many jobs are kept at all
+MAX_NUM_JOBS = 100
+
+# IDs of cancelled jobs and jobs whose result has been picked up are remembered, so that they are not started again
+MAX_NUM_FORGOTTEN_JOBS = 1000
+
+# callers waiting for a computation started by another caller check this often whether they have been cancelled
+CANCEL_CHECK_SECONDS = 0.1
+
+
+def new_job_id() -> str:
+    """
+    :return: a unique job ID. IDs sort by the time they were created, also across the processes of a pre-fork server.
+    """
+    return f"{time.time_ns():016x}{uuid.uuid4().hex}"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobQueueFull(Exception):
+    """
+    Raised instead of starting a job when too many jobs are already waiting for a free worker.
+    """
+
+    pass
+
+
+class Job:
+    """
+    Handle of a computation running in the background. The computation reports its progress through the handle, which
+    is also where it learns about being cancelled. It can also publish a preliminary result there before it is done.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.progress = 0.0
+        self.preliminary_result = None  # type: Any
+        self.future = None  # type: Optional[Future]
+        self._cancelled = threading.Event()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def raise_if_cancelled(self) -> None:
+        """
+        :raises JobCancelled: if the job has been cancelled, to abort the computation
+        """
+        if self.is_cancelled:
+            raise JobCancelled()
+
+    def publish(self, preliminary_result: Any) -> None:
+        """
+        Called by the computation to hand out a result before it is done, e.g. an approximation.
+        :param preliminary_result:
+        """
+        self.preliminary_result = preliminary_result
+
+    def report_progress(self, num_done: int, num_total: int) -> None:
+        """
+        Called by the computation whenever it makes progress.
+        :param num_done: number of steps done so far
+        :param num_total: total number of steps
+        :raises JobCancelled: if the job has been cancelled, to abort the computation
+        """
+        self.raise_if_cancelled()
+        self.progress = num_done / num_total if num_total > 0 else 1.0
+
+
+class JobManager:
+    """
+    Runs computations in a thread pool and keeps track of them by job ID, so that a page can start a computation in one
+    request and ask for its progress and result in later ones. At most `max_workers` computations run at once, and at
+    most `max_waiting` more wait for a free worker. Each session, e.g. a browser tab, has at most one job: starting a
+    new one cancels the previous one, while a job older than the session's current one is not started at all. Jobs
+    are forgotten once cancelled or once their result has been picked up, and their IDs can not be used for another
+    job.
+    """
+
+    def __init__(self, max_workers: int = 2, max_waiting: int = 8):
+        # threads are only started with the first job, so creating a manager before forking the server is fine
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="cashdash-job"
+        )
+        self.max_waiting = max_waiting
+        self._jobs = {}  # type: Dict[str, Job]
+        self._waiting_jobs = set()  # type: Set[Job]
+        self._session_jobs = {}  # type: Dict[str, str]
+        self._forgotten_job_ids = {}  # type: Dict[str, None]
+        # reentrant, since cancelling a waiting job while holding the lock calls `_stop_waiting` right away
+        self._lock = threading.RLock()
+
+    def submit(
+        self,
+        computation: Callable[[Job], Any],
+        job_id: Optional[str] = None,
+        session: Optional[str] = None,
+    ) -> Job:
+        """
+        Start a computation in the background.
+        :param computation: function receiving the job handle and returning the result
+        :param job_id: ID to use for the job, e.g. to start a job again which another process started, see
+                       `new_job_id`. A new one is generated if None.
+        :param session: ID of the session starting the job, its previous job is cancelled
+        :return: the job handle
+        :raises JobQueueFull: if too many jobs are waiting for a free worker already
+        :raises JobCancelled: if a job with the given ID has been cancelled or its result has been picked up already, or
+                              if the session has a newer job
+        """
+        if job_id is None:
+            job_id = new_job_id()
+        job = Job(job_id)
+
+        def run(job: Job) -> Any:
+            with self._lock:
+                self._waiting_jobs.discard(job)
+            return computation(job)
+
+        # one locked section, so that concurrent submits for the same session agree on which job is the current one
+        with self._lock:
+            if job_id in self._forgotten_job_ids:
+                raise JobCancelled()
+            if session is not None:
+                previous_job_id = self._session_jobs.get(session)
+                if previous_job_id is not None and previous_job_id > job_id:
+                    # the job has been superseded already, e.g. a stale request started it again
+                    self.forget(job_id)
+                    raise JobCancelled()
+                self._session_jobs.pop(session, None)
+                if previous_job_id is not None and previous_job_id != job_id:
+                    self.cancel(previous_job_id)
+            if len(self._waiting_jobs) >= self.max_waiting:
+                raise JobQueueFull()
+            self._waiting_jobs.add(job)
+            self._jobs[job_id] = job
+            if session is not None:
+                self._session_jobs[session] = job_id
+            self._forget_old_jobs()
+        job.future = self._executor.submit(run, job)
+        # jobs cancelled while waiting never run
+        job.future.add_done_callback(lambda _: self._stop_waiting(job))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def is_forgotten(self, job_id: str) -> bool:
+        """
+        :param job_id:
+        :return: whether the job has been cancelled or its result has been picked up. Jobs which are simply unknown,
+                 e.g. because they have been started by another process, are not forgotten.
+        """
+        with self._lock:
+            return job_id in self._forgotten_job_ids
+
+    def cancel(self, job_id: str) -> None:
+        job = self.forget(job_id)
+        if job is not None:
+            job.cancel()
+
+    def forget(self, job_id: str) -> Optional[Job]:
+        """
+        Drop a job, e.g. once its result has been picked up.
+        :param job_id:
+        :return: the job handle, None if the job is unknown
+        """
+        with self._lock:
+            self._forgotten_job_ids[job_id] = None
+            num_old_job_ids = max(
+                len(self._forgotten_job_ids) - MAX_NUM_FORGOTTEN_JOBS, 0
+            )
+            for old_job_id in list(self._forgotten_job_ids)[:num_old_job_ids]:
+                del self._forgotten_job_ids[old_job_id]
+            return self._jobs.pop(job_id, None)
+
+    def _stop_waiting(self, job: Job) -> None:
+        with self._lock:
+            self._waiting_jobs.discard(job)
+
+    def _forget_old_jobs(self) -> None:
+        # dicts keep insertion order, so the oldest jobs and sessions come first
+        for job_id in list(self._jobs)[: max(len(self._jobs) - MAX_NUM_JOBS, 0)]:
+            self.cancel(job_id)
+        num_old_sessions = max(len(self._session_jobs) - MAX_NUM_JOBS, 0)
+        for session in list(self._session_jobs)[:num_old_sessions]:
+            del self._session_jobs[session]
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls of the same computation: while a computation for a key is running, further calls for
+    that key wait for it and share its result instead of computing it again. Results are not kept once the computation
+    is done.
+    """
+
+    def __init__(self, retry_on: Tuple[Type[BaseException], ...] = ()):
+        """
+        :param retry_on: exceptions which only abort the computation for the caller which started it, e.g. because its
+                         job was cancelled. Waiting callers then start the computation again instead of failing.
+        """
+        self._retry_on = retry_on
+        self._flights = {}  # type: Dict[Hashable, Future]
+        self._lock = threading.Lock()
+
+    def do(
+        self,
+        key: Hashable,
+        computation: Callable[[], Any],
+        check_cancelled: Optional[Callable[[], None]] = None,
+    ) -> Any:
+        """
+        Run the computation, or wait for the running computation with the same key.
+        :param key: identifies computations with the same result
+        :param computation:
+        :param check_cancelled: function raising an exception if the caller has been cancelled, e.g.
+                                `Job.raise_if_cancelled`. Called regularly while waiting for another caller's
+                                computation, so that cancelled callers stop waiting right away.
+        :return: result of the computation
+        """
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                if flight is None:
+                    flight = self._flights[key] = Future()
+                    break
+            while check_cancelled is not None:
+                check_cancelled()
+                if wait([flight], timeout=CANCEL_CHECK_SECONDS).done:
+                    break
+            try:
+                return flight.result()
+            except self._retry_on:
+                continue
+
+        try:
+            result = computation()
+        except BaseException as e:
+            self._land(key, flight)
+            flight.set_exception(e)
+            raise
+        self._land(key, flight)
+        flight.set_result(result)
+        return result
+
+    def _land(self, key: Hashable, flight: Future) -> None:
+        # later calls start a new computation, while the waiting ones get the result of this one
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import itertools
+import marshal
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Deque, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+# number of profiles kept, older ones are dropped
+MAX_NUM_PROFILES = 20
+
+# faster invocations are not kept, so that e.g. polling for progress does not push the interesting profiles out
+MIN_DURATION_SECONDS = 0.05
+
+# number of functions listed in the text version of a profile
+NUM_TEXT_ROWS = 50
+
+
+@dataclass
+class Profile:
+    profile_id: int
+    name: str
+    start_time: float
+    duration: float
+    profiler: cProfile.Profile
+
+    def to_bytes(self) -> bytes:
+        """
+        :return: the profile in the file format of `cProfile`, to be loaded with `pstats` or visualization tools
+        """
+        self.profiler.create_stats()
+        return marshal.dumps(self.profiler.stats)
+
+    def to_text(self) -> str:
+        """
+        :return: the functions taking the most cumulative time, as printed by `pstats`
+        """
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=stream)
+        stats.sort_stats("cumulative").print_stats(NUM_TEXT_ROWS)
+        return stream.getvalue()
+
+
+class ProfileRecorder:
+    """
+    Profiles code with cProfile while enabled, and keeps the most recent profiles.
+    """
+
+    def __init__(self, max_num_profiles: int = MAX_NUM_PROFILES):
+        self.is_enabled = False
+        self._profiles = deque(maxlen=max_num_profiles)  # type: Deque[Profile]
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._thread_local = threading.local()
+
+    @contextmanager
+    def profile(self, name: str):
+        """
+        Profile the enclosed block, if profiling is enabled. cProfile only profiles the current thread.
+        :param name: what is profiled, e.g. the name of a callback
+        """
+        # a block profiled already is covered by the outer profile
+        if not self.is_enabled or getattr(self._thread_local, "is_profiling", False):
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        start_time = time.time()
+        self._thread_local.is_profiling = True
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._thread_local.is_profiling = False
+            duration = time.time() - start_time
+            if duration < MIN_DURATION_SECONDS:
+                return
+            with self._lock:
+                self._profiles.append(
+                    Profile(next(self._ids), name, start_time, duration, profiler)
+                )
+
+    def get_profiles(self) -> List[Profile]:
+        with self._lock:
+            return list(self._profiles)
+
+    def get_profile(self, profile_id: int) -> Optional[Profile]:
+        with self._lock:
+            return next((p for p in self._profiles if p.profile_id == profile_id), None)
+
+
+PROFILES = ProfileRecorder()
+
+
+def enable_profiling(app: Flask) -> None:
+    """
+    Profile each Dash callback and serve the most recent profiles at `/_profile`. Profiles can be downloaded in the
+    cProfile file format at `/_profile/<id>`, or read as text at `/_profile/<id>?format=text`.
+    :param app:
+    """
+    from flask import Response, abort, g, jsonify, request
+
+    PROFILES.is_enabled = True
+
+    @app.before_request
+    def start_profiling():
+        if request.path.endswith("/_dash-update-component"):
+            output = (request.get_json(silent=True) or {}).get("output", "")
+            g.profile = PROFILES.profile(request.path.split("/")[1] + " " + output)
+            g.profile.__enter__()
+
+    @app.teardown_request
+    def stop_profiling(exception=None):
+        profile = g.pop("profile", None)
+        if profile is not None:
+            profile.__exit__(None, None, None)
+
+    @app.route("/_profile")
+    def list_profiles():
+        return jsonify(
+            [
+                {
+                    "id": p.profile_id,
+                    "name": p.name,
+                    "start_time": p.start_time,
+                    "duration": p.duration,
+                }
+                for p in reversed(PROFILES.get_profiles())
+            ]
+        )
+
+    @app.route("/_profile/<int:profile_id>")
+    def download_profile(profile_id: int):
+        profile = PROFILES.get_profile(profile_id)
+        if profile is None:
+            abort(404)
+        if request.args.get("format") == "text":
+            return Response(profile.to_text(), mimetype="text/plain")
+        return Response(
+            profile.to_bytes(),
+            mimetype="application/octet-stream",
+            headers={
+                "Content-Disposition": f"attachment; filename=profile-{profile_id}.prof"
+            },
+        )
@@ -0,0 +1,364 @@
+/*
+ * Clientside Dash callbacks. The server sends the data of a figure once, everything which only changes how this data is
+ * presented (averaging, labels, titles, aggregating dates) happens here, without a round trip to the server.
+ */
+(function () {
+    var MS_PER_DAY = 24 * 60 * 60 * 1000;
+    // colors of Sankey links, provisional ones stand out
+    var LINK_COLOR = "rgba(0, 0, 0, 0.2)";
+    var PROVISIONAL_LINK_COLOR = "rgba(255, 127, 14, 0.5)";
+
+    /**
+     * @param {number} day days since 1970-01-01
+     * @returns {string} the day in ISO format, e.g. "2020-01-31"
+     */
+    function formatDay(day) {
+        return new Date(day * MS_PER_DAY).toISOString().slice(0, 10);
+    }
+
+    /**
+     * Round to the nearest integer, and halves to the nearest even integer, the way numpy does.
+     * @param {number} x
+     * @returns {number}
+     */
+    function roundHalfEven(x) {
+        var rounded = Math.round(x);
+        return Math.abs(x % 1) === 0.5 ? 2 * Math.round(x / 2) : rounded;
+    }
+
+    /**
+     * @param {number} year
+     * @param {number} month zero-based
+     * @param {number} date day of the month, 0 for the last day of the previous month
+     * @returns {number} days since 1970-01-01
+     */
+    function toDay(year, month, date) {
+        return Date.UTC(year, month, date) / MS_PER_DAY;
+    }
+
+    /**
+     * Functions giving the period of a day, the same way pandas resamples with the corresponding rule: the day itself
+     * ("D"), the following Sunday ("W"), the first day of the month ("MS"), the last day of the quarter ("Q"), of the
+     * year ("Y") or of the decade, counted from the year of the first day ("10Y"). Each period function comes with a
+     * function to step from one period to the next.
+     */
+    var PERIODS = {
+        Day: {
+            of: function (day) {
+                return day;
+            },
+            next: function (day) {
+                return day + 1;
+            },
+        },
+        Week: {
+            of: function (day) {
+                // 1970-01-01 was a Thursday, weekdays are counted from Sunday
+                var weekday = (((day + 4) % 7) + 7) % 7;
+                return day + ((7 - weekday) % 7);
+            },
+            next: function (day) {
+                return day + 7;
+            },
+        },
+        Month: {
+            of: function (day) {
+                var date = new Date(day * MS_PER_DAY);
+                return toDay(date.getUTCFullYear(), date.getUTCMonth(), 1);
+            },
+            next: function (day) {
+                var date = new Date(day * MS_PER_DAY);
+                return toDay(date.getUTCFullYear(), date.getUTCMonth() + 1, 1);
+            },
+        },
+        Quarter: {
+            of: function (day) {
+                var date = new Date(day * MS_PER_DAY);
+                var quarter = Math.floor(date.getUTCMonth() / 3);
+                return toDay(date.getUTCFullYear(), 3 * quarter + 3, 0);
+            },
+            next: function (day) {
+                var date = new Date(day * MS_PER_DAY);
+                return toDay(date.getUTCFullYear(), date.getUTCMonth() + 4, 0);
+            },
+        },
+        Year: {
+            of: function (day) {
+                return toDay(new Date(day * MS_PER_DAY).getUTCFullYear() + 1, 0, 0);
+            },
+            next: function (day) {
+                return toDay(new Date(day * MS_PER_DAY).getUTCFullYear() + 2, 0, 0);
+            },
+        },
+        Decade: {
+            of: function (day, firstDay) {
+                var firstYear = new Date(firstDay * MS_PER_DAY).getUTCFullYear();
+                var year = new Date(day * MS_PER_DAY).getUTCFullYear();
+                return toDay(firstYear + 10 * Math.ceil((year - firstYear) / 10) + 1, 0, 0);
+            },
+            next: function (day) {
+                return toDay(new Date(day * MS_PER_DAY).getUTCFullYear() + 11, 0, 0);
+            },
+        },
+    };
+
+    /**
+     * Sum up daily values per period, with a zero sum for periods without values.
+     * @param {number[]} days sorted days since 1970-01-01
+     * @param {number[][]} values one array of daily values per series
+     * @param {string} aggregation key of `PERIODS`
+     * @returns {{periods: number[], sums: number[][]}} day labelling each period, see `PERIODS`, and the sums of each
+     *          series
+     */
+    function resample(days, values, aggregation) {
+        var period = PERIODS[aggregation];
+        var periods = [];
+        var sums = values.map(function () {
+            return [];
+        });
+        if (days.length === 0) {
+            return {periods: periods, sums: sums};
+        }
+        var last = period.of(days[days.length - 1], days[0]);
+        for (var p = period.of(days[0], days[0]); p <= last; p = period.next(p)) {
+            periods.push(p);
+            sums.forEach(function (s) {
+                s.push(0);
+            });
+        }
+        var i = 0;
+        days.forEach(function (day, j) {
+            var p = period.of(day, days[0]);
+            while (periods[i] !== p) {
+                i++;
+            }
+            values.forEach(function (v, k) {
+                sums[k][i] += v[j];
+            });
+        });
+        return {periods: periods, sums: sums};
+    }
+
+    /**
+     * Assign sorted points in time to equally wide buckets, see `cashdash.algo.downsampling.get_bucket_ids`.
+     * @param {number[]} times sorted, in milliseconds
+     * @param {number} numBuckets
+     * @param {?number[]} visibleRange start and end of the visible range in milliseconds, or null
+     * @returns {number[]} ascending bucket id of each point in time
+     */
+    function getBucketIds(times, numBuckets, visibleRange) {
+        var min = times[0];
+        var width = Math.max(times[times.length - 1] - min, 1);
+        return times.map(function (t) {
+            var overview = Math.floor(((t - min) / width) * numBuckets);
+            if (visibleRange === null) {
+                return overview;
+            }
+            var start = visibleRange[0];
+            var end = visibleRange[1];
+            if (t < start) {
+                return overview;
+            }
+            if (t > end) {
+                return overview + 2 * (numBuckets + 1);
+            }
+            return Math.floor(((t - start) / Math.max(end - start, 1)) * numBuckets) + numBuckets + 1;
+        });
+    }
+
+    /**
+     * Sum up bars per time bucket if there are more bars than buckets. Each bar then starts at the first point in time
+     * of its bucket and is as wide as the bucket, plus the typical distance between two of the original bars.
+     * @param {number[]} times sorted start of each bar, in milliseconds
+     * @param {number[][]} values one array of bar heights per series
+     * @param {number} numBuckets
+     * @param {?number[]} visibleRange see `getBucketIds`
+     * @returns {{times: number[], values: number[][], widths: ?number[]}} the summed up bars and their widths in
+     *          milliseconds (null if no downsampling was necessary)
+     */
+    function downsampleSum(times, values, numBuckets, visibleRange) {
+        if (times.length <= numBuckets) {
+            return {times: times, values: values, widths: null};
+        }
+        var bucketIds = getBucketIds(times, numBuckets, visibleRange);
+        var diffs = times.slice(1).map(function (t, i) {
+            return t - times[i];
+        });
+        diffs.sort(function (a, b) {
+            return a - b;
+        });
+        var middle = Math.floor(diffs.length / 2);
+        var period = diffs.length % 2 === 1 ? diffs[middle] : (diffs[middle - 1] + diffs[middle]) / 2;
+
+        var starts = [];
+        var ends = [];
+        var sums = values.map(function () {
+            return [];
+        });
+        bucketIds.forEach(function (id, i) {
+            if (i === 0 || id !== bucketIds[i - 1]) {
+                starts.push(times[i]);
+                ends.push(times[i]);
+                sums.forEach(function (s, k) {
+                    s.push(values[k][i]);
+                });
+            } else {
+                ends[ends.length - 1] = times[i];
+                sums.forEach(function (s, k) {
+                    s[s.length - 1] += values[k][i];
+                });
+            }
+        });
+        var widths = starts.map(function (start, i) {
+            return ends[i] - start + period;
+        });
+        return {times: starts, values: sums, widths: widths};
+    }
+
+    /**
+     * Extract the visible range of a graph's date x-axis, see `cashdash.dashes.base.get_visible_x_range`.
+     * @param {?Object} relayoutData
+     * @returns {?number[]} start and end in milliseconds, or null if the whole range is visible
+     */
+    function getVisibleXRange(relayoutData) {
+        if (!relayoutData) {
+            return null;
+        }
+        var range = relayoutData["xaxis.range"];
+        if (range === undefined) {
+            if (relayoutData["xaxis.range[0]"] === undefined || relayoutData["xaxis.range[1]"] === undefined) {
+                return null;
+            }
+            range = [relayoutData["xaxis.range[0]"], relayoutData["xaxis.range[1]"]];
+        }
+        return range.map(function (d) {
+            // plotly gives dates like "2020-01-31 12:00:00.5", without a time zone
+            return Date.parse(String(d).replace(" ", "T") + (String(d).length > 10 ? "Z" : ""));
+        });
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        cashflow: {
+            /**
+             * Draw the Sankey figure, averaging its values if requested. Provisional links are highlighted.
+             * @param {?Object} data figure with account names as node labels and absolute link values, the number of
+             *        periods of each averaging option, the date range, and which links are provisional (null if none
+             *        are), see `CashflowDashFactory`
+             * @param {string} average averaging option
+             * @returns {Object} the figure
+             */
+            render_figure: function (data, average) {
+                if (!data) {
+                    return window.dash_clientside.no_update;
+                }
+                var averaging = data.averaging[average];
+                var numPeriods = averaging ? averaging.num_periods : 1;
+                var sankey = data.figure.data[0];
+                var values = sankey.link.value.map(function (v) {
+                    return v / numPeriods;
+                });
+
+                // Label each node with the name of its account and the sum of money involved: the larger of its
+                // incoming and outgoing money, since asset accounts can save or spend saved money.
+                var names = sankey.node.label;
+                var incoming = names.map(function () {
+                    return 0;
+                });
+                var outgoing = incoming.slice();
+                values.forEach(function (v, i) {
+                    incoming[sankey.link.target[i]] += v;
+                    outgoing[sankey.link.source[i]] += v;
+                });
+                var sums = names.map(function (_, i) {
+                    return Math.max(incoming[i], outgoing[i]);
+                });
+                // if there are small values keep two decimals, otherwise round to int
+                var hasSmallSums = sums.some(function (s) {
+                    return s < 1;
+                });
+                var labels = names.map(function (name, i) {
+                    var sum = hasSmallSums ? (roundHalfEven(sums[i] * 100) / 100).toFixed(2) : roundHalfEven(sums[i]);
+                    return name + ": " + sum;
+                });
+
+                var titleParts = [];
+                if (averaging) {
+                    titleParts.push(averaging.description + "ly");
+                }
+                titleParts.push("cash flow");
+                if (data.start_date !== null) {
+                    titleParts.push("from " + data.start_date);
+                }
+                if (data.end_date !== null) {
+                    titleParts.push(data.start_date !== null ? "to" : "until");
+                    titleParts.push(data.end_date);
+                }
+                var isProvisional = data.provisional !== null && data.provisional.indexOf(true) >= 0;
+                if (isProvisional) {
+                    titleParts.push("(provisional, highlighted flows are estimates until all split transactions are solved)");
+                }
+                var title = titleParts.join(" ").toLowerCase();
+
+                var node = Object.assign({}, sankey.node, {label: labels});
+                var link = Object.assign({}, sankey.link, {
+                    value: values.map(function (v) {
+                        return roundHalfEven(v * 100) / 100;
+                    }),
+                });
+                if (isProvisional) {
+                    link.color = data.provisional.map(function (p) {
+                        return p ? PROVISIONAL_LINK_COLOR : LINK_COLOR;
+                    });
+                }
+                return {
+                    data: [Object.assign({}, sankey, {node: node, link: link})],
+                    layout: Object.assign({}, data.figure.layout, {
+                        title: {text: title.charAt(0).toUpperCase() + title.slice(1)},
+                    }),
+                };
+            },
+        },
+        expenses: {
+            /**
+             * Draw stacked bars of the expenses of each selected account, summed up per period.
+             * @param {?Object} data layout of the figure, daily expenses of the selected accounts and the maximum number
+             *        of bars per account, see `ExpensesDashFactory`
+             * @param {string} aggregation key of `PERIODS`
+             * @param {?Object} relayoutData of the graph, with its visible range
+             * @returns {Object} the figure
+             */
+            render_figure: function (data, aggregation, relayoutData) {
+                if (!data) {
+                    return window.dash_clientside.no_update;
+                }
+                var bars = [];
+                if (data.names.length > 0) {
+                    var resampled = resample(data.days, data.values, aggregation);
+                    // If there are more bars than can be shown, show summed up bars instead, with the most detail in the
+                    // visible range.
+                    var downsampled = downsampleSum(
+                        resampled.periods.map(function (day) {
+                            return day * MS_PER_DAY;
+                        }),
+                        resampled.sums,
+                        data.num_bars,
+                        getVisibleXRange(relayoutData)
+                    );
+                    var x = downsampled.times.map(function (t) {
+                        return formatDay(t / MS_PER_DAY);
+                    });
+                    bars = data.names.map(function (name, k) {
+                        var bar = {type: "bar", x: x, y: downsampled.values[k], name: name};
+                        if (downsampled.widths !== null) {
+                            bar.width = downsampled.widths;
+                            bar.offset = 0;
+                        }
+                        return bar;
+                    });
+                }
+                var xaxis = Object.assign({}, data.layout.xaxis, {tickformat: data.tick_formats[aggregation]});
+                return {data: bars, layout: Object.assign({}, data.layout, {xaxis: xaxis})};
+            },
+        },
+    });
+})();
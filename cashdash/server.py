@@ -0,0 +1,82 @@
+import gc
+import logging
+import os
+import signal
+import socket
+from typing import Set
+
+from flask import Flask
+from werkzeug.serving import make_server
+
+logger = logging.getLogger(__name__)
+
+
+def serve(app: Flask, host: str, port: int, num_workers: int) -> None:
+    """
+    Serve the app with several worker processes which share one listening socket (pre-fork model). Everything the app
+    has loaded and computed before this function is called, in particular the book data and the link cache, is shared
+    between all workers via copy-on-write memory pages instead of being held once per worker. Workers which die are
+    replaced. Only available on platforms supporting `os.fork`.
+    :param app: fully set up app
+    :param host:
+    :param port:
+    :param num_workers:
+    """
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server_socket.bind((host, port))
+    server_socket.listen(128)
+    server_socket.set_inheritable(True)
+
+    # Move all objects created so far into the permanent generation of the garbage collector. Otherwise, the first
+    # collection in each worker would touch (and thereby copy) most of the shared memory pages.
+    gc.collect()
+    gc.freeze()
+
+    workers = set()  # type: Set[int]
+    is_stopping = False
+
+    def spawn_worker():
+        pid = os.fork()
+        if pid == 0:
+            # the worker must never return from here, it would continue as a second master otherwise
+            exit_code = 0
+            try:
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                server = make_server(
+                    host, port, app, threaded=True, fd=server_socket.fileno()
+                )
+                server.serve_forever()
+            except BaseException:
+                logger.exception(f"Worker {os.getpid()} failed.")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        workers.add(pid)
+
+    def stop(signum, frame):
+        nonlocal is_stopping
+        is_stopping = True
+        for pid in workers:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for _ in range(num_workers):
+        spawn_worker()
+    logger.info(f"Serving on http://{host}:{port} with {num_workers} workers.")
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not is_stopping:
+            logger.warning(f"Worker {pid} exited with status {status}, restarting.")
+            spawn_worker()
+    server_socket.close()
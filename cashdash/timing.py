@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+# the data readers are timed as well, they should not need to import Flask
+if TYPE_CHECKING:
+    from flask import Flask
+
+# Prometheus metric holding the durations of all stages
+STAGE_DURATION_METRIC = "cashdash_stage_duration_seconds"
+
+
+class StageTimings:
+    """
+    Number of runs, total and maximum duration of named stages, e.g. the steps of a dash callback, since the start of
+    the process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}  # type: Dict[str, List[float]]
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            count_sum_max = self._stages.setdefault(stage, [0, 0.0, 0.0])
+            count_sum_max[0] += 1
+            count_sum_max[1] += seconds
+            count_sum_max[2] = max(count_sum_max[2], seconds)
+
+    def to_prometheus(self) -> str:
+        """
+        :return: all timings in the Prometheus text exposition format
+        """
+        with self._lock:
+            stages = sorted(self._stages.items())
+        lines = [
+            f"# HELP {STAGE_DURATION_METRIC} Duration of the stages of data loading and dash callbacks.",
+            f"# TYPE {STAGE_DURATION_METRIC} summary",
+        ]
+        for stage, (count, total, _) in stages:
+            lines.append(f'{STAGE_DURATION_METRIC}_count{{stage="{stage}"}} {count}')
+            lines.append(f'{STAGE_DURATION_METRIC}_sum{{stage="{stage}"}} {total}')
+        lines.append(f"# HELP {STAGE_DURATION_METRIC}_max Longest run of each stage.")
+        lines.append(f"# TYPE {STAGE_DURATION_METRIC}_max gauge")
+        for stage, (_, _, maximum) in stages:
+            lines.append(f'{STAGE_DURATION_METRIC}_max{{stage="{stage}"}} {maximum}')
+        return "\n".join(lines) + "\n"
+
+
+STAGE_TIMINGS = StageTimings()
+
+# stages timed by the current thread while handling a request, if Server-Timing headers are enabled
+_thread_local = threading.local()
+
+
+@contextmanager
+def timed(stage: str):
+    """
+    Measure how long the enclosed block takes and record it as a run of the given stage.
+    :param stage: name of the stage, dot-separated from general to specific, e.g. "cashflow.update_figure.links"
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_TIMINGS.record(stage, seconds)
+        request_timings = getattr(_thread_local, "request_timings", None)
+        if request_timings is not None:
+            request_timings.append((stage, seconds))
+
+
+def enable_metrics(app: Flask, server_timing: bool = False) -> None:
+    """
+    Serve the stage timings at `/metrics` for Prometheus. With several server processes, each process reports the stages
+    it ran itself.
+    :param app:
+    :param server_timing: also report the stages run while handling a request in its `Server-Timing` response header
+    """
+    from flask import Response
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(
+            STAGE_TIMINGS.to_prometheus(), mimetype="text/plain; version=0.0.4"
+        )
+
+    if not server_timing:
+        return
+
+    @app.before_request
+    def collect_timings():
+        _thread_local.request_timings = []
+
+    @app.after_request
+    def add_server_timing_header(response: Response) -> Response:
+        request_timings = getattr(
+            _thread_local, "request_timings", None
+        )  # type: Optional[List[Tuple[str, float]]]
+        _thread_local.request_timings = None
+        if request_timings:
+            response.headers["Server-Timing"] = ", ".join(
+                f"{stage};dur={seconds * 1000:.1f}"
+                for stage, seconds in request_timings
+            )
+        return response
@@ -0,0 +1,104 @@
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from flask import Flask, render_template
+from flask_compress import Compress
+
+from cashdash.caching import enable_http_caching, get_book_version
+from cashdash.dashes import *
+from cashdash.export import enable_export
+from cashdash.profiling import enable_profiling
+from cashdash.timing import enable_metrics
+from cashdash.data.gnucash import GnucashXmlBookDataReader
+
+
+def create_app(
+    data_path: str,
+    backend: Optional[str] = None,
+    precompute: bool = False,
+    warm_up: bool = False,
+    server_timing: bool = False,
+    profile: bool = False,
+    max_jobs: int = 2,
+    max_waiting_jobs: int = 8,
+):
+    """
+    Create the CashDash Flask app. Each dash is set up when it is requested for the first time.
+    :param data_path: path to the GnuCash file
+    :param backend: link reconstruction backend for the cash flow dash
+    :param precompute: set up all dashes and precompute their caches before returning the app
+    :param warm_up: set up all dashes in a background thread
+    :param server_timing: report the duration of stages in Server-Timing response headers
+    :param profile: profile each callback and serve the profiles at /_profile
+    :param max_jobs: maximum number of Sankey diagrams computed at once, per process
+    :param max_waiting_jobs: maximum number of Sankey diagrams waiting to be computed, per process. Further requests are
+                             rejected with a "busy" message.
+    :return:
+    """
+    resources_root = Path(__file__).parent / "resources"
+    static_folder = resources_root / "static"
+    app = Flask(
+        __name__,
+        static_folder=str(static_folder),
+        template_folder=str(resources_root / "templates"),
+    )
+    app.url_map.strict_slashes = False
+
+    # Compress large responses, figures in particular. Dash would set this up for each dash separately otherwise.
+    app.config.update(
+        COMPRESS_MIMETYPES=[
+            "text/html",
+            "text/css",
+            "application/javascript",
+            "application/json",
+        ],
+        COMPRESS_ALGORITHM=["br", "gzip"],
+        COMPRESS_MIN_SIZE=500,
+    )
+    Compress(app)
+    enable_http_caching(app, get_book_version(data_path))
+    enable_metrics(app, server_timing)
+    if profile:
+        enable_profiling(app)
+
+    reader = GnucashXmlBookDataReader()
+    data = reader.read(data_path)
+
+    # TODO this should also be configurable via command line or settings
+    data.remove_book_closing_transactions()
+
+    cashflow = CashflowDashFactory(backend, max_jobs, max_waiting_jobs)
+    dashes = [
+        ("/cashflow", cashflow),
+        ("/assets", AssetDashFactory()),
+        ("/expenses", ExpensesDashFactory()),
+    ]
+
+    navigation = OrderedDict((url, factory.get_dash_name()) for url, factory in dashes)
+
+    # create all dashes, setting them up happens later
+    css_folder = static_folder / "css"
+    for url, factory in dashes:
+        blueprint = factory.create_blueprint(data, navigation, str(css_folder))
+        app.register_blueprint(blueprint, url_prefix=url)
+    # exports share the links reconstructed for the cash flow dash
+    enable_export(app, data, cashflow.get_split_table, cashflow.jobs)
+    if precompute:
+        for _, factory in dashes:
+            factory.ensure_setup()
+            factory.precompute()
+    elif warm_up:
+
+        def set_up_dashes():
+            for _, factory in dashes:
+                factory.ensure_setup()
+
+        threading.Thread(target=set_up_dashes, daemon=True).start()
+
+    @app.route("/")
+    def index():
+        return render_template("index.html", navigation=navigation)
+
+    return app
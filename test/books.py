@@ -0,0 +1,56 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pandas as pd
+from anytree import Node
+
+from cashdash.data import BookData, TYPE, DESCRIPTION, NAME, GUID, DATE, TRANSACTION, ACCOUNT, VALUE, ASSET, BANK, \
+    CASH, LIABILITY, INCOME, EXPENSE
+
+
+def create_book() -> BookData:
+    """
+    Create a tiny book with one account of each kind and a handful of simple and split transactions.
+    """
+    accounts = pd.DataFrame([
+        ["root", "ROOT", "", "Root Account"],
+        ["assets", ASSET, "", "Assets"],
+        ["giro", BANK, "", "Giro"],
+        ["cash", CASH, "", "Cash"],
+        ["liabilities", LIABILITY, "", "Liabilities"],
+        ["credit", LIABILITY, "", "Credit Card"],
+        ["income", INCOME, "", "Income"],
+        ["salary", INCOME, "", "Salary"],
+        ["expenses", EXPENSE, "", "Expenses"],
+        ["food", EXPENSE, "", "Food"],
+    ], columns=[GUID, TYPE, DESCRIPTION, NAME]).set_index(GUID)
+
+    nodes = {"root": Node("root")}
+    for parent, children in [("root", ["assets", "liabilities", "income", "expenses"]), ("assets", ["giro", "cash"]),
+                             ("liabilities", ["credit"]), ("income", ["salary"]), ("expenses", ["food"])]:
+        for child in children:
+            nodes[child] = Node(child, parent=nodes[parent])
+
+    transactions = pd.DataFrame([
+        ["t1", datetime(2020, 1, 1), "Salary"],
+        ["t2", datetime(2020, 1, 2), "Groceries"],
+        ["t3", datetime(2020, 1, 3), "Groceries, paid partially in cash"],
+        ["t4", datetime(2020, 1, 4), "Withdrawal"],
+        ["t5", datetime(2020, 1, 5), "Groceries on credit"],
+    ], columns=[GUID, DATE, DESCRIPTION]).set_index(GUID)
+
+    splits = pd.DataFrame([
+        ["s1", "t1", "salary", Decimal("-100")],
+        ["s2", "t1", "giro", Decimal("100")],
+        ["s3", "t2", "giro", Decimal("-10")],
+        ["s4", "t2", "food", Decimal("10")],
+        ["s5", "t3", "giro", Decimal("-5")],
+        ["s6", "t3", "cash", Decimal("-5")],
+        ["s7", "t3", "food", Decimal("10")],
+        ["s8", "t4", "giro", Decimal("-20")],
+        ["s9", "t4", "cash", Decimal("20")],
+        ["s10", "t5", "credit", Decimal("-30")],
+        ["s11", "t5", "food", Decimal("30")],
+    ], columns=[GUID, TRANSACTION, ACCOUNT, VALUE]).set_index(GUID)
+
+    return BookData(accounts, transactions, splits, nodes["root"])
@@ -0,0 +1,55 @@
+import unittest
+from datetime import datetime
+
+import pandas as pd
+
+from test.books import create_book
+
+
+class BalanceIndexTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.balances = create_book().get_balance_index()
+
+    def test_balance(self):
+        # before the first transaction
+        self.assertEqual(0.0, self.balances.balance("giro", datetime(2019, 12, 31)))
+        # transactions on a date count towards the balance at that date
+        self.assertEqual(100.0, self.balances.balance("giro", datetime(2020, 1, 1)))
+        self.assertEqual(90.0, self.balances.balance("giro", "2020-01-02"))
+        self.assertEqual(65.0, self.balances.balance("giro", datetime(2020, 2, 1)))
+        self.assertEqual(15.0, self.balances.balance("cash", datetime(2020, 2, 1)))
+        # accounts without splits
+        self.assertEqual(0.0, self.balances.balance("assets", datetime(2020, 2, 1)))
+        self.assertEqual(0.0, self.balances.balance("liabilities", datetime(2020, 2, 1)))
+
+    def test_subtree_balance(self):
+        self.assertEqual(80.0, self.balances.balance("assets", datetime(2020, 2, 1), include_subtree=True))
+        self.assertEqual(-30.0, self.balances.balance("liabilities", datetime(2020, 2, 1), include_subtree=True))
+        self.assertEqual(50.0, self.balances.balance("expenses", datetime(2020, 2, 1), include_subtree=True))
+        # a leaf account only has its own splits
+        self.assertEqual(50.0, self.balances.balance("food", datetime(2020, 2, 1), include_subtree=True))
+        # all splits of a transaction sum up to zero
+        self.assertEqual(0.0, self.balances.balance("root", datetime(2020, 2, 1), include_subtree=True))
+
+    def test_balance_series(self):
+        dates = [datetime(2020, 1, day) for day in range(1, 6)]
+        series = self.balances.balance_series(["giro", "cash", "assets"], dates)
+        self.assertEqual(["giro", "cash", "assets"], list(series.columns))
+        self.assertEqual(dates, list(series.index))
+        self.assertEqual([100.0, 90.0, 85.0, 65.0, 65.0], list(series["giro"]))
+        self.assertEqual([0.0, 0.0, -5.0, 15.0, 15.0], list(series["cash"]))
+        self.assertEqual([0.0] * 5, list(series["assets"]))
+
+        # dates do not need to be sorted
+        series = self.balances.balance_series(["assets"], reversed(dates), include_subtree=True)
+        self.assertEqual([80.0, 80.0, 80.0, 90.0, 100.0], list(series["assets"]))
+
+    def test_dates(self):
+        self.assertEqual([pd.Timestamp(2020, 1, day) for day in range(1, 5)],
+                         list(self.balances.get_dates(["giro", "cash"])))
+
+    def test_unknown_account(self):
+        self.assertRaises(KeyError, self.balances.balance, "unknown", datetime(2020, 2, 1))
+        self.assertRaises(KeyError, self.balances.balance_series, ["giro", "unknown"], [datetime(2020, 2, 1)])
+        self.assertRaises(KeyError, self.balances.get_dates, ["unknown"])
@@ -0,0 +1,35 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks.harness import Result, find_regression, load_results, measure, save_results
+
+
+class BenchmarkHarnessTest(unittest.TestCase):
+
+    def test_measure(self):
+        calls = []
+        result = measure("list", lambda: calls.append(list(range(10000))), num_repeats=3)
+        # one run to measure memory, three timed runs
+        self.assertEqual(4, len(calls))
+        self.assertEqual(3, result.num_repeats)
+        self.assertLessEqual(result.min_seconds, result.seconds)
+        self.assertGreater(result.peak_memory_bytes, 10000 * 8)
+
+    def test_find_regression(self):
+        baseline = Result("a", 1.0, 0.9, 5, 1000)
+        self.assertIsNone(find_regression(Result("a", 1.2, 1.1, 5, 1100), baseline))
+        self.assertEqual("2.00x slower", find_regression(Result("a", 2.0, 1.9, 5, 1000), baseline))
+        self.assertEqual("2.00x slower, 1.50x more memory",
+                         find_regression(Result("a", 2.0, 1.9, 5, 1500), baseline))
+
+        # tiny absolute differences are noise
+        fast_baseline = Result("b", 0.001, 0.001, 5, 1000)
+        self.assertIsNone(find_regression(Result("b", 0.002, 0.002, 5, 1000), fast_baseline))
+
+    def test_save_and_load(self):
+        results = {"small/a": Result("small/a", 1.0, 0.9, 5, 1000)}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baseline.json")
+            save_results(results, path)
+            self.assertEqual(results, load_results(path))
@@ -0,0 +1,46 @@
+import unittest
+from itertools import count
+
+from flask import Flask
+
+from cashdash.caching import enable_http_caching
+
+
+class HttpCachingTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        app = Flask(__name__)
+        enable_http_caching(app, "v1")
+        self.num_computations = count()
+
+        @app.route("/page/")
+        def page():
+            next(self.num_computations)
+            return "page"
+
+        @app.route("/data")
+        def data():
+            return "data"
+
+        self.client = app.test_client()
+
+    def test_not_modified(self):
+        response = self.client.get("/page/")
+        self.assertEqual(200, response.status_code)
+        etag = response.headers["ETag"]
+        self.assertIn("v1", etag)
+        self.assertIn("Last-Modified", response.headers)
+
+        response = self.client.get("/page/", headers={"If-None-Match": etag})
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(etag, response.headers["ETag"])
+        # the page was not computed again
+        self.assertEqual(1, next(self.num_computations))
+
+    def test_other_version(self):
+        response = self.client.get("/page/", headers={"If-None-Match": '"v0-1"'})
+        self.assertEqual(200, response.status_code)
+
+    def test_other_paths_are_left_alone(self):
+        response = self.client.get("/data")
+        self.assertNotIn("ETag", response.headers)
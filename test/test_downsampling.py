@@ -0,0 +1,50 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from cashdash.algo.downsampling import get_bucket_ids, downsample_min_max
+
+
+class DownsamplingTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # thirty years of daily data for two accounts
+        dates = pd.date_range("1990-01-01", "2019-12-31", freq="D")
+        rng = np.random.RandomState(0)
+        self.df = pd.DataFrame({
+            "a": rng.normal(size=len(dates)).cumsum(),
+            "b": rng.normal(size=len(dates)).cumsum()
+        }, index=dates)
+
+    def test_bucket_ids_are_ascending(self):
+        visible_range = (pd.Timestamp("2000-01-01"), pd.Timestamp("2000-12-31"))
+        bucket_ids = get_bucket_ids(self.df.index, 100, visible_range)
+        self.assertTrue((np.diff(bucket_ids) >= 0).all())
+
+        # the visible range gets as many buckets as the whole date range
+        is_visible = (self.df.index >= visible_range[0]) & (self.df.index <= visible_range[1])
+        self.assertEqual(101, len(np.unique(bucket_ids[is_visible])))
+        self.assertLessEqual(len(np.unique(bucket_ids[~is_visible])), 101)
+
+    def test_min_max_keeps_envelope(self):
+        downsampled = downsample_min_max(self.df, num_buckets=100)
+        self.assertLess(len(downsampled), 600)
+        self.assertEqual(self.df.index[0], downsampled.index[0])
+        self.assertEqual(self.df.index[-1], downsampled.index[-1])
+        for column in self.df:
+            self.assertEqual(self.df[column].min(), downsampled[column].min())
+            self.assertEqual(self.df[column].max(), downsampled[column].max())
+
+    def test_min_max_adds_detail_in_visible_range(self):
+        visible_range = (pd.Timestamp("2000-01-01"), pd.Timestamp("2000-03-31"))
+        downsampled = downsample_min_max(self.df, num_buckets=100, visible_range=visible_range)
+        visible = downsampled.loc[visible_range[0]:visible_range[1]]
+        # the visible range contains fewer days than buckets, so nothing is left out
+        expected = self.df.loc[visible_range[0]:visible_range[1]]
+        self.assertTrue(expected.index.equals(visible.index))
+        np.testing.assert_array_equal(expected.values, visible.values)
+
+    def test_min_max_leaves_short_series_untouched(self):
+        df = self.df.iloc[:150]
+        self.assertIs(df, downsample_min_max(df, num_buckets=100))
@@ -0,0 +1,35 @@
+import unittest
+from datetime import datetime
+from decimal import Decimal
+
+import pandas as pd
+from anytree import Node, find
+
+from cashdash.dashes.expenses import compute_expense_subtree_totals
+from cashdash.data import BookData, EXPENSE
+from test.books import create_book
+
+
+class ExpenseSubtreeTotalsTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # add a restaurant account below the food account
+        data = create_book()
+        Node("restaurant", parent=find(data.account_hierarchy, lambda n: n.name == "food"))
+        accounts = data.accounts.append(pd.Series([EXPENSE, "", "Restaurant"], index=data.accounts.columns,
+                                                  name="restaurant"))
+        transactions = data.transactions.append(pd.Series([datetime(2020, 1, 5, 20, 15), "Dinner"],
+                                                          index=data.transactions.columns, name="t6"))
+        splits = data.splits.append(pd.DataFrame([["t6", "giro", Decimal("-15")], ["t6", "restaurant", Decimal("15")]],
+                                                 columns=data.splits.columns, index=["s12", "s13"]))
+        self.data = BookData(accounts, transactions, splits, data.account_hierarchy)
+
+    def test_subtree_totals(self):
+        totals = compute_expense_subtree_totals(self.data)
+        self.assertEqual(["expenses", "food", "restaurant"], list(totals.columns))
+        self.assertEqual([datetime(2020, 1, day) for day in [2, 3, 5]], list(totals.index))
+
+        self.assertEqual([0.0, 0.0, 15.0], list(totals["restaurant"]))
+        self.assertEqual([10.0, 10.0, 45.0], list(totals["food"]))
+        # the root expense account has no splits of its own, so it only carries the expenses of its subtree
+        self.assertEqual([10.0, 10.0, 45.0], list(totals["expenses"]))
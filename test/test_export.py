@@ -0,0 +1,78 @@
+import importlib.util
+import io
+import json
+import unittest
+
+import pandas as pd
+from flask import Flask
+
+from cashdash.algo.tables import SplitTable
+from cashdash.data import DATE, TRANSACTION
+from cashdash.export import enable_export, export_links, iter_transaction_links
+from cashdash.jobs import JobManager
+from test.books import create_book
+from test.test_split_table import CountingLinkReconstructor
+
+
+class ExportTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.data = create_book()
+        self.table = SplitTable(self.data, CountingLinkReconstructor(), fold_asset_accounts=False,
+                                treat_liabilities_as_assets=False)
+
+    def export(self, aggregated: bool, file_format: str, **kwargs) -> bytes:
+        return b"".join(export_links(self.data, self.table, aggregated, file_format, **kwargs))
+
+    def test_chunks(self):
+        chunks = list(iter_transaction_links(self.data, self.table, chunk_size=2))
+        self.assertEqual([2, 2, 1], [chunk[TRANSACTION].nunique() for chunk in chunks])
+        links = pd.concat(chunks)
+        self.assertEqual(["t1", "t2", "t3", "t3", "t4", "t5"], list(links[TRANSACTION]))
+        self.assertEqual(pd.Timestamp("2020-01-03"), links[DATE].iloc[2])
+
+    def test_csv(self):
+        links = pd.read_csv(io.BytesIO(self.export(False, "csv", start_date="2020-01-03")))
+        self.assertEqual(["transaction", "date", "source", "target", "value"], list(links.columns))
+        self.assertEqual(["t3", "t3", "t4", "t5"], list(links[TRANSACTION]))
+
+        totals = pd.read_csv(io.BytesIO(self.export(True, "csv")))
+        self.assertEqual(15.0, totals.loc[(totals["source"] == "giro") & (totals["target"] == "food"), "value"].item())
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self.export(False, "ndjson", end_date="2020-01-01").splitlines()]
+        self.assertEqual(1, len(rows))
+        self.assertTrue(rows[0].pop("date").startswith("2020-01-01T00:00:00"))
+        self.assertEqual({"transaction": "t1", "source": "salary", "target": "giro", "value": 100.0}, rows[0])
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_parquet(self):
+        links = pd.read_parquet(io.BytesIO(self.export(False, "parquet")))
+        self.assertEqual(["t1", "t2", "t3", "t3", "t4", "t5"], list(links[TRANSACTION]))
+
+    def test_endpoint(self):
+        app = Flask(__name__)
+        enable_export(app, self.data, lambda fold_asset_accounts, treat_liabilities_as_assets: self.table, JobManager())
+        client = app.test_client()
+
+        response = client.get("/export/aggregated-links.csv?start_date=2020-01-05")
+        self.assertEqual("text/csv", response.mimetype)
+        self.assertEqual(b"source,target,value\ncredit,food,30.0\n", response.data)
+        self.assertEqual(404, client.get("/export/splits.csv").status_code)
+
+        # the split transaction is solved by a job before the export is streamed
+        self.assertEqual(200, client.get("/export/links.csv").status_code)
+        self.assertEqual(0, len(self.table.get_unsolved_transactions(self.data.transactions.index)))
+
+    def test_endpoint_busy(self):
+        app = Flask(__name__)
+        jobs = JobManager(max_workers=1, max_waiting=0)
+        enable_export(app, self.data, lambda fold_asset_accounts, treat_liabilities_as_assets: self.table, jobs)
+        client = app.test_client()
+
+        # the split transaction needs to be solved, but no job can be started
+        response = client.get("/export/links.csv")
+        self.assertEqual(503, response.status_code)
+        self.assertIn("Retry-After", response.headers)
+        # exports without split transactions to solve do not need a job
+        self.assertEqual(200, client.get("/export/links.csv?start_date=2020-01-04").status_code)
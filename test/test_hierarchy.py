@@ -0,0 +1,43 @@
+import unittest
+
+from test.books import create_book
+
+
+class AccountTreeTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tree = create_book().account_tree
+
+    def test_pre_order(self):
+        self.assertEqual(["root", "assets", "giro", "cash", "liabilities", "credit", "income", "salary", "expenses",
+                          "food"], list(self.tree.guids))
+        self.assertEqual([-1, 0, 1, 1, 0, 4, 0, 6, 0, 8], list(self.tree.parents))
+        self.assertEqual([0, 1, 2, 2, 1, 2, 1, 2, 1, 2], list(self.tree.depths))
+
+    def test_subtree_ends(self):
+        self.assertEqual([10, 4, 3, 4, 6, 6, 8, 8, 10, 10], list(self.tree.subtree_ends))
+
+    def test_ancestors_at_depth(self):
+        ancestors = self.tree.ancestors_at_depth(1)
+        self.assertEqual("assets", ancestors["giro"])
+        self.assertEqual("assets", ancestors["assets"])
+        self.assertEqual("root", ancestors["root"])
+        self.assertEqual("expenses", ancestors["food"])
+
+        ancestors = self.tree.ancestors_at_depth(2)
+        self.assertEqual("giro", ancestors["giro"])
+
+    def test_post_order(self):
+        post_order = [self.tree.guids[p] for p in self.tree.get_post_order()]
+        self.assertEqual(["giro", "cash", "assets", "credit", "liabilities", "salary", "income", "food", "expenses",
+                          "root"], post_order)
+
+    def test_propagate_to_ancestors(self):
+        flags = self.tree.guids.isin(["cash", "food"])
+        propagated = self.tree.propagate_to_ancestors(flags)
+        self.assertEqual({"root", "assets", "cash", "expenses", "food"}, set(self.tree.guids[propagated]))
+
+        # flags do not pass accounts outside of the mask
+        mask = ~self.tree.guids.isin(["assets"])
+        propagated = self.tree.propagate_to_ancestors(flags, mask=mask)
+        self.assertEqual({"root", "cash", "expenses", "food"}, set(self.tree.guids[propagated]))
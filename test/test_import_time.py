@@ -0,0 +1,42 @@
+import subprocess
+import sys
+import unittest
+
+# modules which make importing take long, they must only be imported when they are actually used
+HEAVY_MODULES = ["anytree", "cvxpy", "dash", "flask", "minizinc", "numpy", "pandas", "plotly"]
+
+# generous, so that slow machines do not fail the test, but far below the time importing pandas alone takes
+IMPORT_TIME_BUDGET_US = 150000
+
+
+class ImportTimeTest(unittest.TestCase):
+
+    def _import(self, statement: str) -> dict:
+        """
+        Run the import statement in a fresh interpreter with `-X importtime`.
+        :return: cumulative import time in microseconds, by module name
+        """
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], stderr=subprocess.PIPE,
+                                universal_newlines=True, check=True)
+        times = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            times[name.strip()] = int(cumulative)
+        return times
+
+    def test_light_modules_do_not_import_heavy_modules(self):
+        times = self._import("import cashdash, cashdash.data, cashdash.algo, cashdash.algo.base")
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, times)
+
+    def test_import_time_budget(self):
+        times = self._import("import cashdash, cashdash.data, cashdash.algo, cashdash.algo.base")
+        total = sum(times[module] for module in ["cashdash", "cashdash.data", "cashdash.algo"])
+        self.assertLess(total, IMPORT_TIME_BUDGET_US)
+
+    def test_backends_are_imported_lazily(self):
+        times = self._import("from cashdash.dashes.cashflow import CashflowDashFactory; CashflowDashFactory(None)")
+        self.assertNotIn("cvxpy", times)
+        self.assertNotIn("minizinc", times)
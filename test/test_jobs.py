@@ -0,0 +1,246 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from cashdash.jobs import Job, JobCancelled, JobManager, JobQueueFull, SingleFlight, new_job_id
+
+
+class JobManagerTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.jobs = JobManager()
+
+    def test_result(self):
+        def computation(job):
+            for i in range(4):
+                job.report_progress(i + 1, 4)
+            return 42
+
+        job = self.jobs.submit(computation)
+        self.assertEqual(42, job.future.result(timeout=10))
+        self.assertEqual(1.0, job.progress)
+        self.assertIs(job, self.jobs.get(job.job_id))
+
+    def test_publish(self):
+        published = threading.Event()
+        proceed = threading.Event()
+
+        def computation(job):
+            job.publish(41)
+            published.set()
+            proceed.wait(timeout=10)
+            return 42
+
+        job = self.jobs.submit(computation)
+        published.wait(timeout=10)
+        self.assertEqual(41, job.preliminary_result)
+        self.assertFalse(job.future.done())
+        proceed.set()
+        self.assertEqual(42, job.future.result(timeout=10))
+
+    def test_given_job_id(self):
+        job = self.jobs.submit(lambda job: None, job_id="abc")
+        self.assertEqual("abc", job.job_id)
+        self.assertIs(job, self.jobs.get("abc"))
+
+    def test_cancel(self):
+        started = threading.Event()
+        proceed = threading.Event()
+
+        def computation(job):
+            started.set()
+            proceed.wait(timeout=10)
+            job.report_progress(1, 2)
+            return 42
+
+        job = self.jobs.submit(computation)
+        started.wait(timeout=10)
+        self.jobs.cancel(job.job_id)
+        proceed.set()
+
+        self.assertIsNone(self.jobs.get(job.job_id))
+        self.assertIsInstance(job.future.exception(timeout=10), JobCancelled)
+        # a cancelled job is never started again
+        self.assertTrue(self.jobs.is_forgotten(job.job_id))
+        self.assertRaises(JobCancelled, self.jobs.submit, lambda job: 42, job_id=job.job_id)
+
+    def test_forget(self):
+        job = self.jobs.submit(lambda job: 42, job_id="abc")
+        self.assertEqual(42, job.future.result(timeout=10))
+        self.assertIs(job, self.jobs.forget("abc"))
+
+        # the result has been picked up, so the job is not computed again
+        self.assertIsNone(self.jobs.get("abc"))
+        self.assertRaises(JobCancelled, self.jobs.submit, lambda job: 42, job_id="abc")
+        # unlike jobs which are merely unknown, e.g. because another process started them
+        self.assertFalse(self.jobs.is_forgotten("def"))
+        self.assertEqual("def", self.jobs.submit(lambda job: None, job_id="def").job_id)
+
+    def test_queue_full(self):
+        jobs = JobManager(max_workers=1, max_waiting=1)
+        proceed = threading.Event()
+        running = jobs.submit(lambda job: proceed.wait(timeout=10))
+        waiting = jobs.submit(lambda job: 42)
+        self.assertRaises(JobQueueFull, jobs.submit, lambda job: 43)
+
+        # cancelling the waiting job frees its place in the queue
+        jobs.cancel(waiting.job_id)
+        self.assertTrue(waiting.future.cancelled())
+        job = jobs.submit(lambda job: 44)
+        proceed.set()
+        self.assertTrue(running.future.result(timeout=10))
+        self.assertEqual(44, job.future.result(timeout=10))
+
+    def test_session(self):
+        started = threading.Event()
+        proceed = threading.Event()
+
+        def computation(job):
+            started.set()
+            proceed.wait(timeout=10)
+            job.report_progress(1, 1)
+            return job.job_id
+
+        first = self.jobs.submit(computation, session="tab")
+        started.wait(timeout=10)
+        other = self.jobs.submit(computation, session="other tab")
+        second = self.jobs.submit(computation, session="tab")
+        proceed.set()
+
+        # only the most recent job of a session is kept
+        self.assertIsNone(self.jobs.get(first.job_id))
+        self.assertIsInstance(first.future.exception(timeout=10), JobCancelled)
+        self.assertEqual(other.job_id, other.future.result(timeout=10))
+        self.assertEqual(second.job_id, second.future.result(timeout=10))
+
+    def test_stale_session_job(self):
+        proceed = threading.Event()
+
+        def computation(job):
+            proceed.wait(timeout=10)
+            job.report_progress(1, 1)
+            return job.job_id
+
+        first = self.jobs.submit(computation, session="tab")
+        second = self.jobs.submit(computation, session="tab")
+        # a stale request for the superseded job does not start it again, which would cancel the newer one
+        self.assertRaises(JobCancelled, self.jobs.submit, computation, job_id=first.job_id, session="tab")
+        proceed.set()
+        self.assertEqual(second.job_id, second.future.result(timeout=10))
+        self.assertIs(second, self.jobs.get(second.job_id))
+
+    def test_concurrent_session_jobs(self):
+        jobs = JobManager(max_waiting=100)
+        job_ids = [new_job_id() for _ in range(20)]
+        barrier = threading.Barrier(len(job_ids))
+        proceed = threading.Event()
+
+        def computation(job):
+            proceed.wait(timeout=10)
+            job.report_progress(1, 1)
+            return job.job_id
+
+        def submit(job_id):
+            barrier.wait(timeout=10)
+            try:
+                return jobs.submit(computation, job_id=job_id, session="tab")
+            except JobCancelled:
+                return None
+
+        with ThreadPoolExecutor(max_workers=len(job_ids)) as executor:
+            submitted = [job for job in executor.map(submit, reversed(job_ids)) if job is not None]
+        proceed.set()
+
+        # whatever the order of the requests, only the newest job of the session is kept
+        self.assertEqual([job_ids[-1]], [job.job_id for job in submitted if jobs.get(job.job_id) is not None])
+        self.assertEqual(job_ids[-1], jobs.get(job_ids[-1]).future.result(timeout=10))
+
+    def test_session_in_other_process(self):
+        first, second = new_job_id(), new_job_id()
+        self.assertLess(first, second)
+        proceed = threading.Event()
+
+        def computation(job):
+            proceed.wait(timeout=10)
+            job.report_progress(1, 1)
+            return job.job_id
+
+        # jobs started by another process are started again, but only the newest job of the session runs
+        jobs = JobManager()
+        restarted_second = jobs.submit(computation, job_id=second, session="tab")
+        self.assertRaises(JobCancelled, jobs.submit, computation, job_id=first, session="tab")
+        proceed.set()
+        self.assertEqual(second, restarted_second.future.result(timeout=10))
+
+        proceed.clear()
+        jobs = JobManager()
+        restarted_first = jobs.submit(computation, job_id=first, session="tab")
+        restarted_second = jobs.submit(computation, job_id=second, session="tab")
+        proceed.set()
+        self.assertIsInstance(restarted_first.future.exception(timeout=10), JobCancelled)
+        self.assertEqual(second, restarted_second.future.result(timeout=10))
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.flights = SingleFlight(retry_on=(JobCancelled,))
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.started = threading.Event()
+        self.proceed = threading.Event()
+        self.num_computations = 0
+
+    def tearDown(self) -> None:
+        self.proceed.set()
+        self.executor.shutdown()
+
+    def compute(self, result):
+        def computation():
+            self.num_computations += 1
+            self.started.set()
+            self.proceed.wait(timeout=10)
+            if isinstance(result, BaseException):
+                raise result
+            return result
+        return computation
+
+    def start_leader(self, result):
+        # the leading computation continues shortly after the calling thread has started waiting for it
+        leader = self.executor.submit(self.flights.do, "a", self.compute(result))
+        self.started.wait(timeout=10)
+        threading.Timer(0.1, self.proceed.set).start()
+        return leader
+
+    def test_shared_result(self):
+        leader = self.start_leader(42)
+        self.assertEqual(42, self.flights.do("a", self.compute(43)))
+        self.assertEqual(42, leader.result(timeout=10))
+        self.assertEqual(1, self.num_computations)
+        # other keys are computed separately, and nothing is kept once a computation is done
+        self.assertEqual(44, self.flights.do("b", lambda: 44))
+        self.assertEqual(45, self.flights.do("a", lambda: 45))
+
+    def test_shared_error(self):
+        leader = self.start_leader(ValueError())
+        self.assertRaises(ValueError, self.flights.do, "a", self.compute(42))
+        self.assertIsInstance(leader.exception(timeout=10), ValueError)
+        self.assertEqual(1, self.num_computations)
+
+    def test_retry(self):
+        leader = self.start_leader(JobCancelled())
+        # the leading computation was cancelled, so the waiting caller computes the result itself
+        self.assertEqual(42, self.flights.do("a", self.compute(42)))
+        self.assertIsInstance(leader.exception(timeout=10), JobCancelled)
+        self.assertEqual(2, self.num_computations)
+
+    def test_cancelled_follower(self):
+        leader = self.executor.submit(self.flights.do, "a", self.compute(42))
+        self.started.wait(timeout=10)
+        job = Job("follower")
+        threading.Timer(0.1, job.cancel).start()
+        # the waiting caller stops once its job is cancelled, without waiting for the leading computation
+        self.assertRaises(JobCancelled, self.flights.do, "a", self.compute(43), job.raise_if_cancelled)
+        self.assertFalse(leader.done())
+        self.proceed.set()
+        self.assertEqual(42, leader.result(timeout=10))
+        self.assertEqual(1, self.num_computations)
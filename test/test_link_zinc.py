@@ -1,4 +1,13 @@
-from cashdash.algo.zinc_links import ZincLinkReconstructor
+import itertools
+import random
+import unittest
+
+import cvxpy as cp
+import numpy as np
+import pandas as pd
+
+from cashdash.algo.zinc_links import ZincLinkReconstructor, get_denomination, get_edges
+from cashdash.data import ASSET, BANK, CASH, EQUITY, EXPENSE, INCOME, LIABILITY, TYPE, VALUE
 from test.abstract_link_test import AbstractTest
 
 
@@ -6,3 +15,104 @@ class ZincLinkReconstructionTest(AbstractTest.LinkReconstructionTest):
 
     def setUp(self) -> None:
         self.uut = ZincLinkReconstructor()
+
+
+class ZincModelDataTest(unittest.TestCase):
+
+    def test_denomination(self):
+        self.assertEqual(1, get_denomination(np.array([-1500.0, 1000.0, 500.0])))
+        self.assertEqual(10, get_denomination(np.array([-0.5, 0.2, 0.3])))
+        self.assertEqual(100, get_denomination(np.array([-12345.67, 12345.6, 0.07])))
+
+    def test_edges_bounded_by_non_asset_accounts(self):
+        # income -10, bank +2, expenses +5 and +3: income only sends, expenses only receive
+        sources, targets, bounds = get_edges(np.array([INCOME, BANK, EXPENSE, EXPENSE]), np.array([-10, 2, 5, 3]))
+        self.assertEqual([(0, 1, 10), (1, 2, 5), (1, 3, 3)], list(zip(sources, targets, bounds)))
+
+    def test_edges_between_asset_accounts(self):
+        # flow may pass through asset accounts in both directions, bounded by the total flow
+        sources, targets, bounds = get_edges(np.array([BANK, CASH, EXPENSE]), np.array([-6, -2, 8]))
+        self.assertEqual([(0, 1, 8), (1, 0, 8), (0, 2, 8), (1, 2, 8)], list(zip(sources, targets, bounds)))
+
+    def test_edges_without_asset_accounts(self):
+        # without asset accounts, income and expense accounts may pass on flow
+        sources, targets, bounds = get_edges(np.array([INCOME, EXPENSE, INCOME]), np.array([-10, 5, 5]))
+        self.assertEqual([(0, 1, 10), (1, 0, 10), (1, 2, 10), (2, 1, 10)], list(zip(sources, targets, bounds)))
+
+
+def solve_flow_lp(num_nodes, deltas, edges, bounds=None):
+    """
+    Solve the linear relaxation of a link model: minimal total flow over the given directed edges, such that ingoing
+    minus outgoing flow equals the delta of each node.
+    :return: the minimal total flow, None if infeasible
+    """
+    if not edges:
+        return None
+    flows = cp.Variable(len(edges), nonneg=True)
+    incidence = np.zeros((num_nodes, len(edges)))
+    for k, (source, target) in enumerate(edges):
+        incidence[source, k] -= 1
+        incidence[target, k] += 1
+    constraints = [incidence @ flows == np.asarray(deltas, dtype=float)]
+    if bounds is not None:
+        constraints.append(flows <= np.asarray(bounds, dtype=float))
+    problem = cp.Problem(cp.Minimize(cp.sum(flows)), constraints)
+    problem.solve()
+    return problem.value if problem.status == cp.OPTIMAL else None
+
+
+def solve_dense_model(types, deltas):
+    """
+    Linear relaxation of the previous model, which had a flow variable for every pair of accounts whose types may
+    exchange money, bounded by the sum of all deltas only. Its unidirectionality constraint is left out, minimizing the
+    total flow implies it.
+    """
+    asset_types = [CASH, BANK, ASSET, LIABILITY]
+    has_assets = any(t in asset_types for t in types)
+    edges = []
+    for n1, n2 in itertools.permutations(range(len(types)), 2):
+        pair = sorted(ASSET if types[n] in asset_types else types[n] for n in (n1, n2))
+        if pair in ([ASSET, INCOME], [ASSET, EXPENSE], [ASSET, ASSET]) or not has_assets and pair == [EXPENSE, INCOME]:
+            edges.append((n1, n2))
+    return solve_flow_lp(len(types), deltas, edges)
+
+
+def solve_bounded_model(types, deltas):
+    sources, targets, bounds = get_edges(np.array(types), np.array(deltas))
+    return solve_flow_lp(len(types), deltas, list(zip(sources, targets)), bounds)
+
+
+class ZincModelEquivalenceTest(unittest.TestCase):
+    """
+    The bounded edges given to the model must not change which transactions can be solved or the total flow of their
+    solutions. Checked on the linear relaxations of both models, so that no MiniZinc installation is needed.
+    """
+
+    def assertSameOptimum(self, types, deltas):
+        dense, bounded = solve_dense_model(types, deltas), solve_bounded_model(types, deltas)
+        message = f"types {types}, deltas {deltas}"
+        if dense is None:
+            self.assertIsNone(bounded, message)
+        else:
+            self.assertIsNotNone(bounded, message)
+            self.assertAlmostEqual(dense, bounded, delta=1e-4 * max(1.0, dense), msg=message)
+
+    def test_test_transactions(self):
+        for csv in sorted(AbstractTest.LinkReconstructionTest.TEST_RESOURCES_ROOT.glob("*.csv")):
+            splits = pd.read_csv(csv)
+            values = splits[VALUE].astype(float).values
+            deltas = np.round(values * get_denomination(values)).astype(int)
+            with self.subTest(csv.name):
+                self.assertSameOptimum(list(splits[TYPE]), deltas.tolist())
+
+    def test_random_transactions(self):
+        rng = random.Random(0)
+        all_types = [BANK, CASH, ASSET, LIABILITY, INCOME, EXPENSE, EQUITY]
+        for _ in range(200):
+            num_splits = rng.randint(3, 8)
+            # transactions with income and expense accounts only are frequent enough to be covered as well
+            types_to_pick = all_types if rng.random() < 0.7 else [INCOME, EXPENSE]
+            types = [rng.choice(types_to_pick) for _ in range(num_splits)]
+            deltas = [rng.randint(-1000, 1000) for _ in range(num_splits - 1)]
+            deltas.append(-sum(deltas))
+            self.assertSameOptimum(types, deltas)
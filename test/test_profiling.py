@@ -0,0 +1,48 @@
+import marshal
+import time
+import unittest
+
+from cashdash.profiling import ProfileRecorder
+
+
+def work():
+    time.sleep(0.1)
+    return sum(range(1000))
+
+
+class ProfileRecorderTest(unittest.TestCase):
+
+    def test_disabled(self):
+        profiles = ProfileRecorder()
+        with profiles.profile("work"):
+            work()
+        self.assertEqual([], profiles.get_profiles())
+
+    def test_ring_buffer(self):
+        profiles = ProfileRecorder(max_num_profiles=2)
+        profiles.is_enabled = True
+        for i in range(3):
+            with profiles.profile(f"work {i}"):
+                work()
+        self.assertEqual(["work 1", "work 2"], [p.name for p in profiles.get_profiles()])
+        self.assertIsNone(profiles.get_profile(0))
+
+        profile = profiles.get_profile(2)
+        self.assertIn("work", profile.to_text())
+        stats = marshal.loads(profile.to_bytes())
+        self.assertTrue(any(function == "work" for _, _, function in stats))
+
+    def test_nested(self):
+        profiles = ProfileRecorder()
+        profiles.is_enabled = True
+        with profiles.profile("outer"):
+            with profiles.profile("inner"):
+                work()
+        self.assertEqual(["outer"], [p.name for p in profiles.get_profiles()])
+
+    def test_fast_invocations_are_dropped(self):
+        profiles = ProfileRecorder()
+        profiles.is_enabled = True
+        with profiles.profile("fast"):
+            pass
+        self.assertEqual([], profiles.get_profiles())
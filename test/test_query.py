@@ -0,0 +1,56 @@
+import unittest
+import unittest.mock
+from datetime import datetime
+
+from cashdash.data import EXPENSE
+from test.books import create_book
+
+
+class SplitQueryTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.data = create_book()
+
+    def test_between(self):
+        query = self.data.query().between("2020-01-02", "2020-01-04")
+        self.assertEqual(["t2", "t3", "t4"], list(query.transactions().index))
+        self.assertEqual(["s3", "s4", "s5", "s6", "s7", "s8", "s9"], list(query.splits().index))
+        # ranges narrow each other down
+        self.assertEqual(["t3"], list(query.between(end=datetime(2020, 1, 3)).between("2020-01-03").transactions().index))
+
+    def test_accounts(self):
+        self.assertEqual(["s2", "s3", "s5", "s6", "s8", "s9"], list(self.data.query().of_subtree("assets").splits().index))
+        self.assertEqual(["s4", "s7", "s11"], list(self.data.query().of_types([EXPENSE]).splits().index))
+        # account predicates intersect
+        query = self.data.query().of_subtree("assets").of_accounts(["cash", "food"])
+        self.assertEqual(["s6", "s9"], list(query.splits().index))
+        self.assertEqual(["t3", "t4"], list(query.transactions().index))
+
+    def test_exclusions(self):
+        query = self.data.query().excluding_transactions(["t1"]).excluding_transactions_of(["cash", "unknown"])
+        self.assertEqual(["t2", "t5"], list(query.transactions().index))
+        self.assertEqual(["s3", "s4", "s10", "s11"], list(query.splits().index))
+
+    def test_sum_by_period(self):
+        daily = self.data.query().of_subtree("expenses").sum_by_period()
+        self.assertEqual(["food"], list(daily.columns))
+        self.assertEqual([datetime(2020, 1, day) for day in (2, 3, 5)], list(daily.index))
+        self.assertEqual([10.0, 10.0, 30.0], list(daily["food"]))
+
+        monthly = self.data.query().of_accounts(["giro", "cash"]).sum_by_period("MS")
+        self.assertEqual(["giro", "cash"], list(monthly.columns))
+        self.assertEqual([65.0], list(monthly["giro"]))
+        self.assertEqual([15.0], list(monthly["cash"]))
+
+    def test_cached(self):
+        query = self.data.query().of_subtree("assets")
+        self.assertIs(query._get_positions(), self.data.query().of_subtree("assets")._get_positions())
+        # the cache is bounded by the size of the cached arrays, dropping the least recently used ones
+        positions = query._get_positions()
+        with unittest.mock.patch("cashdash.data.query.MAX_CACHED_BYTES", positions.nbytes):
+            expenses = self.data.query().of_subtree("expenses")
+            self.assertIs(expenses._get_positions(), expenses._get_positions())
+        self.assertIsNot(positions, query._get_positions())
+        # resetting the book resets its queries
+        self.data.remove_book_closing_transactions()
+        self.assertIsNot(query.indexed_splits, self.data.query().indexed_splits)
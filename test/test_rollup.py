@@ -0,0 +1,49 @@
+import unittest
+
+import pandas as pd
+from anytree import Node
+
+from cashdash.algo.base import SOURCE, TARGET
+from cashdash.algo.rollup import roll_up_links
+from cashdash.data import VALUE
+from cashdash.data.hierarchy import AccountTree
+
+
+class RollUpLinksTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        root = Node("root")
+        assets, expenses, income = Node("assets", parent=root), Node("expenses", parent=root), Node("income", parent=root)
+        Node("giro", parent=assets), Node("cash", parent=assets), Node("salary", parent=income)
+        Node("restaurant", parent=Node("food", parent=expenses))
+        self.account_tree = AccountTree.from_hierarchy(root)
+        self.names = pd.Series({n: n.capitalize() for n in self.account_tree.guids})
+        self.links = pd.DataFrame([
+            ["salary", "giro", 100.0],
+            ["giro", "restaurant", 10.0],
+            ["cash", "food", 5.0],
+        ], columns=[SOURCE, TARGET, VALUE])
+
+    def roll_up(self, **kwargs):
+        links, labels = roll_up_links(self.links, self.account_tree, self.names, **kwargs)
+        return sorted(links.itertuples(index=False, name=None)), labels
+
+    def test_full_hierarchy(self):
+        links, labels = self.roll_up()
+        self.assertEqual([("cash", "food", 5.0), ("food", "restaurant", 10.0), ("giro", "food", 10.0),
+                          ("salary", "giro", 100.0)], links)
+        self.assertEqual("Restaurant", labels["restaurant"])
+
+    def test_max_depth(self):
+        # the restaurant is merged into the food account, which already shows its expenses
+        links, labels = self.roll_up(max_depth=1)
+        self.assertEqual([("cash", "food", 5.0), ("giro", "food", 10.0), ("salary", "giro", 100.0)], links)
+        self.assertNotIn("restaurant", labels)
+
+    def test_min_share(self):
+        # the cash and restaurant accounts have less than 10% of the 115 flowing
+        links, labels = self.roll_up(min_share=0.1)
+        self.assertEqual([("food", "other:food", 10.0), ("giro", "food", 10.0), ("other:assets", "food", 5.0),
+                          ("salary", "giro", 100.0)], links)
+        self.assertEqual("Other (Food)", labels["other:food"])
+        self.assertEqual("Other (Assets)", labels["other:assets"])
@@ -0,0 +1,37 @@
+import unittest
+
+import pandas as pd
+
+from cashdash.data.search import DescriptionIndex, get_trigrams
+from test.books import create_book
+
+
+class DescriptionIndexTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.data = create_book()
+        self.index = self.data.get_description_index()
+
+    def search(self, query):
+        return list(self.data.transactions.index[self.index.search(query)])
+
+    def test_trigrams(self):
+        self.assertEqual({"abc", "bcd"}, get_trigrams("abcd"))
+        self.assertEqual(set(), get_trigrams("ab"))
+
+    def test_search(self):
+        self.assertEqual(["t2", "t3", "t5"], self.search("groceries"))
+        self.assertEqual(["t3"], self.search("CASH"))
+        # short terms do not narrow down the search
+        self.assertEqual(list(self.data.transactions.index), self.search("al"))
+        self.assertEqual(["t2", "t3", "t5"], self.search("gr groceries"))
+        # all terms have to match, in any order
+        self.assertEqual(["t3"], self.search("cash groc"))
+        self.assertEqual([], self.search("groceries salary"))
+        # everything matches an empty query
+        self.assertEqual(list(self.data.transactions.index), self.search(" "))
+
+    def test_trigrams_of_term_in_other_order(self):
+        # "abcab" contains all trigrams of "bcabc", but not the term itself
+        index = DescriptionIndex(pd.Series(["abcab", "xbcabcx", None]))
+        self.assertEqual([False, True, False], list(index.search("bcabc")))
@@ -0,0 +1,105 @@
+import unittest
+
+import pandas as pd
+
+from cashdash.algo.base import LinkReconstructor, SOURCE, TARGET
+from cashdash.algo.tables import SplitTable, DUMMY_ASSET_ACCOUNT, PROVISIONAL
+from cashdash.data import TYPE, ACCOUNT, VALUE, LIABILITY, TRANSACTION
+from test.books import create_book
+
+
+class CountingLinkReconstructor(LinkReconstructor):
+    """
+    Links every negative split to every positive split of a transaction, and counts how often it was invoked.
+    """
+
+    def __init__(self):
+        self.num_calls = 0
+
+    def reconstruct(self, splits: pd.DataFrame):
+        self.num_calls += 1
+        sources = splits.loc[splits[VALUE] < 0]
+        targets = splits.loc[splits[VALUE] > 0]
+        total = targets[VALUE].sum()
+        return [{SOURCE: s[ACCOUNT], TARGET: t[ACCOUNT], VALUE: -s[VALUE] * t[VALUE] / total}
+                for _, s in sources.iterrows() for _, t in targets.iterrows()]
+
+
+class SplitTableTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.data = create_book()
+        self.reconstructor = CountingLinkReconstructor()
+
+    def links_as_list(self, links: pd.DataFrame):
+        return sorted((r[SOURCE], r[TARGET], round(r[VALUE], 2)) for _, r in links.iterrows())
+
+    def test_unfolded(self):
+        table = SplitTable(self.data, self.reconstructor, fold_asset_accounts=False, treat_liabilities_as_assets=False)
+        links = table.get_links(self.data.transactions.index)
+        self.assertEqual(sorted([
+            ("salary", "giro", 100.0),
+            ("giro", "food", 10.0),
+            ("giro", "food", 5.0),
+            ("cash", "food", 5.0),
+            ("giro", "cash", 20.0),
+            ("credit", "food", 30.0),
+        ]), self.links_as_list(links))
+        self.assertEqual(1, self.reconstructor.num_calls)
+
+    def test_links_of_split_transactions_are_cached(self):
+        table = SplitTable(self.data, self.reconstructor, fold_asset_accounts=False, treat_liabilities_as_assets=False)
+        table.get_links(pd.Index(["t1", "t3"]))
+        table.get_links(pd.Index(["t3"]))
+        self.assertEqual(1, self.reconstructor.num_calls)
+
+        links = table.get_links(pd.Index(["t2"]))
+        self.assertEqual([("giro", "food", 10.0)], self.links_as_list(links))
+        self.assertEqual(1, self.reconstructor.num_calls)
+
+    def test_folded(self):
+        table = SplitTable(self.data, self.reconstructor, fold_asset_accounts=True, treat_liabilities_as_assets=False)
+        links = table.get_links(self.data.transactions.index)
+
+        # the split transaction becomes a simple one, the transfer between asset accounts disappears
+        self.assertEqual(sorted([
+            ("salary", DUMMY_ASSET_ACCOUNT, 100.0),
+            (DUMMY_ASSET_ACCOUNT, "food", 10.0),
+            (DUMMY_ASSET_ACCOUNT, "food", 10.0),
+            ("credit", "food", 30.0),
+        ]), self.links_as_list(links))
+        self.assertEqual(0, self.reconstructor.num_calls)
+        self.assertIn(DUMMY_ASSET_ACCOUNT, table.accounts.index)
+        self.assertNotIn(DUMMY_ASSET_ACCOUNT, self.data.accounts.index)
+
+    def test_folded_with_liabilities_as_assets(self):
+        table = SplitTable(self.data, self.reconstructor, fold_asset_accounts=True, treat_liabilities_as_assets=True)
+        links = table.get_links(pd.Index(["t5"]))
+        self.assertEqual([(DUMMY_ASSET_ACCOUNT, "food", 30.0)], self.links_as_list(links))
+
+        # the book itself must remain untouched
+        self.assertEqual(LIABILITY, self.data.accounts.at["credit", TYPE])
+
+    def test_approximate(self):
+        table = SplitTable(self.data, self.reconstructor, fold_asset_accounts=False, treat_liabilities_as_assets=False)
+        links = table.get_links(pd.Index(["t2", "t3"]), approximate=True)
+        self.assertEqual(0, self.reconstructor.num_calls)
+        # the money of both sources of the split transaction is split in proportion to the only target
+        self.assertEqual([("cash", "food", 5.0), ("giro", "food", 5.0), ("giro", "food", 10.0)], self.links_as_list(links))
+        self.assertEqual([5.0, 5.0], sorted(links.loc[links[PROVISIONAL] > 0, VALUE]))
+
+        # reconstructed links replace the approximate ones
+        table.get_links(pd.Index(["t3"]))
+        links = table.get_links(pd.Index(["t2", "t3"]), approximate=True)
+        self.assertEqual(1, self.reconstructor.num_calls)
+        self.assertEqual(0, links[PROVISIONAL].sum())
+
+    def test_transaction_links(self):
+        table = SplitTable(self.data, self.reconstructor, fold_asset_accounts=False, treat_liabilities_as_assets=False)
+        self.assertEqual(["t3"], list(table.get_unsolved_transactions(pd.Index(["t1", "t3", "unknown"]))))
+
+        links = table.get_transaction_links(pd.Index(["t3", "t1", "unknown"]))
+        # links are ordered like the given transactions
+        self.assertEqual(["t3", "t3", "t1"], list(links[TRANSACTION]))
+        self.assertEqual([("cash", "food", 5.0), ("giro", "food", 5.0), ("salary", "giro", 100.0)], self.links_as_list(links))
+        self.assertEqual(0, len(table.get_unsolved_transactions(pd.Index(["t1", "t3"]))))
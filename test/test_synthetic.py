@@ -0,0 +1,77 @@
+import gzip
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from cashdash.data.synthetic import BookSpec, SyntheticBookGenerator, write_book
+
+
+class SyntheticBookGeneratorTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.spec = BookSpec(num_years=2, num_accounts=30, max_depth=4, num_transactions=500, split_ratio=0.3,
+                             max_split_width=5, seed=7)
+        self.generator = SyntheticBookGenerator(self.spec)
+
+    def test_deterministic(self):
+        other = SyntheticBookGenerator(self.spec)
+        self.assertEqual([a.guid for a in self.generator.accounts], [a.guid for a in other.accounts])
+        self.assertEqual(list(self.generator.generate_transactions()), list(other.generate_transactions()))
+        # generating twice gives the same transactions as well
+        self.assertEqual(list(self.generator.generate_transactions()), list(other.generate_transactions()))
+
+        different_seed = SyntheticBookGenerator(BookSpec(seed=8))
+        self.assertNotEqual(self.generator.book_guid, different_seed.book_guid)
+
+    def test_accounts(self):
+        self.assertTrue(all(a.depth <= self.spec.max_depth for a in self.generator.accounts))
+        self.assertEqual(self.spec.max_depth, max(a.depth for a in self.generator.accounts))
+        for account in self.generator.accounts[1:]:
+            self.assertIn(account, account.parent.children)
+
+    def test_transactions(self):
+        transactions = list(self.generator.generate_transactions())
+        num_split_transactions = 0
+        for transaction in transactions:
+            self.assertEqual(0, sum(value for _, _, value in transaction.splits))
+            self.assertTrue(all(value != 0 for _, _, value in transaction.splits))
+            self.assertLessEqual(len(transaction.splits), self.spec.max_split_width)
+            num_split_transactions += len(transaction.splits) > 2
+
+        self.assertAlmostEqual(self.spec.split_ratio, num_split_transactions / self.spec.num_transactions, delta=0.1)
+        dates = [t.date for t in transactions]
+        self.assertEqual(sorted(dates), dates)
+        self.assertLess((dates[-1] - dates[0]).days, self.spec.num_years * 366)
+
+    def test_write_xml(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.gnucash")
+            write_book(self.spec, path, "xml")
+            with gzip.open(path, "rt") as f:
+                content = f.read()
+
+        transactions = list(self.generator.generate_transactions())
+        self.assertEqual(len(transactions), content.count("<gnc:transaction "))
+        self.assertEqual(len(self.generator.accounts), content.count("<gnc:account "))
+        self.assertEqual(sum(len(t.splits) for t in transactions), content.count("<trn:split>"))
+
+    def test_write_sqlite(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.sqlite")
+            write_book(self.spec, path, "sqlite")
+            connection = sqlite3.connect(path)
+            counts = {table: connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                      for table in ["accounts", "transactions", "splits"]}
+            balances = connection.execute("SELECT tx_guid, SUM(value_num) FROM splits GROUP BY tx_guid").fetchall()
+            connection.close()
+
+        transactions = list(self.generator.generate_transactions())
+        self.assertEqual(len(self.generator.accounts), counts["accounts"])
+        self.assertEqual(len(transactions), counts["transactions"])
+        self.assertEqual(sum(len(t.splits) for t in transactions), counts["splits"])
+        self.assertTrue(all(balance == 0 for _, balance in balances))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            write_book(self.spec, "book.csv", "csv")
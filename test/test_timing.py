@@ -0,0 +1,34 @@
+import unittest
+
+from flask import Flask
+
+from cashdash.timing import StageTimings, STAGE_TIMINGS, enable_metrics, timed
+
+
+class StageTimingsTest(unittest.TestCase):
+
+    def test_prometheus_format(self):
+        timings = StageTimings()
+        timings.record("a.b", 0.5)
+        timings.record("a.b", 1.5)
+        text = timings.to_prometheus()
+        self.assertIn('cashdash_stage_duration_seconds_count{stage="a.b"} 2', text)
+        self.assertIn('cashdash_stage_duration_seconds_sum{stage="a.b"} 2.0', text)
+        self.assertIn('cashdash_stage_duration_seconds_max{stage="a.b"} 1.5', text)
+
+    def test_endpoint_and_server_timing(self):
+        app = Flask(__name__)
+        enable_metrics(app, server_timing=True)
+
+        @app.route("/work")
+        def work():
+            with timed("test.work"):
+                return "done"
+
+        client = app.test_client()
+        response = client.get("/work")
+        self.assertTrue(response.headers["Server-Timing"].startswith("test.work;dur="))
+
+        response = client.get("/metrics")
+        self.assertIn('stage="test.work"', response.data.decode())
+        self.assertIn('stage="test.work"', STAGE_TIMINGS.to_prometheus())